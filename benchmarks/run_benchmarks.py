@@ -0,0 +1,304 @@
+# benchmarks/run_benchmarks.py
+"""
+Reproducible end-to-end benchmarks on a synthetic dataset (see synthetic.py).
+
+Timed steps:
+  - f1_genome:   load_reference + apply_f1_variants
+  - load_vcf:    load_vcf_as_df on the Lyrata VCF
+  - snp_markers: generate_snp_marker_table on both parental VCFs
+  - detect:      detect_crossovers on the F1 BAM
+
+Each step runs in a fresh process so its peak RSS is its own; the best of
+--repeat runs is kept. Besides time, throughput and memory, every step
+returns a small result fingerprint (counts, a genome hash, crossover
+recall against the simulated truth), so a change in output shows up next
+to a change in speed.
+
+Results are compared with benchmarks/baseline.json for the same scale:
+a result that differs, throughput lower or peak memory higher than the
+baseline by more than --tolerance is reported as a regression and the
+exit status is 1. Timings only compare on similar machines; refresh the
+baseline with --save-baseline after an intended change.
+
+    python -m benchmarks.run_benchmarks --scale small
+    python -m benchmarks.run_benchmarks --scale medium --workers 4 --save-baseline
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import SCALES, generate_dataset
+from distortopia.instrumentation import rss_mb
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def _sha256_genome(genome):
+    sha = hashlib.sha256()
+    for chrom in sorted(genome):
+        sha.update(chrom.encode())
+        sha.update(genome[chrom].tobytes())
+    return sha.hexdigest()[:16]
+
+
+def bench_f1_genome(data, options):
+    from distortopia.simulate_f1 import apply_f1_variants, load_reference, load_variants
+
+    var1, var2 = load_variants(data["thaliana_vcf"]), load_variants(data["lyrata_vcf"])
+    t0 = time.perf_counter()
+    f1 = apply_f1_variants(load_reference(data["reference"]), var1, var2)
+    seconds = time.perf_counter() - t0
+    bases = sum(len(seq) for seq in f1.values())
+    ambiguous = sum(int(np.count_nonzero(~np.isin(seq, np.frombuffer(b"ACGT", np.uint8)))) for seq in f1.values())
+    return seconds, {"bases": bases}, {"bases": bases, "heterozygous": ambiguous, "sha256": _sha256_genome(f1)}
+
+
+def bench_load_vcf(data, options):
+    from distortopia.compare_variants import load_vcf_as_df
+
+    path = data["lyrata_vcf"]
+    t0 = time.perf_counter()
+    df = load_vcf_as_df(path, "Lyrata_REF", "Lyrata_ALT")
+    seconds = time.perf_counter() - t0
+    return seconds, {"records": len(df), "bytes": os.path.getsize(path)}, {"records": len(df)}
+
+
+def bench_snp_markers(data, options):
+    from distortopia.compare_variants import generate_snp_marker_table
+
+    records = sum(_count_records(data[key]) for key in ("thaliana_vcf", "lyrata_vcf"))
+    with tempfile.TemporaryDirectory(dir=options["workdir"]) as tmp:
+        t0 = time.perf_counter()
+        counts = generate_snp_marker_table(data["thaliana_vcf"], data["lyrata_vcf"],
+                                           os.path.join(tmp, "markers.tsv"))
+        seconds = time.perf_counter() - t0
+    result = {k: int(v) for k, v in counts.items() if isinstance(v, (int, np.integer))}
+    return seconds, {"records": records}, result
+
+
+def bench_detect(data, options):
+    from distortopia.detect_crossovers import detect_crossovers
+
+    markers = os.path.splitext(data["markers"])[0] + ".npz"
+    with tempfile.TemporaryDirectory(dir=options["workdir"]) as tmp:
+        output = os.path.join(tmp, "crossovers.tsv")
+        t0 = time.perf_counter()
+        detect_crossovers(data["bam"], markers, output, workers=options["workers"], method=options["method"])
+        seconds = time.perf_counter() - t0
+        reads = pd.read_csv(output, sep="\t")
+        breakpoints = pd.read_csv(os.path.join(tmp, "crossovers.breakpoints.tsv"), sep="\t")
+    truth = pd.read_csv(data["truth"], sep="\t")
+    result = {"reads": len(reads), "crossovers": len(breakpoints), **_crossover_accuracy(truth, breakpoints)}
+    return seconds, {"reads": len(reads), "bases": int(reads["length"].sum())}, result
+
+
+def _count_records(vcf_path):
+    with open(vcf_path) as f:
+        return sum(1 for line in f if not line.startswith("#"))
+
+
+def _crossover_accuracy(truth, breakpoints):
+    """
+    Recall and precision of called breakpoints against simulated crossovers.
+
+    A call matches when its marker interval (1-based VCF positions) holds
+    the true crossover: left_marker <= crossover < right_marker.
+    """
+    truth = truth[truth["crossover"] > 0]
+    merged = breakpoints.merge(truth, left_on=["read_id", "chrom"], right_on=["qname", "chrom"])
+    hits = merged[(merged["left_marker"] <= merged["crossover"]) & (merged["crossover"] < merged["right_marker"])]
+    return {"recall": round(hits["qname"].nunique() / max(len(truth), 1), 4),
+            "precision": round(len(hits) / max(len(breakpoints), 1), 4)}
+
+
+BENCHMARKS = {
+    "f1_genome": bench_f1_genome,
+    "load_vcf": bench_load_vcf,
+    "snp_markers": bench_snp_markers,
+    "detect": bench_detect,
+}
+
+
+def _run_child(name, data, options, queue):
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds, units, result = BENCHMARKS[name](data, options)
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    queue.put({
+        "seconds": seconds,
+        "units": units,
+        "result": result,
+        # worker processes count separately
+        "peak_rss_mb": rss_mb(max(usage.ru_maxrss, children.ru_maxrss)),
+        "rss_growth_mb": rss_mb(usage.ru_maxrss - rss0),
+    })
+
+
+def run_benchmark(name, data, options, repeat=3):
+    """
+    Run one benchmark `repeat` times, each in a new process.
+
+    Returns:
+        dict: Best seconds, throughput per unit (units/s), highest peak RSS
+              and the result (identical across repeats, or an error)
+    """
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_child, args=(name, data, options, queue))
+        proc.start()
+        while True:
+            try:
+                run = queue.get(timeout=1)
+                break
+            except queue_module.Empty:
+                if not proc.is_alive():
+                    # e.g. killed by the OOM killer before reporting
+                    run = {"error": f"process exited with code {proc.exitcode}"}
+                    break
+        proc.join()
+        if "error" in run:
+            raise RuntimeError(f"{name} failed: {run['error']}")
+        runs.append(run)
+
+    if any(run["result"] != runs[0]["result"] for run in runs):
+        raise RuntimeError(f"{name} is not deterministic: {[run['result'] for run in runs]}")
+    best = min(runs, key=lambda run: run["seconds"])
+    return {
+        "seconds": round(best["seconds"], 4),
+        "throughput": {unit: round(n / best["seconds"], 1) for unit, n in best["units"].items()},
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "rss_growth_mb": max(run["rss_growth_mb"] for run in runs),
+        "result": best["result"],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of results against a baseline of the same scale.
+
+    Returns:
+        list[str]: One message per regression
+    """
+    problems = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current["result"] != base["result"]:
+            problems.append(f"{name}: result CHANGED {base['result']} -> {current['result']}")
+        for unit, rate in current["throughput"].items():
+            old = base["throughput"].get(unit)
+            if old and rate < old * (1 - tolerance):
+                problems.append(f"{name}: SLOWER {unit}/s {old:,.0f} -> {rate:,.0f} ({rate / old - 1:+.0%})")
+        old = base["peak_rss_mb"]
+        if current["peak_rss_mb"] > old * (1 + tolerance):
+            problems.append(f"{name}: MORE MEMORY {old:.0f} MB -> {current['peak_rss_mb']:.0f} MB")
+    return problems
+
+
+def _machine():
+    return {"cpus": os.cpu_count(), "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version()}
+
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<12} {'seconds':>9} {'vs base':>8} {'peak MB':>8} {'+MB':>7}  throughput")
+    for name, r in results.items():
+        base = (baseline or {}).get(name)
+        ratio = f"{r['seconds'] / base['seconds']:.2f}x" if base else "-"
+        rates = ", ".join(f"{rate:,.0f} {unit}/s" for unit, rate in r["throughput"].items())
+        print(f"{name:<12} {r['seconds']:>9.3f} {ratio:>8} {r['peak_rss_mb']:>8.0f} {r['rss_growth_mb']:>7.0f}  {rates}")
+
+
+def options_key(options):
+    """Options that change results or timings (the dataset directory does not)."""
+    return {k: v for k, v in options.items() if k != "workdir"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Distortopia on a synthetic dataset.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--workdir", default=None,
+                        help="Dataset directory, reused between runs (default: <tmp>/distortopia_bench/<scale>)")
+    parser.add_argument("--seed", type=int, default=None, help="Dataset seed (changes results: not comparable to the baseline)")
+    parser.add_argument("--only", nargs="*", choices=BENCHMARKS, default=None, help="Benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest counts")
+    parser.add_argument("--workers", type=int, default=1, help="detect_crossovers worker processes")
+    parser.add_argument("--method", default="hmm", help="detect_crossovers method")
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline JSON to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline for this scale")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative drop in throughput / rise in peak memory")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "distortopia_bench", args.scale)
+    data = generate_dataset(workdir, args.scale, seed=args.seed)
+    params = data.pop("params")
+    options = {"workdir": workdir, "workers": args.workers, "method": args.method}
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"[INFO] Running {name} ({args.repeat}x)")
+        results[name] = run_benchmark(name, data, options, args.repeat)
+
+    try:
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    entry = baselines.get(args.scale)
+    comparable = entry is not None and entry["params"] == params and entry["options"] == options_key(options)
+    if entry is not None and not comparable:
+        print("⚠️ Baseline was made with other dataset parameters or options; not comparing.")
+    elif comparable and entry["machine"] != _machine():
+        print(f"⚠️ Baseline machine differs ({entry['machine']}); timings may not be comparable.")
+
+    print_results(results, entry["benchmarks"] if comparable else None)
+    report = {"params": params, "options": options_key(options), "machine": _machine(), "benchmarks": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({args.scale: report}, f, indent=2)
+
+    if args.save_baseline:
+        if comparable:
+            results = {**entry["benchmarks"], **results}
+            report["benchmarks"] = results
+        baselines[args.scale] = report
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2)
+            f.write("\n")
+        print(f"[DONE] Baseline for {args.scale} saved to {args.baseline}")
+        return
+
+    if comparable:
+        problems = compare(results, entry["benchmarks"], args.tolerance)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            raise SystemExit(1)
+        print(f"✅ No regressions against the {args.scale} baseline (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# benchmarks/synthetic.py
+"""
+Synthetic benchmark data: reference, parental VCFs and an F1 long-read BAM.
+
+Everything is generated from one seed and written locally with pysam:
+
+  - reference.fna (+ .fai): random ACGT chromosomes
+  - lyrata.vcf: SNPs every ~snp_spacing bases (REF = reference base)
+  - thaliana.vcf: a share of the Lyrata sites plus private sites, so the
+                  marker merge has both shared and unshared records
+  - f1.sort.bam (+ .bai): reads from a Thaliana (reference) / Lyrata
+                  (reference + Lyrata ALTs) mosaic, with an optional
+                  crossover per read, substitutions and 1 bp indels
+  - truth.tsv: qname and true crossover position (0 = none) per read
+
+    python -m benchmarks.synthetic --scale small --out /tmp/bench_small
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pysam
+
+SCALES = {
+    "tiny": dict(chromosomes=2, chrom_length=200_000, snp_spacing=300, reads=300, read_length=8_000),
+    "small": dict(chromosomes=3, chrom_length=1_000_000, snp_spacing=250, reads=2_000, read_length=10_000),
+    "medium": dict(chromosomes=5, chrom_length=5_000_000, snp_spacing=250, reads=20_000, read_length=12_000),
+    "large": dict(chromosomes=5, chrom_length=30_000_000, snp_spacing=200, reads=100_000, read_length=15_000),
+}
+
+DEFAULTS = dict(shared_fraction=0.8, private_fraction=0.1, crossover_fraction=0.3,
+                substitution_rate=0.01, indel_rate=0.003, seed=1)
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+CIGAR_M, CIGAR_I, CIGAR_D = 0, 1, 2
+
+
+def dataset_params(scale="small", **overrides):
+    """Generation parameters of a scale, with any non-None overrides applied."""
+    params = {**SCALES[scale], **DEFAULTS}
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    return params
+
+
+def dataset_paths(out_dir):
+    names = {"reference": "reference.fna", "thaliana_vcf": "thaliana.vcf", "lyrata_vcf": "lyrata.vcf",
+             "bam": "f1.sort.bam", "truth": "truth.tsv", "markers": "markers.tsv"}
+    return {key: os.path.join(out_dir, name) for key, name in names.items()}
+
+
+def write_reference(path, chromosomes, chrom_length, rng):
+    """Random chromosomes chr1..chrN; returns {chrom: uint8 array}."""
+    genome = {}
+    with open(path, "wb") as out:
+        for i in range(1, chromosomes + 1):
+            seq = BASES[rng.integers(0, 4, chrom_length)]
+            genome[f"chr{i}"] = seq
+            out.write(f">chr{i}\n".encode())
+            for start in range(0, chrom_length, 80):
+                out.write(seq[start:start + 80].tobytes() + b"\n")
+    pysam.faidx(path)
+    return genome
+
+
+def _other_base(ref_bases, rng):
+    """A base different from each reference base."""
+    idx = np.searchsorted(BASES, ref_bases)
+    return BASES[(idx + rng.integers(1, 4, len(idx))) % 4]
+
+
+def _write_vcf(path, genome, sites, rng):
+    header = pysam.VariantHeader()
+    for chrom, seq in genome.items():
+        header.contigs.add(chrom, length=len(seq))
+    header.add_line('##INFO=<ID=DP,Number=1,Type=Integer,Description="Read depth">')
+    with pysam.VariantFile(path, "w", header=header) as vcf:
+        for chrom, (positions, alts) in sites.items():
+            ref = genome[chrom][positions].tobytes().decode()
+            quals = rng.uniform(30, 200, len(positions))
+            depths = rng.integers(10, 80, len(positions))
+            for pos, ref_base, alt, qual, depth in zip(positions.tolist(), ref, alts.tobytes().decode(),
+                                                       quals.tolist(), depths.tolist()):
+                vcf.write(vcf.new_record(contig=chrom, start=pos, alleles=(ref_base, alt),
+                                         qual=qual, info={"DP": depth}))
+
+
+def write_parental_vcfs(thaliana_path, lyrata_path, genome, snp_spacing, shared_fraction,
+                        private_fraction, rng):
+    """
+    Write both parents' SNPs; returns the Lyrata sites {chrom: (positions, alts)}.
+
+    Lyrata has a SNP about every snp_spacing bases. Thaliana lists
+    shared_fraction of those sites (with its own ALT) and private sites at
+    private_fraction of the Lyrata density.
+    """
+    lyrata, thaliana = {}, {}
+    for chrom, seq in genome.items():
+        n = len(seq) // snp_spacing
+        positions = np.unique(rng.integers(0, len(seq), n))
+        lyrata[chrom] = (positions, _other_base(seq[positions], rng))
+
+        shared = positions[rng.random(len(positions)) < shared_fraction]
+        private = np.setdiff1d(np.unique(rng.integers(0, len(seq), int(n * private_fraction))), positions)
+        thal_positions = np.union1d(shared, private)
+        thaliana[chrom] = (thal_positions, _other_base(seq[thal_positions], rng))
+    _write_vcf(lyrata_path, genome, lyrata, rng)
+    _write_vcf(thaliana_path, genome, thaliana, rng)
+    return lyrata
+
+
+def _read_template(seq, lyrata_positions, lyrata_alts, start, end, crossover, lyrata_first):
+    """Reference slice with Lyrata alleles on the Lyrata side of the crossover."""
+    template = seq[start:end].copy()
+    lo, hi = np.searchsorted(lyrata_positions, [start, end])
+    positions, alts = lyrata_positions[lo:hi], lyrata_alts[lo:hi]
+    lyrata_side = positions < crossover if lyrata_first else positions >= crossover
+    template[positions[lyrata_side] - start] = alts[lyrata_side]
+    return template
+
+
+def _sequence_errors(template, substitution_rate, indel_rate, rng):
+    """
+    Apply substitutions and 1 bp indels to a template.
+
+    Returns (query bases, Phred qualities, CIGAR tuples); erroneous bases
+    get low qualities.
+    """
+    length = len(template)
+    query = template.copy()
+    quals = rng.integers(20, 41, length).astype(np.uint8)
+    subs = np.flatnonzero(rng.random(length) < substitution_rate)
+    query[subs] = _other_base(query[subs], rng)
+    quals[subs] = rng.integers(3, 15, len(subs))
+
+    indels = np.flatnonzero(rng.random(length) < indel_rate)
+    indels = indels[(indels > 0) & (indels < length - 1)]
+    kinds = rng.integers(0, 2, len(indels))     # 0: insertion before the base, 1: deletion of it
+    pieces, qual_pieces, cigar, last = [], [], [], 0
+    for pos, kind in zip(indels.tolist(), kinds.tolist()):
+        if pos <= last:
+            continue
+        pieces.append(query[last:pos])
+        qual_pieces.append(quals[last:pos])
+        cigar.append((CIGAR_M, pos - last))
+        if kind == 0:
+            pieces.append(BASES[rng.integers(0, 4, 1)])
+            qual_pieces.append(np.array([5], np.uint8))
+            cigar.append((CIGAR_I, 1))
+            last = pos
+        else:
+            cigar.append((CIGAR_D, 1))
+            last = pos + 1
+    pieces.append(query[last:])
+    qual_pieces.append(quals[last:])
+    cigar.append((CIGAR_M, length - last))
+    return np.concatenate(pieces), np.concatenate(qual_pieces), cigar
+
+
+def write_f1_bam(bam_path, truth_path, genome, lyrata, reads, read_length, crossover_fraction,
+                 substitution_rate, indel_rate, rng):
+    """
+    Write a coordinate-sorted, indexed BAM of F1 reads and their true crossovers.
+
+    Read lengths are normal around read_length (sd read_length / 4, at
+    least 1 kb); starts are uniform over the genome in proportion to
+    chromosome length. crossover_fraction of reads switch parent once at a
+    uniform position inside the read.
+    """
+    chroms = list(genome)
+    lengths = np.array([len(genome[c]) for c in chroms])
+    header = pysam.AlignmentHeader.from_dict({
+        "HD": {"VN": "1.6", "SO": "coordinate"},
+        "SQ": [{"SN": c, "LN": int(n)} for c, n in zip(chroms, lengths)],
+    })
+    read_chrom = np.sort(rng.choice(len(chroms), reads, p=lengths / lengths.sum()))
+    read_lengths = np.maximum(1000, rng.normal(read_length, read_length / 4, reads)).astype(np.int64)
+    read_lengths = np.minimum(read_lengths, lengths[read_chrom])
+    starts = (rng.random(reads) * (lengths[read_chrom] - read_lengths + 1)).astype(np.int64)
+    order = np.lexsort((starts, read_chrom))
+
+    with pysam.AlignmentFile(bam_path, "wb", header=header) as bam, open(truth_path, "w") as truth:
+        truth.write("qname\tchrom\tcrossover\n")
+        for n, i in enumerate(order.tolist()):
+            chrom = chroms[read_chrom[i]]
+            start, end = int(starts[i]), int(starts[i] + read_lengths[i])
+            crossover = int(rng.integers(start + 1, end)) if rng.random() < crossover_fraction else 0
+            template = _read_template(genome[chrom], *lyrata[chrom], start, end,
+                                      crossover or end, bool(rng.integers(0, 2)))
+            query, quals, cigar = _sequence_errors(template, substitution_rate, indel_rate, rng)
+
+            read = pysam.AlignedSegment(header)
+            read.query_name = f"read{n}"
+            read.reference_id = int(read_chrom[i])
+            read.reference_start = start
+            read.mapping_quality = 60
+            read.cigartuples = cigar
+            read.query_sequence = query.tobytes().decode()
+            read.query_qualities = quals
+            bam.write(read)
+            truth.write(f"read{n}\t{chrom}\t{crossover}\n")
+    pysam.index(bam_path)
+
+
+def generate_dataset(out_dir, scale="small", **overrides):
+    """
+    Write a full synthetic dataset to out_dir, or reuse it if the parameters match.
+
+    Returns:
+        dict: Paths of the dataset files plus "params"
+    """
+    from distortopia.compare_variants import generate_snp_marker_table
+
+    params = dataset_params(scale, **overrides)
+    paths = dataset_paths(out_dir)
+    params_path = os.path.join(out_dir, "params.json")
+    try:
+        with open(params_path) as f:
+            if json.load(f) == params:
+                return {**paths, "params": params}
+    except (OSError, ValueError):
+        pass
+
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(params["seed"])
+    print(f"[INFO] Generating {scale} dataset in {out_dir}")
+    genome = write_reference(paths["reference"], params["chromosomes"], params["chrom_length"], rng)
+    lyrata = write_parental_vcfs(paths["thaliana_vcf"], paths["lyrata_vcf"], genome, params["snp_spacing"],
+                                 params["shared_fraction"], params["private_fraction"], rng)
+    write_f1_bam(paths["bam"], paths["truth"], genome, lyrata, params["reads"], params["read_length"],
+                 params["crossover_fraction"], params["substitution_rate"], params["indel_rate"], rng)
+    # detect_crossovers needs markers; build them once here, outside any timing
+    generate_snp_marker_table(paths["thaliana_vcf"], paths["lyrata_vcf"], paths["markers"])
+
+    with open(params_path, "w") as f:
+        json.dump(params, f, indent=2)
+    print(f"[DONE] Dataset ready: {out_dir}")
+    return {**paths, "params": params}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Distortopia benchmark dataset.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--reads", type=int, default=None)
+    parser.add_argument("--chrom-length", type=int, default=None)
+    args = parser.parse_args()
+    generate_dataset(args.out, args.scale, seed=args.seed, reads=args.reads, chrom_length=args.chrom_length)
+
+
+if __name__ == "__main__":
+    main()
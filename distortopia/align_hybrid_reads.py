@@ -1,31 +1,37 @@
 import subprocess
 import os
 import sys
+import tempfile
+
+from distortopia.align_reads import sort_command
+from distortopia.instrumentation import count, popen, run_command, timed, wait_process
+from distortopia.pipes import run_piped
+from distortopia.reference_cache import locked, prepare_reference
+from distortopia.scheduler import get_scheduler
 
 def log(message, log_box=None):
     print(message)
     if log_box:
         log_box.write(message)
 
-def align_reads(fq_gz, parent_ref, output_prefix, log_box=None):
-    bam = f"{output_prefix}.bam"
+@timed("align_f1")
+def align_reads(fq_gz, parent_ref, output_prefix, log_box=None, threads=None,
+                sort_threads=None, preset="map-pb"):
     sorted_bam = f"{output_prefix}.sort.bam"
 
     log(f"🔗 Aligning to {parent_ref}...", log_box)
-    cmd_align = ["minimap2", "-ax", "map-pb", parent_ref, fq_gz]
-    cmd_view = ["samtools", "view", "-Sb", "-"]
-    cmd_sort = ["samtools", "sort", "-", "-o", sorted_bam]
-    cmd_index = ["samtools", "index", sorted_bam]
+    ref_index = prepare_reference(parent_ref, preset)["mmi"]
+    scheduler = get_scheduler()
 
     try:
-        # Run minimap2 -> samtools view -> samtools sort
-        align = subprocess.Popen(cmd_align, stdout=subprocess.PIPE)
-        view = subprocess.Popen(cmd_view, stdin=align.stdout, stdout=subprocess.PIPE)
-        sort = subprocess.Popen(cmd_sort, stdin=view.stdout)
-        sort.communicate()
+        # Run minimap2 -> samtools sort within the shared CPU/memory budget
+        with scheduler.reserve(("minimap2", threads), ("samtools sort", sort_threads)) as (align, sort):
+            cmd_align = ["minimap2", "-t", str(align.threads), "-ax", preset, ref_index, fq_gz]
+            run_piped([cmd_align, sort_command(sorted_bam, sort.threads, sort.memory_per_thread)])
 
         # Index the sorted BAM
-        subprocess.run(cmd_index, check=True)
+        with scheduler.reserve(("samtools index", sort_threads)) as (index,):
+            run_command(["samtools", "index", "-@", str(index.threads), sorted_bam])
 
         log(f"✅ Alignment complete: {sorted_bam}", log_box)
         return sorted_bam
@@ -33,6 +39,242 @@ def align_reads(fq_gz, parent_ref, output_prefix, log_box=None):
         log(f"❌ Alignment failed: {e}", log_box)
         raise RuntimeError("Alignment pipeline failed.") from e
 
+# Contig names in the combined reference are "<parent>#<contig>" (PanSN style).
+PARENT_SEP = "#"
+
+def build_combined_reference(parent_refs, output_fasta):
+    """
+    Concatenate parental FASTAs into one reference with parent-prefixed contigs.
+
+    parent_refs is an ordered {parent: fasta} mapping; the file is only
+    rewritten when it is missing or older than one of the inputs. The check
+    and rewrite happen under the reference cache's file lock, and the FASTA
+    is written to a private temporary file before being renamed into place.
+    """
+    def up_to_date():
+        return os.path.exists(output_fasta) and all(
+            os.path.getmtime(output_fasta) >= os.path.getmtime(ref) for ref in parent_refs.values()
+        )
+
+    if up_to_date():
+        return output_fasta
+
+    with locked(output_fasta):
+        if up_to_date():
+            return output_fasta
+        fd, tmp = tempfile.mkstemp(prefix=".combined_", suffix=".fna",
+                                   dir=os.path.dirname(os.path.abspath(output_fasta)))
+        try:
+            with os.fdopen(fd, "w") as out:
+                for parent, ref in parent_refs.items():
+                    with open(ref) as f:
+                        for line in f:
+                            if line.startswith(">"):
+                                line = f">{parent}{PARENT_SEP}{line[1:]}"
+                            out.write(line)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, output_fasta)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return output_fasta
+
+def _iter_read_groups(sam_lines):
+    """Group consecutive SAM records by read name (minimap2 emits them together)."""
+    group = []
+    for line in sam_lines:
+        fields = line.rstrip("\n").split("\t")
+        if group and fields[0] != group[0][0]:
+            yield group
+            group = []
+        group.append(fields)
+    if group:
+        yield group
+
+def _alignment_score(fields):
+    for tag in fields[11:]:
+        if tag.startswith("AS:i:"):
+            return int(tag[5:])
+    return None
+
+def _strip_parent(fields, parent):
+    """
+    Rewrite RNAME, RNEXT and SA contigs from "<parent>#chr" back to "chr".
+
+    The per-parent BAM header only has that parent's contigs, so SA entries
+    and mates on the other parent's contigs are dropped (RNEXT becomes "*").
+    """
+    prefix = f"{parent}{PARENT_SEP}"
+    fields = list(fields)
+    if fields[2].startswith(prefix):
+        fields[2] = fields[2][len(prefix):]
+    if fields[6].startswith(prefix):
+        fields[6] = fields[6][len(prefix):]
+    elif PARENT_SEP in fields[6]:
+        fields[6], fields[7] = "*", "0"
+    tags = []
+    for tag in fields[11:]:
+        if tag.startswith("SA:Z:"):
+            entries = [entry[len(prefix):] for entry in tag[5:].split(";") if entry.startswith(prefix)]
+            if not entries:
+                continue
+            tag = "SA:Z:" + "".join(f"{entry};" for entry in entries)
+        tags.append(tag)
+    fields[11:] = tags
+    return fields
+
+def _open_sorter(output_path, allocation):
+    err_log = tempfile.TemporaryFile()
+    cmd = sort_command(output_path, allocation.threads, allocation.memory_per_thread)
+    proc = popen(cmd, stdin=subprocess.PIPE, stderr=err_log, text=True)
+    return proc, err_log
+
+def _finish(proc, err_log, name):
+    if proc.stdin:
+        proc.stdin.close()
+    code = wait_process(proc)
+    err_log.seek(0)
+    err = err_log.read().decode(errors="replace")
+    err_log.close()
+    if code != 0:
+        raise RuntimeError(f"{name} failed (exit {code}):\n{err}")
+
+@timed("align_competitive")
+def align_competitive(fq_gz, parent_refs, output_prefixes, log_box=None, threads=None,
+                      sort_threads=None, preset="map-pb", split=True, keep_parent_tags=True,
+                      combined_fasta=None, max_secondary=5):
+    """
+    Align F1 reads once against both parents and assign each read to its best parent.
+
+    Reads are mapped to a combined "<parent>#<contig>" reference; the parent
+    of the primary alignment is the parent of best hit. Every record gets
+    YP:Z:<parent>. With keep_parent_tags, the best AS and MAPQ seen on each
+    parent are also kept as Y<k>:i and Z<k>:i (k = A, B, ... in
+    parent_refs order), so downstream steps can judge how clear-cut the
+    assignment was.
+
+    With split=True, records on the assigned parent are written, with the
+    prefix stripped, to <output_prefixes[parent]>.sort.bam, one sorted BAM
+    per parent as align_reads produces. Otherwise everything goes to a
+    single BAM on the combined reference (output_prefixes["combined"]).
+
+    Split BAMs are not equivalent to align_reads output: each holds only the
+    reads assigned to its parent, not the full read set. Marker allele
+    fractions in a split BAM are therefore biased towards its parent, and a
+    read spanning a crossover appears in one BAM only. Per-parent crossover
+    detection and segregation tests expect every read, so use align_reads
+    for those (the pipeline and app default) or split=False and the YP tag.
+    minimap2 and the sorters are sized and queued together by the
+    process-wide scheduler.
+
+    Returns:
+        dict: {parent or "combined": sorted BAM path}
+    """
+    parents = list(parent_refs)
+    letters = [chr(ord("A") + k) for k in range(len(parents))]
+    combined_fasta = combined_fasta or "_".join(parents) + ".combined.fna"
+
+    log(f"🔗 Competitive alignment to {', '.join(parents)}...", log_box)
+    build_combined_reference(parent_refs, combined_fasta)
+    ref_index = prepare_reference(combined_fasta, preset, artifacts=("mmi",))["mmi"]
+
+    outputs = ({parent: f"{output_prefixes[parent]}.sort.bam" for parent in parents}
+               if split else {"combined": f"{output_prefixes['combined']}.sort.bam"})
+    scheduler = get_scheduler()
+    groups = [("minimap2", threads)] + [("samtools sort", sort_threads)] * len(outputs)
+    with scheduler.reserve(*groups) as (align_alloc, *sort_allocs):
+        cmd_align = ["minimap2", "-t", str(align_alloc.threads), "-ax", preset, "--secondary=yes",
+                     "-N", str(max_secondary), ref_index, fq_gz]
+        sorters = {key: _open_sorter(path, alloc) for (key, path), alloc in zip(outputs.items(), sort_allocs)}
+        align_err = tempfile.TemporaryFile()
+        align = popen(cmd_align, stdout=subprocess.PIPE, stderr=align_err, text=True)
+
+        try:
+            header = []
+            first_record = None
+            for line in align.stdout:
+                if not line.startswith("@"):
+                    first_record = line
+                    break
+                header.append(line)
+
+            for key, (proc, _) in sorters.items():
+                if not split:
+                    proc.stdin.writelines(header)
+                    continue
+                prefix = f"@SQ\tSN:{key}{PARENT_SEP}"
+                for line in header:
+                    if line.startswith("@SQ"):
+                        if line.startswith(prefix):
+                            proc.stdin.write("@SQ\tSN:" + line[len(prefix):])
+                    else:
+                        proc.stdin.write(line)
+
+            records = align.stdout if first_record is None else _prepend(first_record, align.stdout)
+            assigned = {parent: 0 for parent in parents}
+            for group in _iter_read_groups(records):
+                primary = next((f for f in group if not int(f[1]) & 0x900), group[0])
+                if int(primary[1]) & 0x4:
+                    best_parent = None
+                else:
+                    best_parent = primary[2].split(PARENT_SEP, 1)[0]
+                    assigned[best_parent] += 1
+
+                tags = [f"YP:Z:{best_parent or '*'}"]
+                if keep_parent_tags:
+                    for parent, letter in zip(parents, letters):
+                        hits = [f for f in group if f[2].startswith(f"{parent}{PARENT_SEP}")]
+                        scores = [s for s in map(_alignment_score, hits) if s is not None]
+                        if scores:
+                            tags.append(f"Y{letter}:i:{max(scores)}")
+                            tags.append(f"Z{letter}:i:{max(int(f[4]) for f in hits)}")
+
+                if split:
+                    if best_parent is None:
+                        continue
+                    out = sorters[best_parent][0].stdin
+                    for fields in group:
+                        if fields[2].startswith(f"{best_parent}{PARENT_SEP}"):
+                            out.write("\t".join(_strip_parent(fields, best_parent) + tags) + "\n")
+                else:
+                    out = sorters["combined"][0].stdin
+                    for fields in group:
+                        out.write("\t".join(fields + tags) + "\n")
+
+            align.stdout.close()
+            _finish(align, align_err, "minimap2")
+            for key, (proc, err_log) in sorters.items():
+                _finish(proc, err_log, f"samtools sort ({key})")
+        except Exception as e:
+            for proc in [align] + [proc for proc, _ in sorters.values()]:
+                if proc.poll() is None:
+                    proc.kill()
+            align_stderr = ""
+            if not align_err.closed:
+                align.wait()
+                align_err.seek(0)
+                align_stderr = align_err.read().decode(errors="replace")
+            for err_log in [align_err] + [err_log for _, err_log in sorters.values()]:
+                err_log.close()
+            log(f"❌ Competitive alignment failed: {e}", log_box)
+            message = "Competitive alignment failed."
+            if align_stderr:
+                message += f"\nminimap2 stderr:\n{align_stderr}"
+            raise RuntimeError(message) from e
+
+    with scheduler.reserve(("samtools index", sort_threads)) as (index,):
+        for path in outputs.values():
+            run_command(["samtools", "index", "-@", str(index.threads), path])
+
+    count(**{f"reads_{parent}": n for parent, n in assigned.items()})
+    summary = ", ".join(f"{parent}: {n}" for parent, n in assigned.items())
+    log(f"✅ Competitive alignment complete ({summary} reads)", log_box)
+    return outputs
+
+def _prepend(first, lines):
+    yield first
+    yield from lines
+
 # For CLI use (not Streamlit)
 if __name__ == "__main__":
     import argparse
@@ -40,8 +282,14 @@ if __name__ == "__main__":
     parser.add_argument("--fq", required=True, help="Hybrid .fq.gz file")
     parser.add_argument("--ref1", required=True, help="Parent 1 reference")
     parser.add_argument("--ref2", required=True, help="Parent 2 reference")
+    parser.add_argument("--competitive", action="store_true",
+                        help="Align once to a combined reference and split reads by best parent")
     args = parser.parse_args()
 
-    align_reads(args.fq, args.ref1, "F1_to_thaliana")
-    align_reads(args.fq, args.ref2, "F1_to_lyrata")
+    if args.competitive:
+        align_competitive(args.fq, {"thaliana": args.ref1, "lyrata": args.ref2},
+                          {"thaliana": "F1_to_thaliana", "lyrata": "F1_to_lyrata"})
+    else:
+        align_reads(args.fq, args.ref1, "F1_to_thaliana")
+        align_reads(args.fq, args.ref2, "F1_to_lyrata")
 
@@ -1,44 +1,72 @@
-import subprocess
-import os
 
-def run_alignment(reads_path, reference_fasta, output_prefix, aligner='minimap2'):
+from distortopia.instrumentation import run_command, timed
+from distortopia.pipes import run_piped
+from distortopia.reference_cache import prepare_reference
+from distortopia.scheduler import configure, get_scheduler
+
+def sort_command(output_path, threads=4, memory_per_thread="768M", reference_fasta=None):
+    """
+    Build a samtools sort command reading SAM/BAM from stdin.
+
+    Output is CRAM when output_path ends in .cram (reference_fasta required),
+    otherwise BAM. Temporary chunks go next to the output.
+    """
+    cmd = ["samtools", "sort", "-@", str(threads), "-m", memory_per_thread,
+           "-T", f"{output_path}.tmp", "-o", output_path]
+    if output_path.endswith(".cram"):
+        if not reference_fasta:
+            raise ValueError("CRAM output needs reference_fasta.")
+        cmd += ["-O", "cram", "--reference", reference_fasta]
+    return cmd + ["-"]
+
+
+@timed("align")
+def run_alignment(reads_path, reference_fasta, output_prefix, aligner='minimap2',
+                  threads=None, sort_threads=None, sort_memory=None, preset="map-pb",
+                  cram=False):
     """
     Align long reads to a reference genome and generate a sorted, indexed BAM file.
 
+    minimap2 streams straight into samtools sort, so no intermediate SAM or
+    unsorted BAM is written. Thread counts and sort memory left as None are
+    sized by the process-wide scheduler, and the run waits until its share
+    of the CPU/memory budget is free.
+
     Args:
         reads_path (str): Path to simulated long reads (.fq or .fq.gz)
         reference_fasta (str): Path to reference genome FASTA
         output_prefix (str): Prefix for output files (e.g. "sim_thaliana")
         aligner (str): Aligner to use (currently supports 'minimap2')
-    """
-    # Step 1: Build index (.mmi)
-    ref_index = f"{reference_fasta}.mmi"
-    if not os.path.exists(ref_index):
-        print(f"[INFO] Building minimap2 index for {reference_fasta}")
-        subprocess.run([aligner, "-d", ref_index, reference_fasta], check=True)
-
-    # Step 2: Align reads to reference
-    sam_file = f"{output_prefix}.sam"
-    print(f"[INFO] Aligning reads with minimap2: {reads_path} → {sam_file}")
-    with open(sam_file, "w") as sam_out:
-        subprocess.run([
-            aligner, "-ax", "map-pb", ref_index, reads_path
-        ], stdout=sam_out, check=True)
+        threads (int): minimap2 threads (-t); capped to the budget
+        sort_threads (int): samtools sort/index threads (-@); capped to the budget
+        sort_memory (str): samtools sort memory per thread (-m)
+        preset (str): minimap2 preset (-x)
+        cram (bool): Write <prefix>.sort.cram instead of <prefix>.sort.bam
 
-    # Step 3: Convert to BAM, sort, and index
-    bam_file = f"{output_prefix}.bam"
-    sorted_bam = f"{output_prefix}.sort.bam"
-
-    print(f"[INFO] Converting SAM to BAM: {sam_file} → {bam_file}")
-    subprocess.run(["samtools", "view", "-Sb", sam_file], stdout=open(bam_file, "wb"), check=True)
+    Returns:
+        str: Path to the sorted, indexed alignment file
+    """
+    # Step 1: Build or reuse the content-hashed index (.mmi)
+    ref_index = prepare_reference(reference_fasta, preset, aligner)["mmi"]
 
-    print(f"[INFO] Sorting BAM: {bam_file} → {sorted_bam}")
-    subprocess.run(["samtools", "sort", "-o", sorted_bam, bam_file], check=True)
+    # Step 2: Align and sort in one stream
+    sorted_out = f"{output_prefix}.sort.{'cram' if cram else 'bam'}"
+    scheduler = get_scheduler()
+    with scheduler.reserve((aligner, threads), ("samtools sort", sort_threads)) as (align, sort):
+        print(f"[INFO] Aligning and sorting: {reads_path} → {sorted_out} "
+              f"({align.threads} + {sort.threads} threads)")
+        run_piped([
+            [aligner, "-t", str(align.threads), "-ax", preset, ref_index, reads_path],
+            sort_command(sorted_out, sort.threads, sort_memory or sort.memory_per_thread, reference_fasta),
+        ])
 
-    print(f"[INFO] Indexing BAM: {sorted_bam}")
-    subprocess.run(["samtools", "index", sorted_bam], check=True)
+    # Step 3: Index
+    print(f"[INFO] Indexing: {sorted_out}")
+    with scheduler.reserve(("samtools index", sort_threads)) as (index,):
+        run_command(["samtools", "index", "-@", str(index.threads), sorted_out])
 
     print(f"[DONE] Alignment complete for {output_prefix}.")
+    return sorted_out
 
 
 # Optional command-line usage
@@ -49,7 +77,14 @@ if __name__ == "__main__":
     parser.add_argument("--reads", required=True, help="Path to .fq or .fq.gz file")
     parser.add_argument("--ref", required=True, help="Path to reference .fna file")
     parser.add_argument("--prefix", required=True, help="Output file prefix (e.g., sim_thaliana)")
+    parser.add_argument("--threads", type=int, default=None, help="minimap2 threads (default: scheduler)")
+    parser.add_argument("--sort-threads", type=int, default=None, help="samtools sort/index threads (default: scheduler)")
+    parser.add_argument("--sort-mem", default=None, help="samtools sort memory per thread (default: scheduler)")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU budget (default: all cores)")
+    parser.add_argument("--memory", default=None, help="Memory budget, e.g. 16G (default: 80%% of RAM)")
+    parser.add_argument("--cram", action="store_true", help="Write CRAM instead of BAM")
 
     args = parser.parse_args()
-    run_alignment(args.reads, args.ref, args.prefix)
-
+    configure(args.cpus, args.memory)
+    run_alignment(args.reads, args.ref, args.prefix, threads=args.threads,
+                  sort_threads=args.sort_threads, sort_memory=args.sort_mem, cram=args.cram)
@@ -0,0 +1,120 @@
+# distortopia/app_data.py
+
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from distortopia.compare_variants import load_vcf_as_df
+from distortopia.crossover_writer import load_crossover_reads
+from distortopia.vcf_io import load_vcf
+
+
+def file_key(path):
+    """(absolute path, mtime_ns, size) of a file, or (path, None, None) if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (os.path.abspath(path), None, None)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+class FileCache:
+    """
+    Bounded LRU cache for values derived from files.
+
+    Keys include each input file's path, mtime and size, so a rewritten
+    file is reloaded on the next lookup and its stale entry ages out. Once
+    maxsize entries are held, the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = FileCache(maxsize=32)
+
+
+def cached_on_files(*path_args):
+    """
+    Cache a function in the shared FileCache, keyed on the stat of the
+    arguments named in path_args and the value of all others.
+
+    Cached values are shared between callers and must not be modified.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (fn.__qualname__,) + tuple(
+                file_key(v) if k in path_args else (k, v) for k, v in bound.arguments.items()
+            )
+            return _cache.get_or_compute(key, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+@cached_on_files("vcf_path")
+def vcf_frame(vcf_path, ref_name="REF", alt_name="ALT"):
+    """CHROM/POS/REF/ALT of a VCF, renamed as load_vcf_as_df does."""
+    return load_vcf_as_df(vcf_path, ref_name, alt_name)
+
+
+@cached_on_files("vcf_path")
+def vcf_preview(vcf_path, nrows=100):
+    """First nrows records of a VCF."""
+    return load_vcf(vcf_path, nrows=nrows)
+
+
+@cached_on_files("f1_vcf", "parent_vcf")
+def compare_to_parent(f1_vcf, parent_vcf, parent_name):
+    """
+    Counts of SNPs shared between the F1 and a parent call set, and F1-only.
+
+    Only the two counts are kept in the cache, not the merged table.
+    """
+    f1 = vcf_frame(f1_vcf, parent_name, "F1")
+    parent = vcf_frame(parent_vcf, parent_name, "Sim")
+    merged = pd.merge(f1[["CHROM", "POS"]], parent[["CHROM", "POS"]],
+                      on=["CHROM", "POS"], how="left", indicator=True)
+    shared = int((merged["_merge"] == "both").sum())
+    return {"shared": shared, "f1_unique": len(merged) - shared}
+
+
+@cached_on_files("path")
+def crossover_reads(path):
+    """A detect_crossovers read table."""
+    return load_crossover_reads(path)
+
+
+def cache_stats():
+    return {"entries": len(_cache._entries), "hits": _cache.hits, "misses": _cache.misses}
@@ -0,0 +1,228 @@
+# distortopia/bgzf_writer.py
+
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from distortopia.instrumentation import popen, wait_process
+
+# htslib's block payload size; leaves room for incompressible data in a 64 KiB block.
+_BLOCK_SIZE = 0xff00
+_HEADER = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"
+_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+def _compress_block(data, level):
+    """Deflate one payload into a complete BGZF block (zlib releases the GIL)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+    return (_HEADER + struct.pack("<H", len(cdata) + 25) + cdata
+            + struct.pack("<II", zlib.crc32(data) & 0xffffffff, len(data)))
+
+
+class _FastqIndexer:
+    """Collect samtools-compatible .fai entries for FASTQ text as it is written."""
+
+    def __init__(self):
+        self.entries = []
+        self._carry = b""
+        self._line_no = 0
+        self._name = None
+        self._seq = None
+
+    def feed(self, data, offset):
+        chunk = self._carry + bytes(data)
+        base = offset - len(self._carry)
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            kind = self._line_no % 4
+            if kind == 0:
+                self._name = chunk[start + 1:end].split(None, 1)[0].decode()
+            elif kind == 1:
+                self._seq = (end - start, base + start)
+            elif kind == 3:
+                length, seq_offset = self._seq
+                self.entries.append((self._name, length, seq_offset, length, length + 1, base + start))
+            self._line_no += 1
+            start = end + 1
+        self._carry = chunk[start:]
+
+
+class ThreadedBgzfWriter:
+    """
+    Write BGZF with block compression spread over a thread pool.
+
+    Blocks are compressed concurrently and written in order, so the output
+    is a standard BGZF file that bgzip, samtools and htslib read directly.
+    With index=True a .gzi block index is written next to the output, and
+    with fastq_index=True a FASTQ .fai is built from the stream, so neither
+    needs a second pass over the file.
+    """
+
+    def __init__(self, path, threads=None, compresslevel=6, index=False, fastq_index=False):
+        self.path = path
+        self.threads = threads or min(4, os.cpu_count() or 1)
+        self.block_offsets = []  # (compressed, uncompressed) start of every block
+        self.compressed_size = 0
+        self.uncompressed_size = 0
+        self.fastq_index = _FastqIndexer() if fastq_index else None
+        self._level = compresslevel
+        self._index = index
+        self._raw = open(path, "wb")
+        self._pool = ThreadPoolExecutor(max_workers=self.threads)
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._received = 0
+
+    def write(self, data):
+        if self.fastq_index:
+            self.fastq_index.feed(data, self._received)
+        self._received += len(data)
+        self._buffer += data
+        while len(self._buffer) >= _BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:_BLOCK_SIZE]))
+            del self._buffer[:_BLOCK_SIZE]
+        return len(data)
+
+    def _submit(self, payload):
+        self._pending.append((len(payload), self._pool.submit(_compress_block, payload, self._level)))
+        while len(self._pending) > 4 * self.threads:
+            self._flush_one()
+
+    def _flush_one(self):
+        length, future = self._pending.popleft()
+        block = future.result()
+        self.block_offsets.append((self.compressed_size, self.uncompressed_size))
+        self._raw.write(block)
+        self.compressed_size += len(block)
+        self.uncompressed_size += length
+
+    def close(self):
+        if self._raw.closed:
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._flush_one()
+        self._raw.write(_EOF)
+        self._raw.close()
+        self._pool.shutdown()
+        if self._index:
+            write_gzi(self.path + ".gzi", self.block_offsets)
+        if self.fastq_index:
+            write_fai(self.path + ".fai", self.fastq_index.entries)
+
+    def abort(self):
+        """Stop compressing and delete the partial output and any index files."""
+        if self._raw.closed:
+            return
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+        self._raw.close()
+        for path in (self.path, self.path + ".gzi", self.path + ".fai"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # never finish a failed stream with an EOF block and indexes
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def has_eof_block(path):
+    """True if path ends with the BGZF EOF marker block, i.e. was closed cleanly."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(-len(_EOF), os.SEEK_END)
+            return f.read() == _EOF
+    except OSError:
+        return False
+
+
+def write_gzi(path, block_offsets):
+    """Write a bgzip .gzi index; the implicit first block (0, 0) is omitted."""
+    offsets = [pair for pair in block_offsets if pair != (0, 0)]
+    with open(path, "wb") as out:
+        out.write(struct.pack("<Q", len(offsets)))
+        for compressed, uncompressed in offsets:
+            out.write(struct.pack("<QQ", compressed, uncompressed))
+
+
+def write_fai(path, entries):
+    """Write FASTQ .fai rows: NAME LENGTH OFFSET LINEBASES LINEWIDTH QUALOFFSET."""
+    with open(path, "w") as out:
+        for entry in entries:
+            out.write("\t".join(map(str, entry)) + "\n")
+
+
+def concat_bgzf(writers, output_path, index=False):
+    """
+    Concatenate closed ThreadedBgzfWriter outputs into one BGZF file.
+
+    Each part's trailing EOF block is dropped and its block offsets and FASTQ
+    index entries are shifted, so the merged .gzi/.fai describe the merged
+    file exactly.
+    """
+    block_offsets, fai_entries = [], []
+    compressed_base = uncompressed_base = 0
+    with open(output_path, "wb") as out:
+        for part in writers:
+            with open(part.path, "rb") as f_in:
+                _copy_bytes(f_in, out, part.compressed_size)
+            block_offsets += [(c + compressed_base, u + uncompressed_base)
+                              for c, u in part.block_offsets]
+            if part.fastq_index:
+                fai_entries += [(name, length, offset + uncompressed_base, bases, width,
+                                 qual + uncompressed_base)
+                                for name, length, offset, bases, width, qual in part.fastq_index.entries]
+            compressed_base += part.compressed_size
+            uncompressed_base += part.uncompressed_size
+        out.write(_EOF)
+    if index:
+        write_gzi(output_path + ".gzi", block_offsets)
+        if fai_entries:
+            write_fai(output_path + ".fai", fai_entries)
+    return output_path
+
+
+def _copy_bytes(f_in, out, length, chunk_size=1 << 20):
+    while length > 0:
+        data = f_in.read(min(chunk_size, length))
+        if not data:
+            break
+        out.write(data)
+        length -= len(data)
+
+
+def stream_command_to_bgzf(cmd, output_path, threads=None, index=False,
+                           fastq=True, chunk_size=1 << 20):
+    """
+    Run cmd and compress its stdout straight into a threaded BGZF writer.
+
+    Nothing uncompressed touches the disk. stderr is spooled and included in
+    the RuntimeError raised when cmd exits non-zero.
+    """
+    with tempfile.TemporaryFile() as err_log, \
+            ThreadedBgzfWriter(output_path, threads, index=index,
+                               fastq_index=index and fastq) as out:
+        proc = popen(cmd, stdout=subprocess.PIPE, stderr=err_log)
+        shutil.copyfileobj(proc.stdout, out, chunk_size)
+        proc.stdout.close()
+        if wait_process(proc) != 0:
+            err_log.seek(0)
+            raise RuntimeError(f"{cmd[0]} failed:\n{err_log.read().decode(errors='replace')}")
+    return output_path
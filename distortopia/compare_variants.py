@@ -1,41 +1,184 @@
-import pandas as pd
-import io
-
-def load_vcf_as_df(vcf_path, ref_name="REF", alt_name="ALT"):
-    with open(vcf_path) as f:
-        lines = [l for l in f if not l.startswith("##")]
-    df = pd.read_csv(io.StringIO("".join(lines)), sep="\t")
-    df = df[["#CHROM", "POS", "REF", "ALT"]]
+import gzip
+import os
+from array import array
+
+import numpy as np
+import pysam
+
+from distortopia.instrumentation import count, timed
+from distortopia.vcf_io import load_vcf
+
+def load_vcf_as_df(vcf_path, ref_name="REF", alt_name="ALT", nrows=None, region=None):
+    df = load_vcf(vcf_path, nrows=nrows, region=region)
     df.rename(columns={
-        "#CHROM": "CHROM",
         "REF": ref_name,
         "ALT": alt_name
     }, inplace=True)
     return df
 
-def generate_snp_marker_table(thaliana_vcf, lyrata_vcf, outname="snp_marker_table.tsv"):
-    df_thal = load_vcf_as_df(thaliana_vcf, "Thaliana_REF", "Thaliana_ALT")
-    df_lyra = load_vcf_as_df(lyrata_vcf, "Lyrata_REF", "Lyrata_ALT")
+def _contig_order(vcf, vcf_path):
+    """
+    Contigs of a VCF in file order: from its ##contig headers, or, for a
+    text VCF without them, from a pre-pass over the CHROM column.
+    """
+    contigs = list(vcf.header.contigs)
+    if contigs:
+        return contigs
+    with open(vcf_path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    seen = {}
+    with (gzip.open(vcf_path, "rb") if gzipped else open(vcf_path, "rb")) as f:
+        for line in f:
+            if not line.startswith(b"#"):
+                seen.setdefault(line.split(b"\t", 1)[0].decode(), None)
+    return list(seen)
 
-    print("🔍 Thal SNPs:", len(df_thal))
-    print("🔍 Lyra SNPs:", len(df_lyra))
+def _merge_contig_orders(first, second):
+    """
+    One contig order consistent with both files' orders (contigs only one
+    file has are slotted in where they appear). Raises ValueError if the
+    files order their shared contigs differently, as a sort-merge needs.
+    """
+    in_first, in_second = set(first), set(second)
+    merged, i, j = [], 0, 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            merged.append(first[i])
+            i, j = i + 1, j + 1
+        elif first[i] not in in_second:
+            merged.append(first[i])
+            i += 1
+        elif second[j] not in in_first:
+            merged.append(second[j])
+            j += 1
+        else:
+            raise ValueError(f"The VCFs order contigs differently ({first[i]} vs {second[j]}); "
+                             "sort both against the same reference.")
+    return merged + first[i:] + second[j:]
 
-    merged = pd.merge(df_thal, df_lyra, on=["CHROM", "POS"], how="inner")
-    print("✅ Shared SNPs:", len(merged))
+def _snp_records(vcf, contig_rank, min_qual=None, min_depth=None):
+    """
+    Yield (rank, pos, chrom, ref, alt) for biallelic SNPs passing the filters, in file order.
 
-    marker_table = merged[["CHROM", "POS", "Thaliana_REF", "Lyrata_ALT"]]
-    marker_table.rename(columns={
-        "Thaliana_REF": "Thaliana",
-        "Lyrata_ALT": "Lyrata"
-    }, inplace=True)
+    Raises ValueError if the file is not coordinate-sorted in contig_rank order
+    or has records on a contig missing from its ##contig headers.
+    """
+    previous = (-1, 0)
+    for rec in vcf:
+        rank = contig_rank.get(rec.chrom)
+        if rank is None:
+            raise ValueError(f"{vcf.filename.decode()} has records on {rec.chrom}, which is not in its ##contig headers.")
+        key = (rank, rec.pos)
+        if key < previous:
+            raise ValueError(f"{vcf.filename.decode()} is not coordinate-sorted at {rec.chrom}:{rec.pos}.")
+        previous = key
+
+        alts = rec.alts
+        if not alts or len(alts) != 1 or len(rec.ref) != 1 or alts[0].upper() not in ("A", "C", "G", "T"):
+            continue
+        if min_qual is not None and (rec.qual is None or rec.qual < min_qual):
+            continue
+        if min_depth is not None and rec.info.get("DP", 0) < min_depth:
+            continue
+        yield rank, rec.pos, rec.chrom, rec.ref.upper(), alts[0].upper()
+
+def _counted(records, counts, key):
+    for record in records:
+        counts[key] += 1
+        yield record
+
+@timed("snp_markers")
+def generate_snp_marker_table(thaliana_vcf, lyrata_vcf, outname="snp_marker_table.tsv",
+                              binary_path=None, min_qual=None, min_depth=None):
+    """
+    Build the SNP marker table by a streaming sort-merge of two sorted VCFs.
 
-    marker_table.to_csv(outname, sep="\t", index=False)
-    print(f"📁 Saved SNP marker table: {outname}")
+    Both call sets are read record by record in coordinate order, so the
+    join is linear and never holds either VCF in memory. Contig order comes
+    from each file's ##contig headers (or a pre-pass over the CHROM column
+    of a VCF without them), merged into one order both files follow. Only biallelic SNPs present in both files whose
+    Thaliana REF and Lyrata ALT differ become markers. Markers are written
+    to a TSV (CHROM, POS, Thaliana, Lyrata) as they are found, and to a
+    binary .npz that load_snp_markers reads directly.
 
-    return marker_table
+    Args:
+        thaliana_vcf (str): Thaliana calls (.vcf, .vcf.gz or .bcf)
+        lyrata_vcf (str): Lyrata calls
+        outname (str): Marker TSV
+        binary_path (str): Marker .npz (default: outname with .npz extension)
+        min_qual (float): Drop records with QUAL below this
+        min_depth (int): Drop records with INFO/DP below this
+
+    Returns:
+        dict: Record counts (thaliana, lyrata, shared, markers) and output
+              paths (tsv, npz); the marker rows are in the files, not
+              returned as a DataFrame as before
+    """
+    binary_path = binary_path or os.path.splitext(outname)[0] + ".npz"
+    counts = {"thaliana": 0, "lyrata": 0, "shared": 0, "markers": 0}
+    # compact column buffers for the binary index (10 bytes per marker)
+    chrom_codes, positions, thaliana, lyrata = array("i"), array("q"), bytearray(), bytearray()
+
+    with pysam.VariantFile(thaliana_vcf) as thal_vcf, pysam.VariantFile(lyrata_vcf) as lyr_vcf, \
+            open(outname, "w") as out:
+        contigs = _merge_contig_orders(_contig_order(thal_vcf, thaliana_vcf), _contig_order(lyr_vcf, lyrata_vcf))
+        contig_rank = {contig: rank for rank, contig in enumerate(contigs)}
+        thal = _counted(_snp_records(thal_vcf, contig_rank, min_qual, min_depth), counts, "thaliana")
+        lyr = _counted(_snp_records(lyr_vcf, contig_rank, min_qual, min_depth), counts, "lyrata")
+
+        out.write("CHROM\tPOS\tThaliana\tLyrata\n")
+        t, l = next(thal, None), next(lyr, None)
+        while t is not None and l is not None:
+            if t[:2] < l[:2]:
+                t = next(thal, None)
+            elif t[:2] > l[:2]:
+                l = next(lyr, None)
+            else:
+                counts["shared"] += 1
+                rank, pos, chrom, thal_base, lyr_base = *t[:4], l[4]
+                if thal_base != lyr_base:
+                    out.write(f"{chrom}\t{pos}\t{thal_base}\t{lyr_base}\n")
+                    chrom_codes.append(rank)
+                    positions.append(pos - 1)
+                    thaliana += thal_base.encode()
+                    lyrata += lyr_base.encode()
+                t, l = next(thal, None), next(lyr, None)
+        # finish reading whichever file is left, for the counts
+        for _ in thal:
+            pass
+        for _ in lyr:
+            pass
+
+    counts["markers"] = len(positions)
+    chrom_codes = np.frombuffer(chrom_codes, dtype=np.int32)
+    ranks, starts = np.unique(chrom_codes, return_index=True)
+    np.savez(
+        binary_path,
+        chroms=np.array([contigs[r] for r in ranks], dtype=str),
+        offsets=np.append(starts, len(chrom_codes)).astype(np.int64),
+        positions=np.frombuffer(positions, dtype=np.int64),
+        thaliana=np.frombuffer(bytes(thaliana), dtype=np.uint8),
+        lyrata=np.frombuffer(bytes(lyrata), dtype=np.uint8),
+    )
+
+    print("🔍 Thal SNPs:", counts["thaliana"])
+    print("🔍 Lyra SNPs:", counts["lyrata"])
+    print("✅ Shared SNPs:", counts["shared"], f"({counts['markers']} with differing alleles)")
+    print(f"📁 Saved SNP marker table: {outname} (+ {binary_path})")
+    count(**counts)
+    return {**counts, "tsv": outname, "npz": binary_path}
 
 if __name__ == "__main__":
-    thaliana_vcf = "sim_thaliana.vcf"
-    lyrata_vcf = "sim_lyrata.vcf"
-    generate_snp_marker_table(thaliana_vcf, lyrata_vcf)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the SNP marker table from Thaliana and Lyrata calls.")
+    parser.add_argument("--thaliana", default="sim_thaliana.vcf", help="Thaliana VCF/BCF (coordinate-sorted)")
+    parser.add_argument("--lyrata", default="sim_lyrata.vcf", help="Lyrata VCF/BCF (coordinate-sorted)")
+    parser.add_argument("--out", default="snp_marker_table.tsv", help="Marker TSV (an .npz is written alongside)")
+    parser.add_argument("--min-qual", type=float, default=None, help="Minimum QUAL")
+    parser.add_argument("--min-depth", type=int, default=None, help="Minimum INFO/DP")
+    args = parser.parse_args()
+
+    generate_snp_marker_table(args.thaliana, args.lyrata, args.out,
+                              min_qual=args.min_qual, min_depth=args.min_depth)
 
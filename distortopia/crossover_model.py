@@ -0,0 +1,155 @@
+# distortopia/crossover_model.py
+
+import numpy as np
+import pandas as pd
+
+# Genome-wide average for A. thaliana, used when no recombination map is given.
+DEFAULT_CM_PER_MB = 4.0
+CROSSOVER_MODELS = ("single", "poisson", "gamma")
+
+
+def load_recombination_map(map_path):
+    """
+    Load a recombination-rate map.
+
+    The file is a TSV with columns CHROM, START, END (0-based, half-open) and
+    RATE (cM/Mb); intervals on a chromosome are assumed to be contiguous.
+    Returns {chrom: {"bounds": int64 physical boundaries,
+                     "cum_morgans": float64 cumulative distance at each bound}}.
+    """
+    df = pd.read_csv(map_path, sep="\t", dtype={"CHROM": str})
+    df = df.sort_values(["CHROM", "START"])
+
+    rec_map = {}
+    for chrom, rows in df.groupby("CHROM", sort=False):
+        starts = rows["START"].to_numpy(np.int64)
+        ends = rows["END"].to_numpy(np.int64)
+        morgans = (ends - starts) * rows["RATE"].to_numpy(np.float64) / 1e8
+        rec_map[chrom] = {
+            "bounds": np.append(starts, ends[-1]),
+            "cum_morgans": np.concatenate([[0.0], np.cumsum(morgans)]),
+        }
+    print(f"✅ Recombination map loaded for {len(rec_map)} chromosomes.")
+    return rec_map
+
+
+def build_genetic_maps(chrom_lengths, rec_map=None, cm_per_mb=DEFAULT_CM_PER_MB):
+    """
+    Build a cumulative genetic-distance index for every chromosome.
+
+    Chromosomes missing from rec_map get a uniform rate of cm_per_mb; mapped
+    chromosomes are padded with zero-rate flanks so they span [0, length].
+    """
+    genetic_maps = {}
+    for chrom, length in chrom_lengths.items():
+        if rec_map and chrom in rec_map:
+            bounds = rec_map[chrom]["bounds"]
+            cum = rec_map[chrom]["cum_morgans"]
+            if bounds[0] > 0:
+                bounds, cum = np.append(0, bounds), np.append(0.0, cum)
+            if bounds[-1] < length:
+                bounds, cum = np.append(bounds, length), np.append(cum, cum[-1])
+        else:
+            bounds = np.array([0, length], dtype=np.int64)
+            cum = np.array([0.0, length * cm_per_mb / 1e8])
+        genetic_maps[chrom] = {"bounds": bounds, "cum_morgans": cum, "length": length}
+    return genetic_maps
+
+
+def morgans_to_physical(genetic_map, morgans):
+    """Convert genetic positions (Morgans) to 0-based physical positions."""
+    cum = genetic_map["cum_morgans"]
+    bounds = genetic_map["bounds"]
+    idx = np.clip(np.searchsorted(cum, morgans, side="right") - 1, 0, len(cum) - 2)
+    span = cum[idx + 1] - cum[idx]
+    frac = np.divide(morgans - cum[idx], span, out=np.zeros_like(morgans), where=span > 0)
+    physical = bounds[idx] + frac * (bounds[idx + 1] - bounds[idx])
+    return np.minimum(physical.astype(np.int64), max(genetic_map["length"] - 1, 0))
+
+
+def physical_to_morgans(genetic_map, positions):
+    """Convert physical positions to cumulative genetic positions (Morgans)."""
+    return np.interp(positions, genetic_map["bounds"], genetic_map["cum_morgans"])
+
+
+def _gamma_chiasmata(length_m, num_reps, interference, rng):
+    """
+    Sample chiasma positions (Morgans) for num_reps meioses at once.
+
+    Chiasmata follow a stationary gamma renewal process with shape
+    `interference` and mean spacing 1/2 Morgan. The first point is a uniform
+    fraction of a length-biased (shape + 1) gap, which makes the process
+    stationary from position 0 without a burn-in.
+    Returns a (num_reps, k) matrix, increasing along each row.
+    """
+    scale = 1.0 / (2.0 * interference)
+    k = int(2 * length_m + 4 * np.sqrt(2 * length_m + 1)) + 2
+    first = rng.random(num_reps) * rng.gamma(interference + 1, scale, size=num_reps)
+    gaps = rng.gamma(interference, scale, size=(num_reps, k - 1))
+    points = np.concatenate([first[:, None], first[:, None] + np.cumsum(gaps, axis=1)], axis=1)
+    while (points[:, -1] < length_m).any():
+        extra = np.cumsum(rng.gamma(interference, scale, size=(num_reps, k)), axis=1)
+        points = np.concatenate([points, points[:, -1:] + extra], axis=1)
+    return points
+
+
+def sample_crossovers(genetic_maps, num_reps, rng=None, model="poisson", interference=1.0):
+    """
+    Sample crossover breakpoints for num_reps gametes on every chromosome.
+
+    Models:
+        single:  legacy behaviour; at most one crossover (p = 0.5) per chromosome.
+        poisson: Poisson number of crossovers with mean equal to the map length.
+        gamma:   gamma-renewal chiasmata with shape `interference` (1 = no
+                 interference), each kept in the gamete with probability 1/2.
+
+    Counts and positions are drawn for all replicates in one call per
+    chromosome. Returns {chrom: {"offsets": int64 (num_reps + 1,),
+    "breakpoints": int64 physical positions, sorted within each replicate,
+    "start_parent": uint8 (num_reps,)}}, where replicate r owns
+    breakpoints[offsets[r]:offsets[r + 1]].
+    """
+    if model not in CROSSOVER_MODELS:
+        raise ValueError(f"Unknown crossover model {model!r}; choose from {CROSSOVER_MODELS}.")
+    if interference <= 0:
+        raise ValueError("interference must be positive.")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    chroms = list(genetic_maps)
+    lengths_m = np.array([genetic_maps[c]["cum_morgans"][-1] for c in chroms])
+    start_parent = rng.integers(0, 2, size=(num_reps, len(chroms)), dtype=np.uint8)
+    if model == "single":
+        counts = rng.binomial(1, 0.5, size=(num_reps, len(chroms)))
+    elif model == "poisson":
+        counts = rng.poisson(lengths_m, size=(num_reps, len(chroms)))
+
+    crossovers = {}
+    for j, chrom in enumerate(chroms):
+        if model == "gamma":
+            points = _gamma_chiasmata(lengths_m[j], num_reps, interference, rng)
+            keep = (points < lengths_m[j]) & (rng.random(points.shape) < 0.5)
+            chrom_counts = keep.sum(axis=1)
+            morgans = points[keep]  # row-major, so already sorted per replicate
+        else:
+            chrom_counts = counts[:, j]
+            rep_idx = np.repeat(np.arange(num_reps), chrom_counts)
+            morgans = rng.random(len(rep_idx)) * lengths_m[j]
+            morgans = morgans[np.lexsort((morgans, rep_idx))]
+
+        crossovers[chrom] = {
+            "offsets": np.concatenate([[0], np.cumsum(chrom_counts)]).astype(np.int64),
+            "breakpoints": morgans_to_physical(genetic_maps[chrom], morgans),
+            "start_parent": start_parent[:, j],
+        }
+    return crossovers
+
+
+def gamete_crossovers(crossovers, rep):
+    """Slice one replicate out of a sample_crossovers batch."""
+    return {
+        chrom: {
+            "breakpoints": batch["breakpoints"][batch["offsets"][rep]:batch["offsets"][rep + 1]],
+            "start_parent": int(batch["start_parent"][rep]),
+        }
+        for chrom, batch in crossovers.items()
+    }
@@ -0,0 +1,171 @@
+# distortopia/crossover_writer.py
+
+import os
+import shutil
+
+import pandas as pd
+
+READ_COLUMNS = ["qname", "chrom", "start", "end", "length", "pattern", "num_crossovers"]
+BREAKPOINT_COLUMNS = ["read_id", "chrom", "left_marker", "right_marker", "posterior"]
+
+_DTYPES = {
+    "qname": "str", "chrom": "str", "pattern": "str", "read_id": "str",
+    "start": "int64", "end": "int64", "length": "int64", "num_crossovers": "int32",
+    "left_marker": "int64", "right_marker": "int64", "posterior": "float64",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+def is_parquet(path):
+    return path.endswith((".parquet", ".pq"))
+
+
+def breakpoints_path_for(output_path):
+    """Default breakpoint table next to the read table: calls.tsv -> calls.breakpoints.tsv."""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}.breakpoints{ext or '.tsv'}"
+
+
+class _Table:
+    """One output table, TSV or Parquet, written a chunk of rows at a time."""
+
+    def __init__(self, path, columns, header=True):
+        self.path = path
+        self.columns = columns
+        self.parquet = is_parquet(path)
+        if self.parquet:
+            pa = _pyarrow()
+            types = {"str": pa.string(), "int64": pa.int64(), "int32": pa.int32(), "float64": pa.float64()}
+            self.schema = pa.schema([(c, types[_DTYPES[c]]) for c in columns])
+            self.writer = pa.parquet.ParquetWriter(path, self.schema)
+        else:
+            self.writer = open(path, "w")
+            if header:
+                self.writer.write("\t".join(columns) + "\n")
+
+    def write_rows(self, rows):
+        """Write a list of row tuples ordered like self.columns."""
+        if not rows:
+            return
+        if self.parquet:
+            pa = _pyarrow()
+            arrays = [pa.array(col, type=field.type) for col, field in zip(zip(*rows), self.schema)]
+            self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        else:
+            self.writer.writelines("\t".join(map(str, row)) + "\n" for row in rows)
+
+    def append_shard(self, shard_path):
+        """Append a header-less shard written by another _Table with the same layout."""
+        if self.parquet:
+            pa = _pyarrow()
+            shard = pa.parquet.ParquetFile(shard_path)
+            for i in range(shard.num_row_groups):
+                self.writer.write_table(shard.read_row_group(i))
+        else:
+            with open(shard_path) as part:
+                shutil.copyfileobj(part, self.writer)
+
+    def close(self):
+        self.writer.close()
+
+
+class CrossoverWriter:
+    """
+    Stream classified reads to a read table and a normalized breakpoint table.
+
+    Records from classify_read are buffered and written every chunk_size
+    reads, so memory stays flat however many reads the BAM holds. The read
+    table has one row per read (READ_COLUMNS); each crossover becomes a row
+    of the breakpoint table (BREAKPOINT_COLUMNS), keyed by the read's qname
+    and bounded by 1-based marker positions, with the caller's posterior
+    probability (NaN when the caller has none).
+    Output is Parquet when the path ends in .parquet (requires pyarrow),
+    otherwise TSV.
+
+    Args:
+        output_path (str): Read table path
+        breakpoints_path (str): Breakpoint table path (default: <output>.breakpoints.<ext>)
+        chunk_size (int): Reads buffered between writes
+        header (bool): Write the TSV header line (False for shards)
+    """
+
+    def __init__(self, output_path, breakpoints_path=None, chunk_size=10_000, header=True):
+        self.output_path = output_path
+        self.breakpoints_path = breakpoints_path or breakpoints_path_for(output_path)
+        self.chunk_size = chunk_size
+        self.reads = _Table(output_path, READ_COLUMNS, header)
+        self.breakpoints = _Table(self.breakpoints_path, BREAKPOINT_COLUMNS, header)
+        self._read_rows, self._breakpoint_rows = [], []
+        self.num_reads = 0
+        self.num_breakpoints = 0
+
+    def write(self, record):
+        breakpoints = record["breakpoints"]
+        self._read_rows.append((record["qname"], record["chrom"], record["start"], record["end"],
+                                record["length"], record["pattern"], len(breakpoints)))
+        self._breakpoint_rows.extend((record["qname"], record["chrom"], *breakpoint)
+                                     for breakpoint in breakpoints)
+        if len(self._read_rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        self.reads.write_rows(self._read_rows)
+        self.breakpoints.write_rows(self._breakpoint_rows)
+        self.num_reads += len(self._read_rows)
+        self.num_breakpoints += len(self._breakpoint_rows)
+        self._read_rows, self._breakpoint_rows = [], []
+
+    def append_shard(self, reads_path, breakpoints_path, num_reads=0, num_breakpoints=0):
+        """Append (then delete) the tables of a closed, header-less shard writer."""
+        self.flush()
+        for table, path in ((self.reads, reads_path), (self.breakpoints, breakpoints_path)):
+            table.append_shard(path)
+            os.remove(path)
+        self.num_reads += num_reads
+        self.num_breakpoints += num_breakpoints
+
+    def close(self):
+        self.flush()
+        self.reads.close()
+        self.breakpoints.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _load(path, columns):
+    if is_parquet(path):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, sep="\t", dtype={c: _DTYPES[c] for c in columns}, usecols=columns)
+
+
+def iter_table_chunks(path, columns, chunk_size=1_000_000):
+    """Yield a read or breakpoint table as DataFrames of at most chunk_size rows."""
+    if is_parquet(path):
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, sep="\t", dtype={c: _DTYPES[c] for c in columns},
+                               usecols=columns, chunksize=chunk_size)
+
+
+def load_crossover_reads(path, columns=None):
+    """Load a read table written by CrossoverWriter (optionally only some columns)."""
+    return _load(path, columns or READ_COLUMNS)
+
+
+def load_breakpoints(path):
+    """Load a breakpoint table written by CrossoverWriter."""
+    return _load(path, BREAKPOINT_COLUMNS)
@@ -1,101 +1,487 @@
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 import pysam
-from collections import defaultdict
+
+from distortopia.crossover_model import build_genetic_maps, load_recombination_map, physical_to_morgans
+from distortopia.crossover_writer import CrossoverWriter, is_parquet
+from distortopia.hmm_segmenter import base_errors, segment_reads
+from distortopia.instrumentation import count, set_report, timed
+from distortopia.scheduler import get_scheduler
+
+CROSSOVER_METHODS = ("hmm", "switch")
 
 def load_snp_markers(marker_table_path):
-    df = pd.read_csv(marker_table_path, sep="\t")
+    """
+    Load the SNP marker table as a sorted array index per chromosome.
+
+    Returns {chrom: {"positions": int64 0-based positions (sorted),
+                     "ref_alleles": uint8 Thaliana bases,
+                     "alt_alleles": uint8 Lyrata bases}}.
+    A .npz from compare_variants.generate_snp_marker_table is already in
+    this layout and is sliced per chromosome without parsing.
+    """
+    if marker_table_path.endswith(".npz"):
+        with np.load(marker_table_path) as npz:
+            chroms, offsets = npz["chroms"], npz["offsets"]
+            positions, thaliana, lyrata = npz["positions"], npz["thaliana"], npz["lyrata"]
+        snp_info = {
+            str(chrom): {
+                "positions": positions[lo:hi],
+                "ref_alleles": thaliana[lo:hi],
+                "alt_alleles": lyrata[lo:hi],
+            }
+            for chrom, lo, hi in zip(chroms, offsets[:-1], offsets[1:])
+        }
+        print("✅ SNP marker index loaded.")
+        return snp_info
+
+    df = pd.read_csv(marker_table_path, sep="\t", dtype={"CHROM": str, "POS": np.int64})
 
     # 🔥 Normalize CHROM format to match RefSeq (e.g., NC_003070.9)
     df["CHROM"] = df["CHROM"].astype(str)
+    df = df.sort_values(["CHROM", "POS"], kind="stable")
 
-    grouped = df.groupby("CHROM")
-    snp_info = {
-        chrom: set(positions_df["POS"].values)
-        for chrom, positions_df in grouped
-    }
-    print("✅ SNP marker table loaded and grouped by chromosome.")
+    snp_info = {}
+    for chrom, chrom_df in df.groupby("CHROM", sort=False):
+        snp_info[chrom] = {
+            "positions": chrom_df["POS"].to_numpy(np.int64) - 1,  # VCF is 1-based
+            "ref_alleles": _allele_bytes(chrom_df["Thaliana"]),
+            "alt_alleles": _allele_bytes(chrom_df["Lyrata"]),
+        }
+    print("✅ SNP marker table loaded and indexed by chromosome.")
     return snp_info
 
-def classify_read(read, snp_info):
-    """Classify read by comparing its sequence to SNP alleles and detect crossover blocks."""
-    read_seq = read.query_sequence
-    read_start = read.reference_start
-    read_chrom = read.reference_name
-    read_pos = read.get_reference_positions()
+def _allele_bytes(alleles):
+    """First base of each allele as an upper-case uint8 array."""
+    return np.frombuffer("".join(a[0] for a in alleles.astype(str).str.upper()).encode(), dtype=np.uint8)
+
+# CIGAR op classes indexed by op code (M, I, D, N, S, H, P, =, X, B)
+_CONSUMES_REF = np.array([1, 0, 1, 1, 0, 0, 0, 1, 1, 0], dtype=bool)
+_CONSUMES_QUERY = np.array([1, 1, 0, 0, 1, 0, 0, 1, 1, 0], dtype=bool)
+_ALIGNED = np.array([1, 0, 0, 0, 0, 0, 0, 1, 1, 0], dtype=bool)
+
+def marker_query_indices(read, marker_positions):
+    """
+    Map sorted 0-based reference positions to query offsets by walking the CIGAR.
+
+    Each CIGAR op's reference and query start are computed with cumulative
+    sums, and each marker is placed in its op with one searchsorted. No
+    per-base position list is built, so the cost depends on the number of
+    CIGAR ops and markers, not on the read length. Markers in deletions,
+    reference skips or outside the alignment get -1; soft clips and
+    insertions shift query offsets but never cover a marker.
+    """
+    cigar = np.asarray(read.cigartuples, dtype=np.int64).reshape(-1, 2)
+    ops, lengths = cigar[:, 0], cigar[:, 1]
+    ref_len = np.where(_CONSUMES_REF[ops], lengths, 0)
+    query_len = np.where(_CONSUMES_QUERY[ops], lengths, 0)
+    ref_end = read.reference_start + np.cumsum(ref_len)
+    ref_start = ref_end - ref_len
+    query_start = np.cumsum(query_len) - query_len
+
+    op_idx = np.searchsorted(ref_end, marker_positions, side="right")
+    inside = op_idx < len(ops)
+    op_idx = np.minimum(op_idx, len(ops) - 1)
+    aligned = inside & _ALIGNED[ops[op_idx]] & (marker_positions >= ref_start[op_idx])
+    return np.where(aligned, query_start[op_idx] + marker_positions - ref_start[op_idx], -1)
+
+def extract_marker_alleles(read, marker_positions):
+    """
+    Return (covered, bases, quals) for sorted markers overlapping a read.
+
+    covered is a bool mask over marker_positions; bases (uint8) and quals
+    (uint8 Phred, or None when the read has no qualities) hold one entry per
+    covered marker.
+    """
+    query_idx = marker_query_indices(read, marker_positions)
+    covered = query_idx >= 0
+    query_idx = query_idx[covered]
+    bases = np.frombuffer(read.query_sequence.encode(), dtype=np.uint8)[query_idx]
+    qualities = read.query_qualities
+    quals = None if qualities is None else np.frombuffer(qualities, dtype=np.uint8)[query_idx]
+    return covered, bases, quals
 
-    markers = snp_info.get(read_chrom)
+class MarkerCounters:
+    """
+    Read and marker tallies for detect_crossovers(counters=True).
+
+    reads counts every read by outcome: filtered (unmapped, secondary or
+    supplementary), off_markers (no marker in its span), uncovered (its
+    markers all fall in deletions) or classified. For each marker, alleles
+    counts the reads showing the Thaliana base, the Lyrata base or neither.
+    Only the range of marker indices touched is stored per chromosome, so a
+    window's counters stay small when returned from a worker.
+    """
+
+    READ_OUTCOMES = ("filtered", "off_markers", "uncovered", "classified")
+    ALLELE_COLUMNS = ("thaliana", "lyrata", "other")
+
+    def __init__(self):
+        self.reads = dict.fromkeys(self.READ_OUTCOMES, 0)
+        self.alleles = {}   # chrom -> (first marker index, int64 array (n, 3))
+
+    def _range(self, chrom, lo, hi):
+        """Counts array of chrom, grown to cover marker indices [lo, hi), and its first index."""
+        first, counts = self.alleles.get(chrom, (lo, np.zeros((0, 3), np.int64)))
+        if lo < first or hi > first + len(counts):
+            new_first = min(lo, first)
+            # reads arrive in coordinate order, so leave room to grow upwards
+            new_end = max(hi, first + len(counts), new_first + 2 * len(counts))
+            grown = np.zeros((new_end - new_first, 3), np.int64)
+            grown[first - new_first:first - new_first + len(counts)] = counts
+            first, counts = new_first, grown
+            self.alleles[chrom] = (first, counts)
+        return first, counts
+
+    def add_read(self, chrom, lo, covered, alleles):
+        """Tally a classified read's alleles (T/L/N codes) at markers lo + flatnonzero(covered)."""
+        self.reads["classified"] += 1
+        idx = lo + np.flatnonzero(covered)
+        first, counts = self._range(chrom, idx[0], idx[-1] + 1)
+        column = np.where(alleles == ord("T"), 0, np.where(alleles == ord("L"), 1, 2))
+        counts[idx - first, column] += 1   # indices are unique within a read
+
+    def merge(self, other):
+        for outcome, n in other.reads.items():
+            self.reads[outcome] += n
+        for chrom, (lo, counts) in other.alleles.items():
+            first, mine = self._range(chrom, lo, lo + len(counts))
+            mine[lo - first:lo - first + len(counts)] += counts
+        return self
+
+    def totals(self):
+        """Read outcomes and allele observations summed over all markers."""
+        allele_sums = sum((counts.sum(axis=0) for _, counts in self.alleles.values()), np.zeros(3, np.int64))
+        return {**{f"reads_{k}": v for k, v in self.reads.items()},
+                **{f"calls_{k}": int(n) for k, n in zip(self.ALLELE_COLUMNS, allele_sums)}}
+
+    def to_frame(self, snp_info):
+        """One row per marker (CHROM, POS 1-based, thaliana, lyrata, other, depth), zeros where unseen."""
+        frames = []
+        for chrom, markers in snp_info.items():
+            counts = np.zeros((len(markers["positions"]), 3), np.int64)
+            if chrom in self.alleles:
+                first, seen = self.alleles[chrom]
+                end = min(first + len(seen), len(counts))
+                counts[first:end] = seen[:end - first]
+            frame = pd.DataFrame(counts, columns=self.ALLELE_COLUMNS)
+            frame.insert(0, "POS", markers["positions"] + 1)
+            frame.insert(0, "CHROM", chrom)
+            frames.append(frame)
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["CHROM", "POS", *self.ALLELE_COLUMNS])
+        table["depth"] = table[list(self.ALLELE_COLUMNS)].sum(axis=1)
+        return table
+
+def marker_counts_path_for(output_path):
+    """Per-marker counter table next to the read table: calls.tsv -> calls.marker_counts.tsv."""
+    return f"{os.path.splitext(output_path)[0]}.marker_counts.tsv"
+
+def classify_read(read, snp_info, genetic_maps=None, counters=None):
+    """
+    Classify read by comparing its sequence to SNP alleles and detect crossover blocks.
+
+    Without genetic_maps every T<->L switch is a breakpoint. With them, the
+    record carries the read's informative-marker "observations" instead, and
+    its breakpoints are left for segment_reads to fill in. With counters (a
+    MarkerCounters), the read's outcome and marker alleles are tallied.
+    """
+    markers = snp_info.get(read.reference_name)
     if not markers:
+        if counters is not None:
+            counters.reads["off_markers"] += 1
+        return None
+
+    # Only markers inside the aligned span can be observed
+    positions = markers["positions"]
+    lo, hi = np.searchsorted(positions, [read.reference_start, read.reference_end])
+    if lo == hi:
+        if counters is not None:
+            counters.reads["off_markers"] += 1
         return None
+    snp_pos = positions[lo:hi]
 
-    pattern = []
-    crossover_positions = []
-    prev = None
-
-    for snp_pos, ref_base, alt_base in zip(markers["positions"], markers["ref_alleles"], markers["alt_alleles"]):
-        if snp_pos in read_pos:
-            read_index = read_pos.index(snp_pos)
-            base = read_seq[read_index]
-            if base == ref_base:
-                allele = "T"
-            elif base == alt_base:
-                allele = "L"
-            else:
-                allele = "N"
-            pattern.append(allele)
-
-            if prev and allele != prev and allele in "TL" and prev in "TL":
-                crossover_positions.append((read.reference_name, snp_pos))
-            prev = allele
-
-    if not pattern:
+    covered, bases, quals = extract_marker_alleles(read, snp_pos)
+    if not covered.any():
+        if counters is not None:
+            counters.reads["uncovered"] += 1
         return None
 
-    print(f"🔬 Pattern for read {read.query_name}: {''.join(pattern)} with {len(crossover_positions)} crossovers")
+    ref_base = markers["ref_alleles"][lo:hi][covered]
+    alt_base = markers["alt_alleles"][lo:hi][covered]
+    alleles = np.where(bases == ref_base, ord("T"), np.where(bases == alt_base, ord("L"), ord("N")))
+    if counters is not None:
+        counters.add_read(read.reference_name, lo, covered, alleles)
+    pattern = alleles.astype(np.uint8).tobytes().decode()
 
-    return {
+    informative = alleles != ord("N")
+    observed = snp_pos[covered][informative]
+    calls = alleles[informative] == ord("L")
+    record = {
         "qname": read.query_name,
         "chrom": read.reference_name,
         "start": read.reference_start,
         "end": read.reference_end,
         "length": read.reference_length,
-        "pattern": "".join(pattern),
-        "crossovers": crossover_positions,
+        "pattern": pattern,
     }
 
-def detect_crossovers(bam_path, marker_table_path, output_path="crossovers.tsv"):
-    snp_info = load_snp_markers(marker_table_path)
-    bam = pysam.AlignmentFile(bam_path, "rb")
+    if genetic_maps is not None:
+        record["observations"] = {
+            "positions": observed + 1,
+            "calls": calls,
+            "errors": None if quals is None else base_errors(quals[informative]),
+            "morgans": physical_to_morgans(genetic_maps[read.reference_name], observed),
+        }
+        return record
+
+    # a crossover is a T<->L switch between adjacent informative markers;
+    # it lies between the two, reported as 1-based (left, right) marker positions
+    switch = np.flatnonzero(calls[1:] != calls[:-1])
+    record["breakpoints"] = [(left, right, float("nan")) for left, right in
+                             zip((observed[switch] + 1).tolist(), (observed[switch + 1] + 1).tolist())]
+    return record
+
+def _segment(records, credible):
+    """Fill in HMM breakpoints for a batch of records from classify_read(genetic_maps=...)."""
+    breakpoints = segment_reads([r.pop("observations") for r in records], credible)
+    for record, read_breakpoints in zip(records, breakpoints):
+        record["breakpoints"] = read_breakpoints
+    return records
+
+def _iter_classified(bam, snp_info, region=None, genetic_maps=None, credible=0.95, batch_size=1024,
+                     counters=None):
+    """
+    Yield classifications of primary mapped reads.
 
-    results = []
-    for read in bam.fetch(until_eof=True):
+    With region=(chrom, start, end), only reads whose alignment starts in
+    [start, end) are kept, so a read spanning a window boundary is counted
+    exactly once, by the window it starts in. With genetic_maps, reads are
+    segmented by the HMM batch_size at a time. counters (a MarkerCounters)
+    tallies every read considered.
+    """
+    if region is None:
+        reads = bam.fetch(until_eof=True)
+    else:
+        chrom, start, end = region
+        reads = (r for r in bam.fetch(chrom, start, end) if start <= r.reference_start < end)
+    batch = []
+    for read in reads:
         if read.is_unmapped or read.is_secondary or read.is_supplementary:
+            if counters is not None:
+                counters.reads["filtered"] += 1
+            continue
+        classification = classify_read(read, snp_info, genetic_maps, counters)
+        if not classification:
+            continue
+        if genetic_maps is None:
+            yield classification
             continue
-        classification = classify_read(read, snp_info)
-        if classification:
-            results.append(classification)
+        batch.append(classification)
+        if len(batch) >= batch_size:
+            yield from _segment(batch, credible)
+            batch = []
+    if batch:
+        yield from _segment(batch, credible)
 
-    bam.close()
+def marker_regions(bam, snp_info, window_size=None):
+    """
+    Windows [(chrom, start, end)] (0-based, half-open) in BAM header order.
 
-    print(f"📦 Total classified reads: {len(results)}")
+    Only contigs with markers are included; with window_size they are cut
+    into windows of at most that many bases.
+    """
+    regions = []
+    for chrom, length in zip(bam.references, bam.lengths):
+        if chrom not in snp_info:
+            continue
+        step = window_size or length
+        regions.extend((chrom, start, min(start + step, length)) for start in range(0, length, step))
+    return regions
 
-    df = pd.DataFrame(results)
+def _count_outside_regions(bam, snp_info, counters):
+    """
+    Tally the reads marker_regions never visits, as a serial run would.
 
-    if not df.empty and "crossovers" in df.columns:
-        df["num_crossovers"] = df["crossovers"].apply(lambda x: len(x))
-    else:
+    Those are reads on contigs without markers (off_markers, or filtered when
+    secondary/supplementary/unmapped) and unplaced unmapped reads (filtered,
+    taken from the index without reading them).
+    """
+    for chrom in bam.references:
+        if chrom in snp_info:
+            continue
+        for read in bam.fetch(chrom):
+            outcome = "filtered" if read.is_unmapped or read.is_secondary or read.is_supplementary else "off_markers"
+            counters.reads[outcome] += 1
+    counters.reads["filtered"] += bam.nocoordinate
+
+# Per-worker state, set once by _init_worker
+_worker_bam = None
+_worker_snp_info = None
+_worker_options = None
+_worker_counters = False
+
+def _init_worker(bam_path, snp_info, options, counters=False):
+    """Open a private AlignmentFile and keep the marker index for this worker's lifetime."""
+    global _worker_bam, _worker_snp_info, _worker_options, _worker_counters
+    _worker_bam = pysam.AlignmentFile(bam_path, "rb")
+    _worker_snp_info = snp_info
+    _worker_options = options
+    _worker_counters = counters
+
+def _detect_region(region, reads_path, breakpoints_path):
+    """
+    Classify one window's reads into header-less shard tables.
+
+    Returns the row counts and the window's MarkerCounters (None unless counting).
+    """
+    counters = MarkerCounters() if _worker_counters else None
+    with CrossoverWriter(reads_path, breakpoints_path, header=False) as writer:
+        for record in _iter_classified(_worker_bam, _worker_snp_info, region, counters=counters,
+                                       **_worker_options):
+            writer.write(record)
+    return writer.num_reads, writer.num_breakpoints, counters
+
+@timed("detect_crossovers")
+def detect_crossovers(bam_path, marker_table_path, output_path="crossovers.tsv",
+                      workers=1, window_size=None, breakpoints_path=None, chunk_size=10_000,
+                      method="switch", rec_map_path=None, credible=0.95, counters=False):
+    """
+    Classify F1 reads against the SNP markers and stream the calls to disk.
+
+    Reads are written in chunks of chunk_size to output_path (one row per
+    read, with num_crossovers) and each crossover to a normalized breakpoint
+    table (read_id, chrom, left_marker, right_marker), so memory does not
+    grow with the BAM. Paths ending in .parquet write Parquet (needs pyarrow).
+
+    method="switch" (the default) calls a breakpoint at every T<->L flip
+    between adjacent informative markers. method="hmm" segments each read
+    with a two-state HMM that weighs every marker by its base quality and
+    uses the genetic distance between markers (from rec_map_path, or a
+    uniform default rate) as the switch prior; each breakpoint is the marker
+    interval holding `credible` posterior probability, with that probability.
+
+    By default the BAM is read serially in this process. With workers > 1
+    (or workers=None) the indexed BAM is split into windows (whole chromosomes
+    unless window_size is given). Each worker process opens its own BAM
+    handle, classifies its windows and writes shards, which are appended to
+    the outputs in genome order, so the result, including counters, matches
+    a serial run. The
+    workers are reserved from the process-wide scheduler (the "python"
+    profile), so concurrent detections and external tools wait for cores
+    instead of oversubscribing the machine.
+
+    With counters=True, every read is tallied by outcome and every marker by
+    the alleles observed on it (see MarkerCounters). The per-marker table is
+    written to <output>.marker_counts.tsv and the totals go to the run
+    report; this costs a little time per read, so it is off by default.
+
+    Args:
+        bam_path (str): Sorted BAM of F1 reads (indexed when workers > 1)
+        marker_table_path (str): SNP marker table (from compare_variants.py)
+        output_path (str): Read table (.tsv or .parquet)
+        workers (int): Worker processes; 1 (default) reads the BAM serially in this
+            process, None takes as many as the scheduler grants
+        window_size (int): Maximum window length in bases (default: whole chromosomes)
+        breakpoints_path (str): Breakpoint table (default: <output>.breakpoints.<ext>)
+        chunk_size (int): Reads buffered between writes
+        method (str): "switch" (default) or "hmm"
+        rec_map_path (str): Recombination map TSV for the HMM (CHROM, START, END, RATE)
+        credible (float): Posterior mass each HMM breakpoint interval must hold
+        counters (bool): Tally reads and per-marker allele observations
+
+    Returns:
+        MarkerCounters: The tallies when counters=True, else None
+    """
+    if method not in CROSSOVER_METHODS:
+        raise ValueError(f"Unknown crossover method {method!r}; choose from {CROSSOVER_METHODS}.")
+    if workers != 1:
+        with pysam.AlignmentFile(bam_path, "rb") as bam:
+            if not bam.has_index():
+                raise ValueError(f"Parallel crossover detection needs an indexed BAM; run "
+                                 f"`samtools index {bam_path}` or pass workers=1.")
+    snp_info = load_snp_markers(marker_table_path)
+
+    options = {}
+    if method == "hmm":
+        rec_map = load_recombination_map(rec_map_path) if rec_map_path else None
+        with pysam.AlignmentFile(bam_path, "rb") as bam:
+            lengths = {c: n for c, n in zip(bam.references, bam.lengths) if c in snp_info}
+        options = {"genetic_maps": build_genetic_maps(lengths, rec_map), "credible": credible}
+
+    tallies = MarkerCounters() if counters else None
+    # the worker processes take cores from the shared budget like any external tool
+    with get_scheduler().reserve(("python", workers)) as (allocation,), \
+            CrossoverWriter(output_path, breakpoints_path, chunk_size) as writer:
+        workers = allocation.threads
+        if workers <= 1:
+            with pysam.AlignmentFile(bam_path, "rb") as bam:
+                for record in _iter_classified(bam, snp_info, counters=tallies, **options):
+                    writer.write(record)
+        else:
+            with pysam.AlignmentFile(bam_path, "rb") as bam:
+                regions = marker_regions(bam, snp_info, window_size)
+                if tallies is not None:
+                    _count_outside_regions(bam, snp_info, tallies)
+            print(f"🧵 Detecting crossovers in {len(regions)} regions on {workers} workers")
+
+            ext = ".parquet" if is_parquet(output_path) else ".tsv"
+            shard_dir = tempfile.mkdtemp(prefix="crossover_shards_", dir=os.path.dirname(os.path.abspath(output_path)))
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(bam_path, snp_info, options, counters)) as pool:
+                    shards = [(os.path.join(shard_dir, f"{i:06d}.reads{ext}"),
+                               os.path.join(shard_dir, f"{i:06d}.breakpoints{ext}"))
+                              for i in range(len(regions))]
+                    futures = [pool.submit(_detect_region, region, *shard)
+                               for region, shard in zip(regions, shards)]
+                    for future, shard in zip(futures, shards):
+                        num_reads, num_breakpoints, window_tallies = future.result()
+                        writer.append_shard(*shard, num_reads, num_breakpoints)
+                        if tallies is not None:
+                            tallies.merge(window_tallies)
+            finally:
+                shutil.rmtree(shard_dir, ignore_errors=True)
+
+    count(reads=writer.num_reads, crossovers=writer.num_breakpoints)
+    print(f"📦 Total classified reads: {writer.num_reads} ({writer.num_breakpoints} crossovers)")
+    if writer.num_reads == 0:
         print("⚠️ No reads with crossover information found.")
-        df["num_crossovers"] = 0
+    print(f"✅ Crossover detection complete. Results saved to {output_path} and {writer.breakpoints_path}.")
 
-    df.to_csv(output_path, sep="\t", index=False)
-    print(f"✅ Crossover detection complete. Results saved to {output_path}.")
+    if tallies is not None:
+        counts_path = marker_counts_path_for(output_path)
+        tallies.to_frame(snp_info).to_csv(counts_path, sep="\t", index=False)
+        count(**tallies.totals())
+        print(f"🔢 Read outcomes: {tallies.reads}. Per-marker allele counts saved to {counts_path}.")
+    return tallies
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Detect crossovers from BAM file using SNP marker table.")
     parser.add_argument("--bam", required=True, help="Path to F1 BAM file.")
     parser.add_argument("--markers", required=True, help="Path to SNP marker table (from compare_variants.py).")
-    parser.add_argument("--out", default="crossovers.tsv", help="Output path for crossover TSV.")
+    parser.add_argument("--out", default="crossovers.tsv", help="Output path for per-read calls (.tsv or .parquet).")
+    parser.add_argument("--breakpoints", default=None, help="Output path for the breakpoint table (default: <out>.breakpoints.<ext>).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (needs an indexed BAM when > 1).")
+    parser.add_argument("--window-size", type=int, default=None, help="Split chromosomes into windows of this many bases.")
+    parser.add_argument("--method", choices=CROSSOVER_METHODS, default="switch", help="Breakpoint caller.")
+    parser.add_argument("--rec-map", default=None, help="Recombination map TSV (CHROM, START, END, RATE cM/Mb) for the HMM.")
+    parser.add_argument("--credible", type=float, default=0.95, help="Posterior mass of each HMM breakpoint interval.")
+    parser.add_argument("--counters", action="store_true", help="Tally read outcomes and per-marker alleles (<out>.marker_counts.tsv).")
+    parser.add_argument("--report", default=None, help="Append timing and resource records to this JSON-lines report.")
     args = parser.parse_args()
 
-    detect_crossovers(args.bam, args.markers, args.out)
+    if args.report:
+        set_report(args.report)
+
+    detect_crossovers(args.bam, args.markers, args.out, workers=args.workers,
+                      window_size=args.window_size, breakpoints_path=args.breakpoints,
+                      method=args.method, rec_map_path=args.rec_map, credible=args.credible,
+                      counters=args.counters)
 
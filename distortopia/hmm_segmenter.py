@@ -0,0 +1,148 @@
+# distortopia/hmm_segmenter.py
+
+import numpy as np
+
+# Error rate assumed for bases without a quality, and the floor applied to
+# reported qualities (long-read Phred scores are optimistic).
+DEFAULT_ERROR = 0.05
+MIN_ERROR = 0.005
+# Ceiling: at 0.75 a call is uninformative (a match is as likely as any of the
+# three mismatches); above it, e.g. Q0-Q1, a mismatch would outscore a match.
+MAX_ERROR = 0.75
+
+
+def haldane(morgans):
+    """Recombination fraction for a genetic distance in Morgans (Haldane map)."""
+    return 0.5 * (1.0 - np.exp(-2.0 * np.asarray(morgans)))
+
+
+def base_errors(quals, min_error=MIN_ERROR, max_error=MAX_ERROR):
+    """Per-base error probabilities from Phred qualities (None: DEFAULT_ERROR)."""
+    if quals is None:
+        return None
+    return np.clip(10.0 ** (-np.asarray(quals, dtype=np.float64) / 10.0), min_error, max_error)
+
+
+def _pad(observations, order, width):
+    """Stack a batch of reads into (n, width) matrices; padding is neutral."""
+    n = len(order)
+    emit = np.zeros((n, width, 2))        # log P(call | T), log P(call | L)
+    log_stay = np.zeros((n, width))       # padding: certain to stay ...
+    log_switch = np.full((n, width), -np.inf)  # ... and never switch
+    for row, i in enumerate(order):
+        calls, errors, morgans = observations[i]["calls"], observations[i]["errors"], observations[i]["morgans"]
+        k = len(calls)
+        errors = np.full(k, DEFAULT_ERROR) if errors is None else np.clip(errors, MIN_ERROR, MAX_ERROR)
+        match, mismatch = np.log1p(-errors), np.log(errors / 3.0)
+        emit[row, :k, 0] = np.where(calls, mismatch, match)
+        emit[row, :k, 1] = np.where(calls, match, mismatch)
+        r = np.clip(haldane(np.diff(morgans)), 1e-12, 0.5)
+        log_stay[row, 1:k] = np.log1p(-r)
+        log_switch[row, 1:k] = np.log(r)
+    return emit, log_stay, log_switch
+
+
+def segment_batch(emit, log_stay, log_switch):
+    """
+    Viterbi path and per-gap switch posteriors for a padded batch of reads.
+
+    States are 0 (Thaliana) and 1 (Lyrata) with an even prior. Column k of
+    log_stay/log_switch is the transition into marker k. The recursions run
+    along the marker axis and are vectorized over reads.
+
+    Returns:
+        paths (int8, n x width): most likely state at every marker
+        switch_post (float, n x width): P(state changes between k-1 and k | read)
+    """
+    n, width, _ = emit.shape
+    rows = np.arange(n)
+
+    # Viterbi
+    back = np.zeros((n, width, 2), dtype=np.int8)
+    delta = np.log(0.5) + emit[:, 0]
+    for k in range(1, width):
+        stay, switch = delta + log_stay[:, k, None], delta[:, ::-1] + log_switch[:, k, None]
+        back[:, k] = np.where(stay >= switch, [0, 1], [1, 0])
+        delta = np.maximum(stay, switch) + emit[:, k]
+    paths = np.zeros((n, width), dtype=np.int8)
+    paths[:, -1] = np.argmax(delta, axis=1)
+    for k in range(width - 1, 0, -1):
+        paths[:, k - 1] = back[rows, k, paths[:, k]]
+
+    # Forward-backward
+    alpha = np.empty((n, width, 2))
+    alpha[:, 0] = np.log(0.5) + emit[:, 0]
+    for k in range(1, width):
+        alpha[:, k] = np.logaddexp(alpha[:, k - 1] + log_stay[:, k, None],
+                                   alpha[:, k - 1, ::-1] + log_switch[:, k, None]) + emit[:, k]
+    beta = np.zeros((n, width, 2))
+    for k in range(width - 1, 0, -1):
+        ahead = emit[:, k] + beta[:, k]
+        beta[:, k - 1] = np.logaddexp(ahead + log_stay[:, k, None], ahead[:, ::-1] + log_switch[:, k, None])
+    log_z = np.logaddexp(alpha[:, -1, 0], alpha[:, -1, 1])
+
+    switch_post = np.zeros((n, width))
+    ahead = emit[:, 1:] + beta[:, 1:]
+    switch_post[:, 1:] = np.exp(np.logaddexp(alpha[:, :-1, 0] + ahead[..., 1],
+                                             alpha[:, :-1, 1] + ahead[..., 0])
+                                + log_switch[:, 1:] - log_z[:, None])
+    return paths, switch_post
+
+
+def _credible_interval(post, k, lower, upper, credible):
+    """Grow gap k towards the likelier neighbour (within lower..upper) until it holds `credible` mass."""
+    lo = hi = k
+    mass = post[k]
+    while mass < credible:
+        left = post[lo - 1] if lo - 1 > lower else -1.0
+        right = post[hi + 1] if hi + 1 < upper else -1.0
+        if left < 0 and right < 0:
+            break
+        if left >= right:
+            lo -= 1
+            mass += left
+        else:
+            hi += 1
+            mass += right
+    return lo, hi, min(mass, 1.0)
+
+
+def segment_reads(observations, credible=0.95, batch_size=1024):
+    """
+    Segment reads into Thaliana/Lyrata blocks with a two-state HMM.
+
+    Each observation is {"positions": 1-based marker positions, "calls": bool
+    (True = Lyrata allele), "errors": per-base error probabilities or None,
+    "morgans": genetic positions} over the read's informative markers. The
+    emission model uses the base error rate, and the transition between
+    adjacent markers is the Haldane recombination fraction of their genetic
+    distance, so an isolated miscalled base does not produce a crossover.
+
+    Reads are sorted by marker count and processed batch_size at a time, so
+    padding stays small. A breakpoint is reported for every switch in the
+    Viterbi path as the interval between flanking markers that carries at
+    least `credible` posterior switch probability (it never reaches into a
+    neighbouring breakpoint), together with that probability.
+
+    Returns:
+        list[list[tuple]]: [(left_marker, right_marker, posterior), ...] per read
+    """
+    results = [[] for _ in observations]
+    lengths = np.array([len(obs["calls"]) for obs in observations], dtype=np.int64)
+    order = np.argsort(lengths, kind="stable")
+    order = order[lengths[order] > 1]  # one marker cannot show a switch
+
+    for batch_start in range(0, len(order), batch_size):
+        batch = order[batch_start:batch_start + batch_size]
+        paths, switch_post = segment_batch(*_pad(observations, batch, lengths[batch[-1]]))
+        for row, i in enumerate(batch):
+            n = lengths[i]
+            gaps = np.flatnonzero(paths[row, 1:n] != paths[row, :n - 1]) + 1
+            if not len(gaps):
+                continue
+            positions = observations[i]["positions"]
+            bounds = np.concatenate([[0], gaps, [n]])
+            for j, k in enumerate(gaps):
+                lo, hi, mass = _credible_interval(switch_post[row], k, bounds[j], bounds[j + 2], credible)
+                results[i].append((int(positions[lo - 1]), int(positions[hi]), round(float(mass), 4)))
+    return results
@@ -0,0 +1,283 @@
+# distortopia/instrumentation.py
+
+import contextvars
+import functools
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORT_ENV = "DISTORTOPIA_REPORT"
+
+_report_path = os.environ.get(REPORT_ENV) or None
+_run_id = uuid.uuid4().hex[:12]
+_write_lock = threading.Lock()
+_current_stage = contextvars.ContextVar("distortopia_stage", default=None)
+
+
+def set_report(path):
+    """Append records to this JSON-lines file from now on (None disables reporting)."""
+    global _report_path
+    _report_path = path
+    if path:
+        # child processes (e.g. detect_crossovers workers) report to the same file
+        os.environ[REPORT_ENV] = path
+    else:
+        os.environ.pop(REPORT_ENV, None)
+
+
+def report_path():
+    return _report_path
+
+
+def _write(record):
+    if not _report_path:
+        return
+    record = {"run": _run_id, "pid": os.getpid(), **record}
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock, open(_report_path, "a") as f:
+        f.write(line)
+
+
+def _proc_io(pid="self"):
+    """(rchar, wchar) from /proc/<pid>/io: bytes read and written, including page-cache hits."""
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def rss_mb(maxrss):
+    """ru_maxrss in MB: the kernel reports KiB on Linux but bytes on macOS."""
+    return round(maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _delta(after, before):
+    return None if after is None or before is None else after - before
+
+
+class StageRecord:
+    """
+    Counters of one running stage; stage() yields it so the code can add counts.
+
+    Example:
+        with stage("detect_crossovers", bam=bam_path) as rec:
+            ...
+            rec.count(reads=n_reads, crossovers=n_breakpoints)
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = dict(fields)
+        self.counts = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    def count(self, **counts):
+        """Add to named record counts (safe from worker threads)."""
+        with self._lock:
+            for key, n in counts.items():
+                self.counts[key] = self.counts.get(key, 0) + int(n)
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Time a pipeline stage and append its record to the run report.
+
+    The record holds wall time, CPU time of this process and of the
+    subprocesses reaped during the stage, the peak RSS of the process and
+    of its children so far, bytes read and written (/proc/self/io, which
+    includes reaped children), any counts added with StageRecord.count,
+    and whether the stage failed. CPU and I/O are process-wide, so they
+    overlap when stages run concurrently in threads; the per-command
+    records written by run_command/wait_process are exact. Keyword fields
+    (e.g. input paths) are stored as-is. With no report configured only
+    the one-line summary is printed.
+    """
+    rec = StageRecord(name, fields)
+    parent = _current_stage.get()
+    token = _current_stage.set(rec)
+    started = datetime.now().isoformat(timespec="seconds")
+    wall0 = time.perf_counter()
+    self0 = resource.getrusage(resource.RUSAGE_SELF)
+    child0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    read0, written0 = _proc_io()
+    status, error = "ok", None
+    try:
+        yield rec
+    except BaseException as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_stage.reset(token)
+        wall = time.perf_counter() - wall0
+        self1 = resource.getrusage(resource.RUSAGE_SELF)
+        child1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+        read1, written1 = _proc_io()
+        record = {
+            "type": "stage",
+            "name": name,
+            "parent": parent.name if parent else None,
+            "started": started,
+            "status": status,
+            "wall_s": round(wall, 3),
+            "cpu_s": max(0.0, round(self1.ru_utime + self1.ru_stime - self0.ru_utime - self0.ru_stime, 3)),
+            "children_cpu_s": max(0.0, round(child1.ru_utime + child1.ru_stime - child0.ru_utime - child0.ru_stime, 3)),
+            "max_rss_mb": rss_mb(self1.ru_maxrss),
+            "children_max_rss_mb": rss_mb(child1.ru_maxrss),
+            "bytes_read": _delta(read1, read0),
+            "bytes_written": _delta(written1, written0),
+            "commands": rec.commands,
+            "counts": rec.counts,
+            **rec.fields,
+        }
+        if error:
+            record["error"] = error
+        _write(record)
+        cpu = record["cpu_s"] + record["children_cpu_s"]
+        print(f"⏱️ {name}: {wall:.1f}s wall, {cpu:.1f}s CPU, "
+              f"peak RSS {max(record['max_rss_mb'], record['children_max_rss_mb']):.0f} MB"
+              + (f" ({status})" if error else ""))
+
+
+def timed(name):
+    """Decorator running each call of a function inside stage(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(**counts):
+    """Add record counts to the innermost running stage (no-op outside one)."""
+    rec = _current_stage.get()
+    if rec is not None:
+        rec.count(**counts)
+
+
+def popen(cmd, **kwargs):
+    """subprocess.Popen that remembers its start time for wait_process()."""
+    proc = subprocess.Popen(cmd, **kwargs)
+    proc.started = time.perf_counter()
+    proc.cmd = cmd
+    return proc
+
+
+def wait_process(proc):
+    """
+    Wait for a process from popen() and record its resource usage.
+
+    The child is waited for without being reaped, so its /proc io counters
+    (its own and its reaped children's) can still be read, and is then
+    reaped with os.wait4 for its exact CPU time and peak RSS. Without
+    os.waitid (macOS before Python 3.13) the child is reaped directly and
+    its bytes read/written are not recorded. Equivalent to proc.wait(); do
+    not use with proc.communicate().
+    """
+    if proc.returncode is not None:
+        return proc.returncode
+    read = written = None
+    if hasattr(os, "waitid"):
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        read, written = _proc_io(proc.pid)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    cmd = getattr(proc, "cmd", proc.args)
+    cmd = [str(c) for c in cmd] if isinstance(cmd, (list, tuple)) else [str(cmd)]
+    parent = _current_stage.get()
+    if parent:
+        with parent._lock:
+            parent.commands += 1
+    _write({
+        "type": "command",
+        "name": os.path.basename(cmd[0]),
+        "parent": parent.name if parent else None,
+        "command": " ".join(cmd),
+        "status": "ok" if proc.returncode == 0 else "failed",
+        "returncode": proc.returncode,
+        "wall_s": round(time.perf_counter() - getattr(proc, "started", time.perf_counter()), 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "max_rss_mb": rss_mb(usage.ru_maxrss),
+        "bytes_read": read,
+        "bytes_written": written,
+    })
+    return proc.returncode
+
+
+def run_command(cmd, check=True, **kwargs):
+    """
+    subprocess.run(cmd, check=check, **kwargs) with its usage recorded.
+
+    stdout/stderr may be files or DEVNULL but not PIPE.
+    """
+    proc = popen(cmd, **kwargs)
+    try:
+        code = wait_process(proc)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    if check and code != 0:
+        raise subprocess.CalledProcessError(code, cmd)
+    return subprocess.CompletedProcess(cmd, code)
+
+
+def in_context(fn):
+    """Wrap fn so each call runs in a copy of the caller's context (for thread pools)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def load_report(path):
+    """All records of a run report as a DataFrame."""
+    import pandas as pd
+
+    with open(path) as f:
+        return pd.json_normalize([json.loads(line) for line in f if line.strip()])
+
+
+def summarize_report(path, run=None):
+    """
+    Totals per stage and per command name, slowest first.
+
+    Args:
+        path (str): Report written by stage()/run_command()
+        run (str): Only this run id (default: the last run in the file)
+    """
+    records = load_report(path)
+    if records.empty:
+        return records
+    run = run or records["run"].iloc[-1]
+    records = records[records["run"] == run]
+    numeric = [c for c in ["wall_s", "cpu_s", "children_cpu_s", "bytes_read", "bytes_written"] if c in records]
+    peaks = [c for c in ["max_rss_mb", "children_max_rss_mb"] if c in records]
+    summary = records.groupby(["type", "name"]).agg(
+        calls=("name", "size"), **{c: (c, "sum") for c in numeric}, **{c: (c, "max") for c in peaks})
+    return summary.sort_values("wall_s", ascending=False).reset_index()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Summarize a Distortopia run report.")
+    parser.add_argument("report", help="JSON-lines report (see DISTORTOPIA_REPORT)")
+    parser.add_argument("--run", default=None, help="Run id (default: last run in the file)")
+    args = parser.parse_args()
+
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(summarize_report(args.report, args.run).to_string(index=False))
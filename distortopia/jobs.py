@@ -0,0 +1,118 @@
+# distortopia/jobs.py
+
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobLog:
+    """
+    Stand-in for a Streamlit log box inside a background job.
+
+    Pipeline functions report through log_box.write/.text/.info; Streamlit
+    elements cannot be updated from another thread, so messages are kept on
+    the job and rendered by the page on its next rerun.
+    """
+
+    def __init__(self, max_lines=200):
+        self.lines = []
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+
+    def write(self, message):
+        with self._lock:
+            self.lines.append(str(message))
+            del self.lines[:-self.max_lines]
+
+    text = info = write
+
+    def tail(self, n=20):
+        with self._lock:
+            return "\n".join(self.lines[-n:])
+
+
+class Job:
+    """Status of one submitted callable: queued, running, done or failed."""
+
+    def __init__(self, name, outputs=()):
+        self.name = name
+        self.outputs = list(outputs)
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.log = JobLog()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobRunner:
+    """
+    Run long pipeline stages on a thread pool and remember their status.
+
+    Jobs are keyed by name: submitting a name whose job is still queued or
+    running returns that job instead of starting a duplicate, so pressing a
+    button twice (or a rerun) never launches the same stage twice. Keep one
+    runner per process (e.g. via st.cache_resource) so status survives
+    reruns of the app script.
+    """
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="distortopia-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, outputs=(), log_kwarg=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) as job `name`.
+
+        Args:
+            outputs (sequence): Files the job produces, shown once it is done
+            log_kwarg (str): Keyword through which fn accepts a log box; the
+                job's JobLog is passed there
+        """
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is not None and job.active:
+                return job
+            job = Job(name, outputs)
+            self._jobs[name] = job
+        if log_kwarg:
+            kwargs[log_kwarg] = job.log
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    @staticmethod
+    def _run(job, fn, args, kwargs):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = f"{e}\n{traceback.format_exc()}"
+            job.status = "failed"
+        finally:
+            job.finished = time.time()
+
+    def get(self, name):
+        return self._jobs.get(name)
+
+    def jobs(self):
+        """All jobs, most recently submitted first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.submitted, reverse=True)
+
+    def any_active(self):
+        return any(job.active for job in self.jobs())
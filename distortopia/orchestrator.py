@@ -0,0 +1,374 @@
+# distortopia/orchestrator.py
+
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from distortopia.instrumentation import set_report, stage
+
+STATE_FILE = ".distortopia_state.json"
+REPORT_FILE = "distortopia_report.jsonl"
+PARENTS = ("thaliana", "lyrata")
+
+DEFAULT_CONFIG = {
+    "thaliana_ref": "A_thaliana.fna",
+    "lyrata_ref": "A_lyrata.fna",
+    "coverage": "60x",            # parental Badread depth
+    "seed": None,
+    "threads": None,              # per-tool threads; None lets the scheduler size them
+    "f1_reps": 5,
+    "f1_model": "single",
+    "rec_map": None,              # recombination map TSV (F1 simulation and HMM)
+    "f1_coverage": "60x",
+    "competitive": False,         # single-pass alignment; per-parent BAMs keep only assigned reads
+    "crossover_method": "hmm",
+    "window_size": 100_000,       # segregation windows
+}
+
+
+class Stage:
+    """
+    One pipeline step: run() reads `inputs` and writes `outputs`.
+
+    params holds every setting that changes the outputs; it is part of the
+    stage fingerprint, so editing one only invalidates the stages using it.
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), params=None):
+        self.name = name
+        self.run = run
+        self.inputs = [p for p in inputs if p]
+        self.outputs = list(outputs)
+        self.params = params or {}
+
+
+def build_pipeline(config=None):
+    """
+    Stages simulate -> align -> call for both parents, then markers, F1
+    genome, F1 reads, F1 alignment, crossover detection and segregation
+    summaries, using the file names the Streamlit app expects.
+    """
+    # imported here so the orchestrator can be loaded without the whole toolchain
+    from distortopia.align_hybrid_reads import align_competitive, align_reads
+    from distortopia.align_reads import run_alignment
+    from distortopia.compare_variants import generate_snp_marker_table
+    from distortopia.detect_crossovers import detect_crossovers
+    from distortopia.segregation import summarize_crossovers
+    from distortopia.simulate_f1 import generate_f1_from_files
+    from distortopia.simulate_hybrid_reads import simulate_long_reads as simulate_f1_reads
+    from distortopia.simulate_long_reads import simulate_long_reads
+    from distortopia.variant_calling import call_variants
+
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    threads = cfg["threads"]
+    refs = {p: cfg[f"{p}_ref"] for p in PARENTS}
+    stages = []
+
+    for p in PARENTS:
+        ref, fq, bam, vcf = refs[p], f"sim_{p}.fq.gz", f"sim_{p}.sort.bam", f"sim_{p}.vcf"
+        stages += [
+            Stage(f"simulate_{p}",
+                  lambda ref=ref, fq=fq: simulate_long_reads(ref, fq, coverage=cfg["coverage"], seed=cfg["seed"]),
+                  [ref], [fq], {"coverage": cfg["coverage"], "seed": cfg["seed"]}),
+            Stage(f"align_{p}",
+                  lambda ref=ref, fq=fq, p=p: run_alignment(fq, ref, f"sim_{p}", threads=threads),
+                  [ref, fq], [bam, f"{bam}.bai"]),
+            Stage(f"call_{p}",
+                  lambda ref=ref, bam=bam, vcf=vcf: call_variants(ref, bam, vcf, workers=threads),
+                  [ref, bam], [vcf]),
+        ]
+
+    stages += [
+        Stage("markers",
+              lambda: generate_snp_marker_table("sim_thaliana.vcf", "sim_lyrata.vcf", "compare_variants_output.tsv"),
+              ["sim_thaliana.vcf", "sim_lyrata.vcf"],
+              ["compare_variants_output.tsv", "compare_variants_output.npz"]),
+        Stage("f1_genome",
+              lambda: generate_f1_from_files(refs["thaliana"], "sim_thaliana.vcf", "sim_lyrata.vcf", "F1_hybrid.fna",
+                                             cfg["f1_reps"], cfg["seed"], model=cfg["f1_model"],
+                                             rec_map_path=cfg["rec_map"]),
+              [refs["thaliana"], "sim_thaliana.vcf", "sim_lyrata.vcf", cfg["rec_map"]], ["F1_hybrid.fna"],
+              {"reps": cfg["f1_reps"], "seed": cfg["seed"], "model": cfg["f1_model"]}),
+        Stage("f1_reads",
+              lambda: simulate_f1_reads("F1_hybrid.fna", "F1_hybrid.fq", coverage=cfg["f1_coverage"]),
+              ["F1_hybrid.fna"], ["F1_hybrid.fq.gz"], {"coverage": cfg["f1_coverage"]}),
+    ]
+
+    f1_bams = {p: f"F1_to_{p}.sort.bam" for p in PARENTS}
+
+    def align_f1():
+        if cfg["competitive"]:
+            align_competitive("F1_hybrid.fq.gz", refs, {p: f"F1_to_{p}" for p in PARENTS}, threads=threads)
+        else:
+            for p in PARENTS:
+                align_reads("F1_hybrid.fq.gz", refs[p], f"F1_to_{p}", threads=threads)
+
+    stages.append(Stage("f1_align", align_f1, ["F1_hybrid.fq.gz", *refs.values()], list(f1_bams.values()),
+                        {"competitive": cfg["competitive"]}))
+
+    for p in PARENTS:
+        calls = f"crossovers_{p}.tsv"
+        stages += [
+            Stage(f"detect_{p}",
+                  lambda bam=f1_bams[p], calls=calls: detect_crossovers(
+                      bam, "compare_variants_output.npz", calls, workers=threads,
+                      method=cfg["crossover_method"], rec_map_path=cfg["rec_map"]),
+                  [f1_bams[p], "compare_variants_output.npz", cfg["rec_map"]],
+                  [calls, f"crossovers_{p}.breakpoints.tsv"], {"method": cfg["crossover_method"]}),
+            Stage(f"segregation_{p}",
+                  lambda calls=calls, p=p: summarize_crossovers(calls, output_path=f"crossovers_{p}.windows.tsv",
+                                                                window_size=cfg["window_size"]),
+                  [calls, f"crossovers_{p}.breakpoints.tsv"], [f"crossovers_{p}.windows.tsv"],
+                  {"window_size": cfg["window_size"]}),
+        ]
+    return stages
+
+
+def _stat(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class Pipeline:
+    """
+    Incremental executor for a list of Stages.
+
+    A stage's fingerprint hashes its name, params and, for each input, the
+    fingerprint of the stage producing it or (for source files) a SHA-256 of
+    the content, memoized by size and mtime. A stage reruns when its
+    fingerprint differs from the recorded one, when an output is missing or
+    was changed since it was written, or when a stage it depends on reruns.
+    Ready stages run concurrently, so the two parental branches proceed in
+    parallel. State is kept in <workdir>/.distortopia_state.json. Each
+    stage that runs is timed as an instrumentation stage, so a run report,
+    when configured, shows where the time went.
+
+    With adopt_existing, a stage never recorded whose outputs all exist and
+    are newer than its inputs is taken as up to date instead of rerun, so
+    outputs made before the orchestrator was used are kept.
+    """
+
+    def __init__(self, stages, workdir=".", adopt_existing=True, log=print):
+        self.stages = {s.name: s for s in stages}
+        self.workdir = workdir
+        self.adopt_existing = adopt_existing
+        self.log = log
+        self.producer = {out: s.name for s in stages for out in s.outputs}
+        self.deps = {s.name: sorted({self.producer[i] for i in s.inputs if i in self.producer}) for s in stages}
+        self.state_path = os.path.join(workdir, STATE_FILE)
+        try:
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        self.state.setdefault("stages", {})
+        self.state.setdefault("digests", {})
+
+    def _path(self, path):
+        return os.path.join(self.workdir, path)
+
+    def _save(self):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def _digest(self, path):
+        full = self._path(path)
+        if not os.path.exists(full):
+            return None
+        stat = _stat(full)
+        memo = self.state["digests"].get(path)
+        if memo and memo[:2] == stat:
+            return memo[2]
+        sha = hashlib.sha256()
+        with open(full, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        self.state["digests"][path] = [*stat, sha.hexdigest()]
+        return sha.hexdigest()
+
+    def _order(self, targets=None):
+        """Topological order, restricted to targets and their ancestors."""
+        wanted = set(self.stages)
+        if targets:
+            wanted, todo = set(), list(targets)
+            while todo:
+                name = todo.pop()
+                if name not in self.stages:
+                    raise ValueError(f"Unknown stage {name!r}; choose from {list(self.stages)}.")
+                if name not in wanted:
+                    wanted.add(name)
+                    todo += self.deps[name]
+        order, seen = [], set()
+
+        def visit(name):
+            if name not in seen:
+                seen.add(name)
+                for dep in self.deps[name]:
+                    visit(dep)
+                order.append(name)
+
+        for name in self.stages:
+            if name in wanted:
+                visit(name)
+        return order
+
+    def fingerprints(self, order):
+        prints = {}
+        for name in order:
+            stage = self.stages[name]
+            inputs = [[i, prints.get(self.producer.get(i)) or self._digest(i)] for i in stage.inputs]
+            blob = json.dumps({"stage": name, "params": stage.params, "inputs": inputs}, sort_keys=True, default=str)
+            prints[name] = hashlib.sha256(blob.encode()).hexdigest()
+        return prints
+
+    def _outputs_current(self, name, record):
+        recorded = record.get("outputs", {})
+        for out in self.stages[name].outputs:
+            full = self._path(out)
+            if not os.path.exists(full) or recorded.get(out) != _stat(full):
+                return False
+        return True
+
+    def _adoptable(self, name):
+        stage = self.stages[name]
+        outs = [self._path(o) for o in stage.outputs]
+        if not outs or not all(os.path.exists(o) for o in outs):
+            return False
+        ins = [self._path(i) for i in stage.inputs if os.path.exists(self._path(i))]
+        return not ins or min(os.path.getmtime(o) for o in outs) >= max(os.path.getmtime(i) for i in ins)
+
+    def _record(self, name, fingerprint):
+        self.state["stages"][name] = {
+            "fingerprint": fingerprint,
+            "outputs": {o: _stat(self._path(o)) for o in self.stages[name].outputs if os.path.exists(self._path(o))},
+        }
+        self._save()
+
+    def plan(self, targets=None, force=()):
+        """
+        [(stage, "run" | "skip", reason)] in execution order, and the stage fingerprints.
+
+        Planning writes nothing; adopted stages are recorded by run().
+        """
+        order = self._order(targets)
+        prints = self.fingerprints(order)
+        plan, rerun = [], set()
+        for name in order:
+            record = self.state["stages"].get(name)
+            if name in force:
+                reason = "forced"
+            elif any(dep in rerun for dep in self.deps[name]):
+                reason = "upstream changed"
+            elif record is None:
+                adopt = self.adopt_existing and self._adoptable(name)
+                reason = "adopted existing outputs" if adopt else "never run"
+            elif record["fingerprint"] != prints[name]:
+                reason = "inputs or parameters changed"
+            elif not self._outputs_current(name, record):
+                reason = "outputs missing or modified"
+            else:
+                reason = "up to date"
+            action = "skip" if reason in ("up to date", "adopted existing outputs") else "run"
+            if action == "run":
+                rerun.add(name)
+            plan.append((name, action, reason))
+        return plan, prints
+
+    def run(self, targets=None, force=(), workers=2, dry_run=False):
+        """
+        Run every stage the plan marks as stale, each once its dependencies finish.
+
+        Returns the plan. On a failure, running stages are allowed to finish,
+        nothing downstream of the failed stage starts, and the error is raised.
+        """
+        plan, prints = self.plan(targets, force)
+        for name, action, reason in plan:
+            self.log(f"{'▶️' if action == 'run' else '⏭️'} {name}: {reason}")
+        if dry_run:
+            return plan
+        os.makedirs(self.workdir, exist_ok=True)
+        for name, _, reason in plan:
+            if reason == "adopted existing outputs":
+                self._record(name, prints[name])
+
+        todo = {name for name, action, _ in plan if action == "run"}
+        done = {name for name, action, _ in plan if action == "skip"}
+        failed = None
+        cwd = os.path.abspath(self.workdir)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while (todo and failed is None) or running:
+                if failed is None:
+                    for name in sorted(todo):
+                        if all(dep in done for dep in self.deps[name]):
+                            todo.discard(name)
+                            self.log(f"🚀 Running {name}")
+                            running[pool.submit(self._run_stage, name, cwd)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.log(f"❌ {name} failed: {e}")
+                        failed = failed or e
+                        continue
+                    self._record(name, prints[name])
+                    done.add(name)
+                    self.log(f"✅ {name} done")
+        if failed is not None:
+            raise failed
+        return plan
+
+    def _run_stage(self, name, cwd):
+        if os.path.abspath(os.getcwd()) != cwd:
+            raise RuntimeError(f"Stages run in the working directory; chdir to {cwd} first.")
+        with stage(name):
+            return self.stages[name].run()
+
+
+def run_pipeline(config=None, targets=None, force=(), workers=2, dry_run=False, adopt_existing=True, log=print):
+    """Build the standard pipeline from config and run it incrementally in the current directory."""
+    pipeline = Pipeline(build_pipeline(config), ".", adopt_existing, log)
+    return pipeline.run(targets, force, workers, dry_run)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Distortopia pipeline, recomputing only stale stages.")
+    parser.add_argument("targets", nargs="*", help="Stages to bring up to date (default: all)")
+    parser.add_argument("--config", default=None, help="JSON file overriding DEFAULT_CONFIG keys")
+    parser.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="Override config keys (values parsed as JSON when possible)")
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to rerun regardless of state")
+    parser.add_argument("--workers", type=int, default=2, help="Stages run concurrently")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU budget for external tools (default: all cores)")
+    parser.add_argument("--memory", default=None, help="Memory budget, e.g. 16G (default: 80%% of RAM)")
+    parser.add_argument("--report", default=REPORT_FILE, help="JSON-lines timing/resource report ('' to disable)")
+    parser.add_argument("--no-adopt", action="store_true", help="Rerun stages never recorded even if outputs exist")
+    args = parser.parse_args()
+
+    from distortopia.scheduler import configure
+    configure(args.cpus, args.memory)
+    set_report(args.report or None)
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+    for item in args.set:
+        key, value = item.split("=", 1)
+        try:
+            config[key] = json.loads(value)
+        except ValueError:
+            config[key] = value
+
+    run_pipeline(config, args.targets or None, args.force, args.workers, args.dry_run,
+                 adopt_existing=not args.no_adopt)
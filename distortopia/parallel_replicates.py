@@ -0,0 +1,208 @@
+# distortopia/parallel_replicates.py
+
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from distortopia.crossover_model import (
+    CROSSOVER_MODELS,
+    gamete_crossovers,
+    load_recombination_map,
+)
+from distortopia.read_sampler import simulate_reads
+from distortopia.simulate_f1 import (
+    load_reference,
+    load_variants,
+    apply_crossovers,
+    draw_gamete_crossovers,
+    write_fasta,
+    index_fasta,
+)
+
+# Read-only genome/variant views, set once per worker by _init_worker.
+_SHARED = {}
+
+
+def _pack(arrays, path, dtype):
+    """
+    Write {chrom: array} into one contiguous .npy file.
+
+    Returns {chrom: (start, end)} offsets into the packed buffer.
+    """
+    layout = {}
+    total = 0
+    for chrom, arr in arrays.items():
+        layout[chrom] = (total, total + len(arr))
+        total += len(arr)
+    packed = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(total,))
+    for chrom, (start, end) in layout.items():
+        packed[start:end] = arrays[chrom]
+    packed.flush()
+    del packed
+    return layout
+
+
+def _unpack(path, layout):
+    """Memory-map a packed .npy file and return {chrom: zero-copy view}."""
+    packed = np.load(path, mmap_mode="r")
+    return {chrom: packed[start:end] for chrom, (start, end) in layout.items()}
+
+
+def export_shared_inputs(reference, var1, var2, work_dir):
+    """
+    Pack the reference and both variant sets into memory-mappable files.
+
+    Returns a small, picklable description that workers use to map the same
+    pages read-only instead of each holding a private copy of the genome.
+    """
+    ref_path = os.path.join(work_dir, "reference.npy")
+    shared = {"reference": (ref_path, _pack(reference, ref_path, np.uint8))}
+    for name, variants in (("var1", var1), ("var2", var2)):
+        for field, dtype in (("positions", np.int64), ("alleles", np.uint8)):
+            path = os.path.join(work_dir, f"{name}_{field}.npy")
+            arrays = {chrom: v[field] for chrom, v in variants.items()}
+            shared[f"{name}_{field}"] = (path, _pack(arrays, path, dtype))
+    return shared
+
+
+def load_shared_inputs(shared):
+    """Rebuild (reference, var1, var2) as views over the packed files."""
+    reference = _unpack(*shared["reference"])
+    variants = []
+    for name in ("var1", "var2"):
+        positions = _unpack(*shared[f"{name}_positions"])
+        alleles = _unpack(*shared[f"{name}_alleles"])
+        variants.append({
+            chrom: {"positions": positions[chrom], "alleles": alleles[chrom]}
+            for chrom in positions
+        })
+    return reference, variants[0], variants[1]
+
+
+def _init_worker(shared):
+    _SHARED["inputs"] = load_shared_inputs(shared)
+
+
+def _simulate_replicate(rep, gamete, part_path, reads_part=None, read_seed=None,
+                        coverage=None):
+    """
+    Build one recombinant gamete from its breakpoints and write it to part_path.
+
+    When reads_part is given, reads sampled from the gamete with the
+    replicate's own read_seed are written there too.
+    """
+    reference, var1, var2 = _SHARED["inputs"]
+    genome = apply_crossovers(reference, var1, var2, gamete)
+    write_fasta({rep: genome}, part_path)
+    if reads_part:
+        simulate_reads(genome, reads_part, coverage, np.random.default_rng(read_seed),
+                       name_prefix=f"rep{rep}_")
+    return part_path, reads_part
+
+
+def _append_part(part, out):
+    # gzip and BGZF members concatenate into a valid compressed file
+    with open(part, "rb") as f_in:
+        shutil.copyfileobj(f_in, out)
+    os.remove(part)
+
+
+def simulate_replicates_parallel(ref_fasta, vcf1, vcf2, output_path, num_reps,
+                                 seed=None, workers=None, index=False, model="single",
+                                 rec_map_path=None, interference=1.0, reads_output=None,
+                                 coverage=0.06):
+    """
+    Generate num_reps recombinant gametes across a process pool.
+
+    Crossovers for every replicate are drawn up front in one batch with
+    draw_gamete_crossovers, the same call generate_f1_from_files makes, and
+    parts are appended to output_path in replicate order. The output is
+    therefore byte-identical for a given seed whatever the number of workers.
+    At most 2 * workers finished parts wait on disk at any time, and the
+    outputs only replace output_path (and reads_output) once every replicate
+    has been written, so a failed run leaves no partial file behind.
+
+    With reads_output, each gamete is also sampled to `coverage` with
+    read_sampler.simulate_reads, seeded per replicate from
+    SeedSequence(seed).spawn(num_reps), and reads are gathered in
+    replicate order.
+    """
+    workers = workers or os.cpu_count() or 1
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    work_dir = tempfile.mkdtemp(prefix=".replicates_", dir=out_dir)
+    suffix = ".fna.gz" if output_path.endswith(".gz") else ".fna"
+    reads_suffix = ".fq" + os.path.splitext(reads_output)[1] if reads_output else None
+
+    try:
+        print(f"[INFO] Packing reference and variants into {work_dir}")
+        reference = load_reference(ref_fasta)
+        shared = export_shared_inputs(reference, load_variants(vcf1, reference),
+                                      load_variants(vcf2, reference), work_dir)
+        rec_map = load_recombination_map(rec_map_path) if rec_map_path else None
+        crossovers = draw_gamete_crossovers(reference, num_reps, seed, model, rec_map, interference)
+        del reference
+        read_seeds = np.random.SeedSequence(seed).spawn(num_reps)
+
+        print(f"[INFO] Simulating {num_reps} replicates on {workers} workers")
+        # outputs are assembled in work_dir and only moved into place once every replicate is in
+        tmp_output = os.path.join(work_dir, "output" + suffix)
+        tmp_reads = os.path.join(work_dir, "reads" + reads_suffix) if reads_output else os.devnull
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared,)) as pool, \
+                open(tmp_output, "wb") as out, \
+                open(tmp_reads, "wb") as reads_out:
+            pending = deque()
+            next_rep = 0
+            while next_rep < num_reps or pending:
+                while next_rep < num_reps and len(pending) < 2 * workers:
+                    part = os.path.join(work_dir, f"rep{next_rep}{suffix}")
+                    reads_part = (os.path.join(work_dir, f"rep{next_rep}{reads_suffix}")
+                                  if reads_output else None)
+                    pending.append(pool.submit(_simulate_replicate, next_rep,
+                                               gamete_crossovers(crossovers, next_rep), part,
+                                               reads_part, read_seeds[next_rep], coverage))
+                    next_rep += 1
+                part, reads_part = pending.popleft().result()
+                _append_part(part, out)
+                if reads_part:
+                    _append_part(reads_part, reads_out)
+        os.replace(tmp_output, output_path)
+        if reads_output:
+            shutil.move(tmp_reads, reads_output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if index:
+        index_fasta(output_path)
+    print(f"[DONE] Wrote {num_reps} replicates to {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate recombinant F1 gametes in parallel.")
+    parser.add_argument("ref", help="Reference .fna file")
+    parser.add_argument("vcf1", help="Parent 1 VCF")
+    parser.add_argument("vcf2", help="Parent 2 VCF")
+    parser.add_argument("output", help="Output FASTA (.fna, or .fna.gz for BGZF)")
+    parser.add_argument("--reps", type=int, default=1, help="Number of recombinant gametes")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible replicates")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--index", action="store_true", help="Index the output with samtools faidx")
+    parser.add_argument("--model", choices=CROSSOVER_MODELS, default="single", help="Crossover model")
+    parser.add_argument("--rec-map", default=None, help="Recombination map TSV (CHROM, START, END, RATE in cM/Mb)")
+    parser.add_argument("--interference", type=float, default=1.0, help="Gamma interference shape (gamma model)")
+    parser.add_argument("--reads", default=None, help="Also sample reads from each gamete into this FASTQ (.fq.gz)")
+    parser.add_argument("--coverage", type=float, default=0.06, help="Read coverage per gamete (with --reads)")
+    args = parser.parse_args()
+
+    simulate_replicates_parallel(args.ref, args.vcf1, args.vcf2, args.output, args.reps,
+                                 seed=args.seed, workers=args.workers, index=args.index,
+                                 model=args.model, rec_map_path=args.rec_map,
+                                 interference=args.interference, reads_output=args.reads,
+                                 coverage=args.coverage)
@@ -0,0 +1,52 @@
+# distortopia/pipes.py
+
+import subprocess
+import tempfile
+
+from distortopia.instrumentation import popen, wait_process
+
+
+def run_piped(commands, stdout=None):
+    """
+    Run commands as a shell-style pipe (cmd1 | cmd2 | ...).
+
+    Every stage's stderr is spooled to a temporary file so a full pipe cannot
+    stall it. Each exit status is checked, and one RuntimeError lists every
+    failing stage with its stderr, so an upstream crash is not hidden behind a
+    downstream stage that just saw a truncated stream. Each command's
+    resource usage goes to the run report (see instrumentation).
+
+    Args:
+        commands (list[list[str]]): Commands, upstream first
+        stdout (file): Destination of the last stage (default: inherit)
+    """
+    procs, err_logs = [], []
+    upstream = None
+    try:
+        for i, cmd in enumerate(commands):
+            last = i == len(commands) - 1
+            err_log = tempfile.TemporaryFile()
+            err_logs.append(err_log)
+            proc = popen(cmd, stdin=upstream,
+                         stdout=stdout if last else subprocess.PIPE,
+                         stderr=err_log)
+            if upstream is not None:
+                upstream.close()  # so upstream sees SIGPIPE if this stage exits
+            upstream = None if last else proc.stdout
+            procs.append(proc)
+
+        failures = []
+        for cmd, proc, err_log in zip(commands, procs, err_logs):
+            if wait_process(proc) != 0:
+                err_log.seek(0)
+                err = err_log.read().decode(errors="replace").strip()
+                failures.append(f"  {cmd[0]} (exit {proc.returncode}): {' '.join(cmd)}\n{err}")
+        if failures:
+            raise RuntimeError("Pipeline failed:\n" + "\n".join(failures))
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        for err_log in err_logs:
+            err_log.close()
@@ -0,0 +1,114 @@
+# distortopia/read_sampler.py
+
+import numpy as np
+
+from distortopia.bgzf_writer import ThreadedBgzfWriter
+
+LENGTH_MODELS = ("lognormal", "gamma")
+
+# Complement lookup for uint8 ASCII bases (IUPAC codes included).
+_COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _a, _b in zip(b"ACGTRYKMBVDHN", b"TGCAYRMKVBHDN"):
+    _COMPLEMENT[_a] = _b
+    _COMPLEMENT[ord(chr(_a).lower())] = ord(chr(_b).lower())
+
+
+def _read_lengths(num_reads, mean, sd, model, rng):
+    """Draw read lengths with the given mean/sd from a lognormal or gamma model."""
+    if model == "lognormal":
+        sigma2 = np.log1p((sd / mean) ** 2)
+        lengths = rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size=num_reads)
+    elif model == "gamma":
+        lengths = rng.gamma((mean / sd) ** 2, sd ** 2 / mean, size=num_reads)
+    else:
+        raise ValueError(f"Unknown length model {model!r}; choose from {LENGTH_MODELS}.")
+    return lengths.astype(np.int64)
+
+
+def sample_reads(genome, coverage, rng=None, length_mean=8000, length_sd=3000,
+                 length_model="lognormal", min_length=100):
+    """
+    Draw every read of a replicate in one vectorized call.
+
+    Start positions are uniform over the concatenated genome, lengths follow
+    length_model and reads running off a chromosome end are truncated.
+    Returns {"chroms": chromosome names, "chrom_index", "starts", "lengths",
+    "strands"} where the last four are parallel arrays (strand is +1/-1).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    chroms = list(genome)
+    chrom_lens = np.array([len(genome[c]) for c in chroms], dtype=np.int64)
+    chrom_starts = np.concatenate([[0], np.cumsum(chrom_lens)])
+    total_len = int(chrom_starts[-1])
+
+    num_reads = int(np.ceil(coverage * total_len / length_mean))
+    offsets = rng.integers(0, total_len, size=num_reads)
+    lengths = _read_lengths(num_reads, length_mean, length_sd, length_model, rng)
+    strands = np.where(rng.random(num_reads) < 0.5, 1, -1).astype(np.int8)
+
+    chrom_index = np.searchsorted(chrom_starts, offsets, side="right") - 1
+    starts = offsets - chrom_starts[chrom_index]
+    lengths = np.minimum(lengths, chrom_lens[chrom_index] - starts)
+    keep = lengths >= min_length
+    return {
+        "chroms": chroms,
+        "chrom_index": chrom_index[keep],
+        "starts": starts[keep],
+        "lengths": lengths[keep],
+        "strands": strands[keep],
+    }
+
+
+def iter_read_sequences(genome, reads):
+    """
+    Yield (chrom, start, end, strand, seq) for sampled reads.
+
+    Forward-strand sequences are zero-copy views into the genome arrays;
+    reverse-strand reads are complemented into a new array.
+    """
+    chroms = reads["chroms"]
+    for ci, start, length, strand in zip(reads["chrom_index"], reads["starts"],
+                                         reads["lengths"], reads["strands"]):
+        chrom = chroms[ci]
+        seq = genome[chrom][start:start + length]
+        if strand < 0:
+            seq = _COMPLEMENT[seq[::-1]]
+        yield chrom, int(start), int(start + length), "+" if strand > 0 else "-", seq
+
+
+def open_fastq_writer(output_fq, compresslevel=1, threads=None, index=False):
+    """Open a binary FASTQ handle: .gz/.bgz -> threaded BGZF, otherwise plain."""
+    if output_fq.endswith((".gz", ".bgz")):
+        return ThreadedBgzfWriter(output_fq, threads, compresslevel,
+                                  index=index, fastq_index=index)
+    return open(output_fq, "wb")
+
+
+def write_fastq(genome, reads, out, name_prefix="", quality=20):
+    """Stream sampled reads to an open binary handle as FASTQ with constant quality."""
+    max_len = int(reads["lengths"].max()) if len(reads["lengths"]) else 0
+    qual = memoryview(bytes([quality + 33]) * max_len)
+    for i, (chrom, start, end, strand, seq) in enumerate(iter_read_sequences(genome, reads)):
+        out.write(f"@{name_prefix}read{i} {chrom}:{start}-{end}{strand}\n".encode())
+        out.write(memoryview(seq))
+        out.write(b"\n+\n")
+        out.write(qual[:end - start])
+        out.write(b"\n")
+    return len(reads["lengths"])
+
+
+def simulate_reads(genome, output_fq, coverage=60, rng=None, name_prefix="",
+                   length_mean=8000, length_sd=3000, length_model="lognormal",
+                   quality=20, threads=None, index=False):
+    """
+    Sample error-free long reads from an in-memory genome straight to FASTQ.
+
+    A fast stand-in for Badread when iterating on the downstream pipeline.
+    Compressed output can be indexed (.fai/.gzi) while it is written.
+    Returns the number of reads written.
+    """
+    reads = sample_reads(genome, coverage, rng, length_mean, length_sd, length_model)
+    with open_fastq_writer(output_fq, threads=threads, index=index) as out:
+        num_reads = write_fastq(genome, reads, out, name_prefix, quality)
+    print(f"[DONE] Wrote {num_reads} reads ({coverage}x) to {output_fq}")
+    return num_reads
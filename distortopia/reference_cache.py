@@ -0,0 +1,140 @@
+# distortopia/reference_cache.py
+
+import fcntl
+import glob
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+from distortopia.instrumentation import run_command
+
+
+def _stamp_path(fasta):
+    return f"{fasta}.distortopia.json"
+
+
+def _read_stamp(fasta):
+    try:
+        with open(_stamp_path(fasta)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_stamp(fasta, stamp):
+    tmp = f"{_stamp_path(fasta)}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(stamp, f, indent=2)
+    os.replace(tmp, _stamp_path(fasta))
+
+
+def fasta_digest(fasta, chunk_size=1 << 20):
+    """
+    SHA-256 of the FASTA content.
+
+    The digest is remembered in the stamp file together with the file's size
+    and mtime, so an unchanged FASTA is not re-read on every run.
+    """
+    st = os.stat(fasta)
+    stamp = _read_stamp(fasta)
+    if stamp.get("size") == st.st_size and stamp.get("mtime_ns") == st.st_mtime_ns:
+        return stamp["sha256"]
+
+    sha = hashlib.sha256()
+    with open(fasta, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+@contextmanager
+def locked(fasta):
+    """Exclusive inter-process lock so concurrent pipelines build each artifact once."""
+    with open(f"{fasta}.distortopia.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _build(cmd, final_path, tmp_path):
+    """Run cmd writing tmp_path, then atomically move it to final_path."""
+    try:
+        run_command(cmd)
+        os.replace(tmp_path, final_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def dict_path(fasta):
+    """Sequence dictionary path as GATK/Picard expect it (extension replaced by .dict)."""
+    return os.path.splitext(fasta)[0] + ".dict"
+
+
+def prepare_reference(fasta, preset="map-pb", aligner="minimap2", artifacts=("mmi", "fai", "dict")):
+    """
+    Build or reuse the minimap2 index, faidx index and sequence dictionary.
+
+    The .mmi is named <fasta>.<preset>.<digest>.mmi, so it is keyed by both
+    the FASTA content and the preset; indexes from older versions of the
+    FASTA are removed. The .fai and .dict must sit next to the FASTA where
+    samtools and bcftools look for them, so they are rebuilt whenever the
+    digest recorded in the stamp no longer matches. All work happens under
+    a file lock, and every artifact is written to a temporary name and then
+    renamed, so pipelines starting together never see a partial index.
+
+    Returns:
+        dict: {"mmi": path, "fai": path, "dict": path} for the requested artifacts
+    """
+    with locked(fasta):
+        digest = fasta_digest(fasta)
+        st = os.stat(fasta)
+        stamp = _read_stamp(fasta)
+        if stamp.get("sha256") != digest:
+            stamp = {"sha256": digest}
+        stamp.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+        paths = {}
+
+        if "mmi" in artifacts:
+            mmi = f"{fasta}.{preset}.{digest[:16]}.mmi"
+            if not os.path.exists(mmi):
+                print(f"[INFO] Building minimap2 index ({preset}) for {fasta}")
+                _build([aligner, "-x", preset, "-d", f"{mmi}.tmp", fasta], mmi, f"{mmi}.tmp")
+                for stale in glob.glob(glob.escape(f"{fasta}.{preset}.") + "*.mmi"):
+                    if stale != mmi:
+                        os.remove(stale)
+            paths["mmi"] = mmi
+
+        if "fai" in artifacts:
+            fai = f"{fasta}.fai"
+            if stamp.get("fai") != digest or not os.path.exists(fai):
+                print(f"[INFO] Building faidx index for {fasta}")
+                _build(["samtools", "faidx", fasta, "--fai-idx", f"{fai}.tmp"], fai, f"{fai}.tmp")
+                stamp["fai"] = digest
+            paths["fai"] = fai
+
+        if "dict" in artifacts:
+            seq_dict = dict_path(fasta)
+            if stamp.get("dict") != digest or not os.path.exists(seq_dict):
+                print(f"[INFO] Building sequence dictionary for {fasta}")
+                _build(["samtools", "dict", "-o", f"{seq_dict}.tmp", fasta], seq_dict, f"{seq_dict}.tmp")
+                stamp["dict"] = digest
+            paths["dict"] = seq_dict
+
+        _write_stamp(fasta, stamp)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build cached minimap2/faidx/dict artifacts for a reference.")
+    parser.add_argument("fasta", nargs="+", help="Reference FASTA file(s)")
+    parser.add_argument("--preset", default="map-pb", help="minimap2 preset")
+    args = parser.parse_args()
+
+    for fasta in args.fasta:
+        print(prepare_reference(fasta, args.preset))
@@ -0,0 +1,151 @@
+# distortopia/region_calling.py
+
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from distortopia.bgzf_writer import has_eof_block
+from distortopia.instrumentation import count, in_context, run_command, timed
+from distortopia.pipes import run_piped
+from distortopia.reference_cache import fasta_digest, prepare_reference
+from distortopia.scheduler import get_scheduler
+
+
+def genome_regions(fai_path, window_size=None):
+    """
+    Partition a genome into calling regions from its .fai.
+
+    Returns [(chrom, start, end)] with 1-based inclusive coordinates, in .fai
+    order, so concatenating per-region output gives a sorted file. With
+    window_size, chromosomes are cut into windows of at most that many bases.
+    """
+    regions = []
+    with open(fai_path) as f:
+        for line in f:
+            chrom, length = line.split("\t")[:2]
+            length = int(length)
+            step = window_size or length
+            for start in range(1, length + 1, step):
+                regions.append((chrom, start, min(start + step - 1, length)))
+    return regions
+
+
+def _output_type(path):
+    """bcftools -O flag for an output path."""
+    if path.endswith(".bcf"):
+        return "b"
+    if path.endswith((".vcf.gz", ".vcf.bgz")):
+        return "z"
+    return "v"
+
+
+def _call_region(reference_fasta, bams, region, part_path, mpileup_args, call_args, filter_args):
+    """Call one region to BCF; the part only appears under its final name once complete."""
+    chrom, start, end = region
+    tmp = f"{part_path}.tmp"
+    commands = [
+        ["bcftools", "mpileup", "-Ou", "-f", reference_fasta,
+         "-r", f"{chrom}:{start}-{end}", *mpileup_args, *bams],
+        ["bcftools", "call", "-Ou", *call_args],
+        ["bcftools", "view", "-Ob", "-o", tmp, *filter_args],
+    ]
+    try:
+        # one mpileup | call | view pipe keeps about one core busy
+        with get_scheduler().reserve("bcftools"):
+            run_piped(commands)
+        os.replace(tmp, part_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return part_path
+
+
+@timed("call_variants")
+def call_variants_by_region(reference_fasta, bams, output_vcf, mpileup_args=(),
+                            call_args=("-mv",), filter_args=(), workers=None,
+                            window_size=5_000_000, work_dir=None, keep_parts=False,
+                            log=print):
+    """
+    Run bcftools mpileup | call | view per genomic region in parallel and merge.
+
+    Each region is written to <work_dir>/<n>.bcf, and a region's part only
+    exists once its pipe has finished; a part that does not end in a BGZF
+    EOF block is treated as missing. A killed run can therefore be
+    restarted with the same arguments and only missing regions are called.
+    A manifest of the inputs (reference path and content digest, BAM paths
+    and mtimes) and arguments is kept in work_dir; if it does not match,
+    old parts are discarded. Parts are concatenated in genome
+    order into output_vcf (.vcf, .vcf.gz or .bcf), which is indexed when
+    compressed.
+
+    Args:
+        reference_fasta (str): Reference FASTA (a .fai is built if needed)
+        bams (str | list[str]): Sorted, indexed BAM/CRAM file(s)
+        output_vcf (str): Merged output path
+        mpileup_args, call_args, filter_args (sequence): Extra bcftools arguments
+        workers (int): Regions called concurrently (default: the scheduler's
+            CPU budget); each region also waits for a core from the scheduler
+        window_size (int): Maximum region length; None for whole chromosomes
+        work_dir (str): Directory for per-region parts (default: <output_vcf>.parts)
+        keep_parts (bool): Keep the per-region parts after merging
+    """
+    bams = [bams] if isinstance(bams, str) else list(bams)
+    workers = workers or get_scheduler().cpus
+    work_dir = work_dir or f"{output_vcf}.parts"
+
+    fai = prepare_reference(reference_fasta, artifacts=("fai",))["fai"]
+    regions = genome_regions(fai, window_size)
+    manifest = {
+        # content digest, read back from the stamp prepare_reference just refreshed
+        "reference": [os.path.abspath(reference_fasta), fasta_digest(reference_fasta)],
+        "bams": [[os.path.abspath(b), os.path.getmtime(b)] for b in bams],
+        "regions": regions,
+        "mpileup_args": list(mpileup_args),
+        "call_args": list(call_args),
+        "filter_args": list(filter_args),
+    }
+    manifest_path = os.path.join(work_dir, "manifest.json")
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if previous != json.loads(json.dumps(manifest)):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    parts = [os.path.join(work_dir, f"{i:06d}.bcf") for i in range(len(regions))]
+    # a part without the BGZF EOF block was truncated (e.g. by a full disk) and is called again
+    todo = [(region, part) for region, part in zip(regions, parts) if not has_eof_block(part)]
+    count(regions=len(regions), regions_called=len(todo))
+    log(f"🧬 Calling {len(todo)} of {len(regions)} regions on {workers} workers "
+        f"({len(regions) - len(todo)} already done)")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(in_context(_call_region), reference_fasta, bams, region, part,
+                        mpileup_args, call_args, filter_args)
+            for region, part in todo
+        ]
+        for future in futures:
+            future.result()
+
+    out_type = _output_type(output_vcf)
+    list_path = os.path.join(work_dir, "parts.txt")
+    with open(list_path, "w") as f:
+        f.write("\n".join(parts) + "\n")
+    concat = ["bcftools", "concat", "--threads", str(workers), f"-O{out_type}",
+              "-o", output_vcf, "-f", list_path]
+    if out_type == "b":
+        concat.insert(2, "--naive")  # parts are BCF already; just join the blocks
+    run_command(concat)
+    if out_type != "v":
+        run_command(["bcftools", "index", "-f", "--threads", str(workers), output_vcf])
+
+    if not keep_parts:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    log(f"✅ Region-parallel calling complete: {output_vcf}")
+    return output_vcf
@@ -0,0 +1,201 @@
+# distortopia/scheduler.py
+
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(size):
+    """Bytes in a size such as 768M, 4G or 1024 (plain numbers are bytes)."""
+    if isinstance(size, (int, float)):
+        return int(size)
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in _UNITS:
+        return int(float(size[:-1]) * _UNITS[size[-1]])
+    return int(size)
+
+
+def format_size(nbytes):
+    """Size in whole megabytes, as samtools -m accepts it."""
+    return f"{max(1, nbytes >> 20)}M"
+
+
+class Tool:
+    """
+    Resource profile of an external tool.
+
+    Args:
+        max_threads (int): Threads beyond which the tool stops scaling
+        base_memory (str|int): Resident memory independent of threads
+        thread_memory (str|int): Additional memory per thread
+    """
+
+    def __init__(self, max_threads, base_memory=0, thread_memory=0):
+        self.max_threads = max_threads
+        self.base_memory = parse_size(base_memory)
+        self.thread_memory = parse_size(thread_memory)
+
+    def memory(self, threads):
+        return self.base_memory + self.thread_memory * threads
+
+
+# Conservative profiles for Arabidopsis-sized genomes (~120-200 Mb).
+TOOLS = {
+    "minimap2": Tool(max_threads=16, base_memory="3G", thread_memory="64M"),
+    "samtools sort": Tool(max_threads=8, thread_memory="768M"),
+    "samtools index": Tool(max_threads=4, base_memory="64M"),
+    "bcftools": Tool(max_threads=1, base_memory="256M"),   # one mpileup | call | filter region
+    "badread": Tool(max_threads=1, base_memory="2G"),
+    "bgzip": Tool(max_threads=4, thread_memory="32M"),
+    # Python process pools (detect_crossovers): each worker holds the markers and a BAM handle
+    "python": Tool(max_threads=64, thread_memory="512M"),
+}
+
+
+def _total_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 8 << 30
+
+
+class Allocation:
+    """Threads and memory (bytes) granted to one tool."""
+
+    def __init__(self, tool, threads, memory):
+        self.tool = tool
+        self.threads = threads
+        self.memory = memory
+
+    @property
+    def memory_per_thread(self):
+        """Memory split over threads, e.g. for samtools sort -m."""
+        return format_size(self.memory // max(self.threads, 1))
+
+    def __repr__(self):
+        return f"Allocation({self.tool!r}, threads={self.threads}, memory={format_size(self.memory)})"
+
+
+class Scheduler:
+    """
+    CPU and memory budget shared by every external tool in the process.
+
+    allocate() sizes a group of tools that run together (e.g. minimap2 piped
+    into samtools sort): each starts at its requested or maximum useful
+    thread count, and threads are removed one at a time until the group
+    fits, from the tool nearest its scaling limit while cores are short and
+    from the most memory-hungry one while memory is. reserve() then blocks
+    until that many cores and bytes are free and returns them on exit, so
+    concurrent stages queue instead of oversubscribing the machine. Waiters
+    are served first come, first served, so a large job is not starved by a
+    stream of small ones. A group that cannot fit even at one thread per
+    tool runs alone.
+
+    Args:
+        cpus (int): Cores to use (default: DISTORTOPIA_CPUS or all cores)
+        memory (str|int): Memory to use (default: DISTORTOPIA_MEMORY or 80% of RAM)
+    """
+
+    def __init__(self, cpus=None, memory=None):
+        self.cpus = int(cpus or os.environ.get("DISTORTOPIA_CPUS") or os.cpu_count() or 1)
+        memory = memory or os.environ.get("DISTORTOPIA_MEMORY")
+        self.memory = parse_size(memory) if memory else int(_total_memory() * 0.8)
+        self.cpus_used = 0
+        self.memory_used = 0
+        self._cond = threading.Condition()
+        self._queue = deque()
+
+    def allocate(self, *requests):
+        """
+        Size a group of tools that run at the same time.
+
+        Args:
+            requests: Tool names, or (tool, threads) pairs; threads=None
+                lets the scheduler choose
+
+        Returns:
+            list[Allocation]: One per request, in order
+        """
+        requests = [(r, None) if isinstance(r, str) else r for r in requests]
+        tools = [TOOLS[tool] for tool, _ in requests]
+        threads = [max(1, min(n or tool.max_threads, self.cpus)) for tool, (_, n) in zip(tools, requests)]
+
+        def memory():
+            return sum(tool.memory(n) for tool, n in zip(tools, threads))
+
+        while sum(threads) > self.cpus or memory() > self.memory:
+            trimmable = [i for i, n in enumerate(threads) if n > 1]
+            if not trimmable:
+                break
+            if sum(threads) > self.cpus:
+                # the tool closest to its own scaling limit gives up a thread
+                i = max(trimmable, key=lambda i: (threads[i] / tools[i].max_threads, threads[i]))
+            else:
+                i = max(trimmable, key=lambda i: tools[i].thread_memory * threads[i])
+            threads[i] -= 1
+        return [Allocation(name, n, tool.memory(n)) for (name, _), tool, n in zip(requests, tools, threads)]
+
+    @contextmanager
+    def reserve(self, *requests):
+        """
+        Allocate a group (see allocate) and hold its cores and memory while the block runs.
+
+        Yields:
+            list[Allocation]: The granted allocations
+        """
+        allocations = self.allocate(*requests)
+        # an oversized group is charged the whole budget so it runs alone
+        cpus = min(sum(a.threads for a in allocations), self.cpus)
+        memory = min(sum(a.memory for a in allocations), self.memory)
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            while (self._queue[0] is not ticket or self.cpus_used + cpus > self.cpus
+                   or self.memory_used + memory > self.memory):
+                self._cond.wait()
+            self._queue.popleft()
+            self.cpus_used += cpus
+            self.memory_used += memory
+            self._cond.notify_all()
+        try:
+            yield allocations
+        finally:
+            with self._cond:
+                self.cpus_used -= cpus
+                self.memory_used -= memory
+                self._cond.notify_all()
+
+    def usage(self):
+        """Cores and bytes in use against the budget, and the number of waiting reservations."""
+        with self._cond:
+            return {"cpus": (self.cpus_used, self.cpus), "memory": (self.memory_used, self.memory),
+                    "waiting": len(self._queue)}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide Scheduler, created on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+
+def configure(cpus=None, memory=None):
+    """
+    Replace the process-wide budget (e.g. from a CLI --cpus/--memory).
+
+    Call before starting work: reservations held on the old scheduler are
+    not carried over.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = Scheduler(cpus, memory)
+        return _scheduler
@@ -0,0 +1,237 @@
+# distortopia/segregation.py
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from distortopia.crossover_writer import BREAKPOINT_COLUMNS, breakpoints_path_for, iter_table_chunks
+from distortopia.instrumentation import count, timed
+
+try:
+    from scipy.special import erfc
+except ImportError:
+    erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def _grow(array, size):
+    return array if len(array) >= size else np.concatenate([array, np.zeros(size - len(array), array.dtype)])
+
+
+class WindowCounts:
+    """
+    Per-window sums over crossover calls, filled one chunk at a time.
+
+    For every chromosome and window of window_size bases it keeps:
+        reads_T / reads_L:    reads whose informative markers are mostly
+                              Thaliana / Lyrata, binned by read midpoint
+        alleles_T / alleles_L: T / L marker calls, binned by read midpoint
+        covered_bases:        read bases overlapping the window
+        crossovers:           breakpoints, binned by interval midpoint
+    Every update is a np.bincount, and counts from separate runs (e.g. one
+    per shard) combine with merge().
+    """
+
+    FIELDS = ("reads_T", "reads_L", "alleles_T", "alleles_L", "covered_bases", "crossovers")
+
+    def __init__(self, window_size=100_000):
+        self.window_size = window_size
+        self.counts = {}
+
+    def _chrom(self, chrom, num_windows):
+        fields = self.counts.setdefault(chrom, {f: np.zeros(0, np.int64) for f in self.FIELDS})
+        for f in self.FIELDS:
+            fields[f] = _grow(fields[f], num_windows)
+        return fields
+
+    def add_reads(self, reads):
+        """Add a chunk of the read table (needs chrom, start, end, pattern)."""
+        w = self.window_size
+        alleles_T = reads["pattern"].str.count("T").to_numpy(np.int64)
+        alleles_L = reads["pattern"].str.count("L").to_numpy(np.int64)
+        for chrom, idx in reads.groupby("chrom", sort=False).indices.items():
+            start = reads["start"].to_numpy(np.int64)[idx]
+            end = reads["end"].to_numpy(np.int64)[idx]
+            t, l = alleles_T[idx], alleles_L[idx]
+            first, last = start // w, (end - 1) // w
+            mid = (start + end) // 2 // w
+            n = int(last.max()) + 2
+            fields = self._chrom(chrom, n)
+
+            fields["reads_T"][:n] += np.bincount(mid[t > l], minlength=n)
+            fields["reads_L"][:n] += np.bincount(mid[l > t], minlength=n)
+            fields["alleles_T"][:n] += np.bincount(mid, weights=t, minlength=n).astype(np.int64)
+            fields["alleles_L"][:n] += np.bincount(mid, weights=l, minlength=n).astype(np.int64)
+
+            # bases per window: partial first/last windows plus whole windows in between
+            same = first == last
+            partial = np.bincount(first[same], weights=(end - start)[same], minlength=n)
+            partial += np.bincount(first[~same], weights=((first + 1) * w - start)[~same], minlength=n)
+            partial += np.bincount(last[~same], weights=(end - last * w)[~same], minlength=n)
+            spans = np.bincount(first[~same] + 1, minlength=n) - np.bincount(last[~same], minlength=n)
+            fields["covered_bases"][:n] += partial.astype(np.int64) + np.cumsum(spans) * w
+
+    def add_breakpoints(self, breakpoints):
+        """Add a chunk of the breakpoint table (needs chrom, left_marker, right_marker)."""
+        for chrom, idx in breakpoints.groupby("chrom", sort=False).indices.items():
+            left = breakpoints["left_marker"].to_numpy(np.int64)[idx]
+            right = breakpoints["right_marker"].to_numpy(np.int64)[idx]
+            window = ((left + right) // 2 - 1) // self.window_size
+            n = int(window.max()) + 1
+            self._chrom(chrom, n)["crossovers"][:n] += np.bincount(window, minlength=n)
+
+    def merge(self, other):
+        for chrom, fields in other.counts.items():
+            n = len(fields["reads_T"])
+            mine = self._chrom(chrom, n)
+            for f in self.FIELDS:
+                mine[f][:n] += fields[f]
+        return self
+
+    def to_frame(self, chrom_lengths=None):
+        """
+        One row per window, trailing empty windows dropped unless chrom_lengths
+        is given. Chromosomes in chrom_lengths without any calls get zero-filled
+        windows, in chrom_lengths order ahead of any unlisted chromosomes.
+        """
+        chrom_lengths = chrom_lengths or {}
+        frames = []
+        for chrom in [*chrom_lengths, *(c for c in self.counts if c not in chrom_lengths)]:
+            if chrom in chrom_lengths:
+                length = chrom_lengths[chrom]
+                n = -(-length // self.window_size)
+                fields = self._chrom(chrom, n)
+            else:
+                fields = self.counts[chrom]
+                used = np.flatnonzero(np.any([fields[f] for f in self.FIELDS], axis=0))
+                n = int(used[-1]) + 1 if len(used) else 0
+                length = None
+            starts = np.arange(n, dtype=np.int64) * self.window_size
+            ends = starts + self.window_size
+            if length is not None:
+                ends = np.minimum(ends, length)
+            frames.append(pd.DataFrame({"chrom": chrom, "start": starts, "end": ends,
+                                        **{f: fields[f][:n] for f in self.FIELDS}}))
+        columns = ["chrom", "start", "end", *self.FIELDS]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def benjamini_hochberg(p_values):
+    """Benjamini-Hochberg adjusted p-values (NaN entries are ignored)."""
+    p = np.asarray(p_values, dtype=np.float64)
+    q = np.full_like(p, np.nan)
+    ok = np.flatnonzero(~np.isnan(p))
+    order = ok[np.argsort(p[ok])]
+    ranked = p[order] * len(order) / np.arange(1, len(order) + 1)
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+def segregation_tests(windows, expected_ratio=0.5):
+    """
+    Add transmission-ratio statistics to a window table.
+
+    Each window's Thaliana/Lyrata read counts are tested against
+    expected_ratio (the expected Lyrata fraction) with a 1-df chi-square
+    test; q_value is the Benjamini-Hochberg FDR across all tested windows.
+    crossover_cM_per_Mb is breakpoints per covered base, scaled to cM/Mb.
+    """
+    windows = windows.copy()
+    t = windows["reads_T"].to_numpy(np.float64)
+    l = windows["reads_L"].to_numpy(np.float64)
+    n = t + l
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected_l = n * expected_ratio
+        chi2 = (l - expected_l) ** 2 / (expected_l * (1 - expected_ratio))
+        windows["lyrata_fraction"] = l / n
+        windows["chi2"] = chi2
+        windows["p_value"] = erfc(np.sqrt(chi2 / 2)).astype(np.float64)
+        windows["crossover_cM_per_Mb"] = windows["crossovers"] / windows["covered_bases"] * 1e8
+    windows["q_value"] = benjamini_hochberg(windows["p_value"])
+    return windows
+
+
+def _summarize_file(reads_path, breakpoints_path, window_size, chunk_size):
+    counts = WindowCounts(window_size)
+    for chunk in iter_table_chunks(reads_path, ["chrom", "start", "end", "pattern"], chunk_size):
+        counts.add_reads(chunk)
+    if breakpoints_path:
+        for chunk in iter_table_chunks(breakpoints_path, BREAKPOINT_COLUMNS[1:4], chunk_size):
+            counts.add_breakpoints(chunk)
+    return counts
+
+
+@timed("segregation")
+def summarize_crossovers(read_tables, breakpoint_tables=None, output_path=None, window_size=100_000,
+                         chrom_lengths=None, expected_ratio=0.5, chunk_size=1_000_000, workers=1):
+    """
+    Summarize detect_crossovers output into a per-window segregation and
+    crossover-density table.
+
+    Tables are streamed chunk_size rows at a time, so memory depends on the
+    number of windows, not reads. Several read/breakpoint tables (e.g. shards
+    or replicate runs) are summarized independently, in parallel with
+    workers > 1, and their counts merged.
+
+    Args:
+        read_tables (str | list[str]): Read tables (.tsv or .parquet)
+        breakpoint_tables (str | list[str]): Matching breakpoint tables
+            (default: <read table>.breakpoints.<ext>; pass [] to skip)
+        output_path (str): Optional TSV for the window table
+        window_size (int): Window length in bases
+        chrom_lengths (dict): Chromosome lengths, to report every window
+        expected_ratio (float): Expected Lyrata transmission ratio
+        chunk_size (int): Rows read per chunk
+        workers (int): Files summarized concurrently
+
+    Returns:
+        pandas.DataFrame: One row per window with counts, tests and crossover density
+    """
+    read_tables = [read_tables] if isinstance(read_tables, str) else list(read_tables)
+    if breakpoint_tables is None:
+        breakpoint_tables = [breakpoints_path_for(p) for p in read_tables]
+    elif isinstance(breakpoint_tables, str):
+        breakpoint_tables = [breakpoint_tables]
+    breakpoint_tables = list(breakpoint_tables) or [None] * len(read_tables)
+
+    counts = WindowCounts(window_size)
+    jobs = list(zip(read_tables, breakpoint_tables))
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_summarize_file, r, b, window_size, chunk_size) for r, b in jobs]
+            for future in futures:
+                counts.merge(future.result())
+    else:
+        for r, b in jobs:
+            counts.merge(_summarize_file(r, b, window_size, chunk_size))
+
+    windows = segregation_tests(counts.to_frame(chrom_lengths), expected_ratio)
+    significant = int((windows["q_value"] < 0.05).sum())
+    count(windows=len(windows), distorted_windows=significant)
+    print(f"📊 Summarized {len(windows)} windows; {significant} show segregation distortion (FDR < 0.05).")
+    if output_path:
+        windows.to_csv(output_path, sep="\t", index=False)
+        print(f"✅ Segregation table saved to {output_path}.")
+    return windows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize crossover calls into segregation-distortion and crossover-density windows.")
+    parser.add_argument("reads", nargs="+", help="Read table(s) from detect_crossovers (.tsv or .parquet)")
+    parser.add_argument("--breakpoints", nargs="*", default=None, help="Breakpoint table(s) (default: <reads>.breakpoints.<ext>)")
+    parser.add_argument("--out", default="segregation_windows.tsv", help="Output TSV")
+    parser.add_argument("--window-size", type=int, default=100_000, help="Window length in bases")
+    parser.add_argument("--fai", default=None, help="Reference .fai, to report every window of every chromosome")
+    parser.add_argument("--expected-ratio", type=float, default=0.5, help="Expected Lyrata transmission ratio")
+    parser.add_argument("--workers", type=int, default=1, help="Tables summarized concurrently")
+    args = parser.parse_args()
+
+    lengths = None
+    if args.fai:
+        fai = pd.read_csv(args.fai, sep="\t", header=None, usecols=[0, 1], dtype={0: str})
+        lengths = dict(zip(fai[0], fai[1]))
+    summarize_crossovers(args.reads, args.breakpoints, args.out, args.window_size, lengths,
+                         args.expected_ratio, workers=args.workers)
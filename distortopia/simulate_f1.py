@@ -1,148 +1,243 @@
 # distortopia/simulate_f1.py
 
-import sys
 from Bio import SeqIO
-from itertools import chain
 import numpy as np
-import bisect
+
+from distortopia.crossover_model import (
+    CROSSOVER_MODELS,
+    build_genetic_maps,
+    gamete_crossovers,
+    load_recombination_map,
+    sample_crossovers,
+)
+from distortopia.bgzf_writer import ThreadedBgzfWriter
+from distortopia.instrumentation import count, run_command, timed
+from distortopia.read_sampler import simulate_reads
+from distortopia.vcf_io import load_vcf
+
+
+# Genomes are held as {chrom: np.ndarray[uint8]} with one ASCII byte per base,
+# instead of one Python str object per base.
+IUPAC = {
+    frozenset("AG"): "R", frozenset("CT"): "Y", frozenset("CG"): "S",
+    frozenset("AT"): "W", frozenset("GT"): "K", frozenset("AC"): "M",
+}
+# Lookup table so heterozygous sites can be encoded with one fancy-index:
+# _IUPAC_TABLE[base1, base2] -> ambiguity code byte ("N" when undefined).
+_IUPAC_TABLE = np.full((256, 256), ord("N"), dtype=np.uint8)
+for _bases, _code in IUPAC.items():
+    _b1, _b2 = (ord(b) for b in _bases)
+    _IUPAC_TABLE[_b1, _b2] = _IUPAC_TABLE[_b2, _b1] = ord(_code)
 
 
 def load_reference(fasta_file):
+    """Load a FASTA as {chrom: uint8 array of upper-case ASCII bases}."""
     ref = {}
     for record in SeqIO.parse(fasta_file, "fasta"):
-        ref[record.id] = list(record.seq.upper())
+        ref[record.id] = np.frombuffer(bytes(record.seq.upper()), dtype=np.uint8)
     return ref
 
-def load_variants(vcf_file):
+def copy_genome(genome):
+    """Return a writable copy of a {chrom: uint8 array} genome."""
+    return {chrom: np.array(seq, dtype=np.uint8) for chrom, seq in genome.items()}
+
+def load_variants(vcf_file, reference=None):
+    """
+    Load biallelic SNPs as sorted per-chromosome arrays.
+
+    Returns {chrom: {"positions": int64 array (0-based, sorted, unique),
+                     "alleles": uint8 array of ALT bases}}.
+    When a position is listed more than once the last record wins. Records
+    whose ALT is not a base (".", "*" or symbolic) are not SNPs and are
+    ignored; records with POS < 1 are dropped with a warning. With a
+    reference, sites on contigs it lacks or past the contig's end are
+    dropped with a warning too, as the per-base code used to skip them.
+    """
+    df = load_vcf(vcf_file)
+    alt = df["ALT"].astype(str).str.upper()
+    snps = df[(df["REF"].str.len() == 1) & alt.isin(["A", "C", "G", "T"])]
+    invalid = snps["POS"] < 1
+    if invalid.any():
+        count(variants_invalid_pos=int(invalid.sum()))
+        print(f"⚠️ Skipped {int(invalid.sum())} variant sites in {vcf_file} with POS < 1.")
+        snps = snps[~invalid]
+
     variants = {}
-    with open(vcf_file) as f:
-        for line in f:
-            if line.startswith("#"):
-                continue
-            fields = line.strip().split("\t")
-            if len(fields) < 5:
-                continue
-            chrom, pos, _, ref, alt = fields[:5]
-            pos = int(pos) - 1  # VCF is 1-based
-            if len(ref) == 1 and len(alt) == 1:
-                variants.setdefault(chrom, {})[pos] = alt.upper()
+    for chrom, rows in snps.groupby("CHROM", sort=False, observed=True):
+        positions = rows["POS"].to_numpy(np.int64) - 1  # VCF is 1-based
+        alleles = np.frombuffer("".join(rows["ALT"].astype(str)).upper().encode(), dtype=np.uint8)
+        order = np.argsort(positions, kind="stable")
+        positions, alleles = positions[order], alleles[order]
+        last = np.append(positions[1:] != positions[:-1], True)
+        variants[chrom] = {"positions": positions[last], "alleles": alleles[last]}
+    if reference is not None:
+        _drop_outside_reference(variants, reference, vcf_file)
     return variants
 
+def _drop_outside_reference(variants, reference, vcf_file):
+    """Remove variant sites that do not fall on a reference base, in place."""
+    dropped = 0
+    for chrom in list(variants):
+        positions = variants[chrom]["positions"]
+        keep = positions < len(reference[chrom]) if chrom in reference else np.zeros(len(positions), bool)
+        if keep.all():
+            continue
+        dropped += int((~keep).sum())
+        if keep.any():
+            variants[chrom] = {key: values[keep] for key, values in variants[chrom].items()}
+        else:
+            del variants[chrom]
+    if dropped:
+        count(variants_outside_reference=dropped)
+        print(f"⚠️ Skipped {dropped} variant sites in {vcf_file} outside the reference.")
+
+def _on_sequence(chrom_var, length):
+    """Restrict one chromosome's variants to positions below length."""
+    if not chrom_var or not len(chrom_var["positions"]) or chrom_var["positions"][-1] < length:
+        return chrom_var
+    keep = chrom_var["positions"] < length
+    return {key: values[keep] for key, values in chrom_var.items()}
+
+def _parental_alleles(seq, chrom_var1, chrom_var2):
+    """
+    Return (sites, base1, base2) over the union of both parents' variant sites.
+    Parents without a variant at a site carry the reference base.
+    """
+    # sites off the end of the sequence are ignored (load_variants warns about them)
+    chrom_var1 = _on_sequence(chrom_var1, len(seq))
+    chrom_var2 = _on_sequence(chrom_var2, len(seq))
+    empty = np.empty(0, dtype=np.int64)
+    pos1 = chrom_var1["positions"] if chrom_var1 else empty
+    pos2 = chrom_var2["positions"] if chrom_var2 else empty
+    sites = np.union1d(pos1, pos2)
+    base1 = seq[sites]
+    base2 = base1.copy()
+    if len(pos1):
+        base1[np.searchsorted(sites, pos1)] = chrom_var1["alleles"]
+    if len(pos2):
+        base2[np.searchsorted(sites, pos2)] = chrom_var2["alleles"]
+    return sites, base1, base2
+
 def apply_f1_variants(reference, var1, var2):
-    ref1 = reference
-    ref2 = reference.copy()
+    f1 = copy_genome(reference)
 
-    # ...
-    for chrom in reference:
+    # only variant sites can differ from the reference
+    for chrom, seq in reference.items():
         if chrom not in var1 and chrom not in var2:
             continue
-        for pos in range(len(reference[chrom])):
-            ref_base = reference[chrom][pos]
-            base1 = var1.get(chrom, {}).get(pos, ref_base)
-            base2 = var2.get(chrom, {}).get(pos, ref_base)
-
-            if base1 == base2:
-                reference[chrom][pos] = base1 #homozygous; use this base
-            elif base1 == ref_base:
-                reference[chrom][pos] = base2 #one parent differs; use ALT base
-            elif base2 == ref_base:
-                reference[chrom][pos] = base1
-            else:
-                code = IUPAC.get(frozenset([base1, base2]), 'N') #heterozygous; so use IUPAC
-                reference[chrom][pos] = code
-    return reference
-
-
-def crossover_random(reference, var1, var2):
-    ref = reference.copy()
-    for chrom in ref:
-        chrom_len = len(chrom)        
-        # random sample whether a crossover occurs on this chrom
-        if not np.random.binomial(1, 0.5):
-            # randomly no crossover pos as 0 or end of chrom pos
-            if np.random.binomial(1, 0.5):
-                crossover_pos = 0
-            else:
-                crossover_pos = chrom_len
-        else:
-            # random uniform sample position of crossover
-            crossover_pos = np.random.uniform(0, chrom_len)
-            
-        # apply variants from var1 until pos, then apply variants from var2
-        for pos in range(len(ref[chrom])):
-            ref_base = ref[chrom][pos]
-            if pos < crossover_pos:
-                base = var1.get(chrom, {}).get(pos, ref_base)
-            else:
-                base = var2.get(chrom, {}).get(pos, ref_base)
-            ref[chrom][pos] = base
+        sites, base1, base2 = _parental_alleles(seq, var1.get(chrom), var2.get(chrom))
+        ref_base = seq[sites]
+        f1[chrom][sites] = np.select(
+            [base1 == base2,     # homozygous; use this base
+             base1 == ref_base,  # one parent differs; use ALT base
+             base2 == ref_base],
+            [base1, base2, base1],
+            _IUPAC_TABLE[base1, base2],  # heterozygous; so use IUPAC
+        )
+    return f1
+
+
+def apply_crossovers(reference, var1, var2, gamete):
+    """
+    Build a recombinant genome from one gamete's crossover breakpoints.
+
+    gamete is {chrom: {"breakpoints": sorted int array, "start_parent": 0|1}};
+    a site takes var1 or var2 depending on how many breakpoints precede it.
+    """
+    ref = copy_genome(reference)
+    for chrom, seq in reference.items():
+        sites, base1, base2 = _parental_alleles(seq, var1.get(chrom), var2.get(chrom))
+        crossovers = gamete.get(chrom, {"breakpoints": np.empty(0, dtype=np.int64), "start_parent": 0})
+        parent = (crossovers["start_parent"]
+                  + np.searchsorted(crossovers["breakpoints"], sites, side="right")) % 2
+        ref[chrom][sites] = np.where(parent == 0, base1, base2)
     return ref
 
 
-def crossover_random_and_sim_reads(reference, var1, var2):
-    ref = reference.copy()
-    for chrom in ref:
-        chrom_len = len(chrom)        
-        # random sample whether a crossover occurs on this chrom
-        if not np.random.binomial(1, 0.5):
-            # randomly no crossover pos as 0 or end of chrom pos
-            if np.random.binomial(1, 0.5):
-                crossover_pos = 0
-            else:
-                crossover_pos = chrom_len
-        else:
-            # random uniform sample position of crossover
-            crossover_pos = np.random.uniform(0, chrom_len)
-            
-        # apply variants from var1 until pos, then apply variants from var2
-        for pos in range(len(ref[chrom])):
-            ref_base = ref[chrom][pos]
-            if pos < crossover_pos:
-                base = var1.get(chrom, {}).get(pos, ref_base)
-            else:
-                base = var2.get(chrom, {}).get(pos, ref_base)
-            ref[chrom][pos] = base
-
-    # sample/sim reads from this reference
-    reads = []
-    chrom_lens = [len(i) for i in ref]
-
-    # iterate over copies of the genome
-    # get list of positions to sim reads from
-    # assuming 1000 reps (genomes)
-    # and readlen=10000
-    # we need 3000 reads per rep to get 60X coverage.
-    for i in range(30):
-        chrom_idx, pos_in_chrom = sample_chrom_position(chrom_lens)
-        try:
-            chrom = ref[chrom_idx].copy()
-            read = chrom[pos_in_chrom:pos_in_chrom + 10000]
-            read.id = f"read{i}"
-            reads.append(read)
-        except IndexError:
-            pass
-    return reads
-
-
-def sample_chrom_position(chrom_lens):
-    chrom_starts = np.cumsum([0] + chrom_lens[:-1]).tolist()
-    total_len = sum(chrom_lens)
-    print(f"Total length:{chrom_lens}")
-    rand_pos = np.random.randint(0, total_len)
-    chrom_index = bisect.bisect_right(chrom_starts, rand_pos) - 1
-    pos_in_chrom = rand_pos - chrom_starts[chrom_index]
-    return chrom_index, pos_in_chrom
+def crossover_random(reference, var1, var2, rng=None, model="single",
+                     genetic_maps=None, interference=1.0):
+    """Build one recombinant gamete; see crossover_model.sample_crossovers for models."""
+    if genetic_maps is None:
+        genetic_maps = build_genetic_maps({chrom: len(seq) for chrom, seq in reference.items()})
+    crossovers = sample_crossovers(genetic_maps, 1, rng, model, interference)
+    return apply_crossovers(reference, var1, var2, gamete_crossovers(crossovers, 0))
+
+
+def draw_gamete_crossovers(reference, num_reps, seed=None, model="single",
+                           rec_map=None, interference=1.0):
+    """
+    Sample crossovers for all num_reps gametes in one batch.
+
+    The batch is drawn from its own stream of SeedSequence(seed), so serial
+    and parallel runs with the same seed produce the same gametes.
+    """
+    genetic_maps = build_genetic_maps(
+        {chrom: len(seq) for chrom, seq in reference.items()}, rec_map
+    )
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    return sample_crossovers(genetic_maps, num_reps, rng, model, interference)
+
+
+def crossover_random_and_sim_reads(reference, var1, var2, output_fq, coverage=60,
+                                   rng=None, name_prefix="", **read_kwargs):
+    """
+    Build one recombinant gamete and stream simulated long reads from it.
+
+    Reads are drawn in one vectorized call by read_sampler.simulate_reads, so
+    e.g. 1000 reps at 0.06x each add up to 60X without a per-read Python loop.
+    Returns the number of reads written to output_fq.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    ref = crossover_random(reference, var1, var2, rng=rng)
+    return simulate_reads(ref, output_fq, coverage, rng, name_prefix, **read_kwargs)
+
+
+def _wrap_sequence(seq, width=60):
+    """Return FASTA-wrapped bytes for a uint8 sequence without per-line slicing."""
+    seq = np.asarray(seq, dtype=np.uint8)
+    full = len(seq) // width
+    body = np.empty((full, width + 1), dtype=np.uint8)
+    body[:, :width] = seq[:full * width].reshape(full, width)
+    body[:, width] = ord("\n")
+    tail = seq[full * width:].tobytes()
+    return body.tobytes() + (tail + b"\n" if tail else b"")
+
+
+def iter_recombinant_gametes(reference, var1, var2, num_reps, seed=None,
+                             model="single", rec_map=None, interference=1.0):
+    """Yield (rep, genome) recombinant gametes one at a time."""
+    crossovers = draw_gamete_crossovers(reference, num_reps, seed, model, rec_map, interference)
+    for rep in range(num_reps):
+        yield rep, apply_crossovers(reference, var1, var2, gamete_crossovers(crossovers, rep))
+
+
+def open_fasta_writer(output_file):
+    """Open a binary FASTA handle; paths ending in .gz are written as BGZF."""
+    if output_file.endswith(".gz"):
+        return ThreadedBgzfWriter(output_file)
+    return open(output_file, "wb")
 
 
 def write_fasta(copies, output_file):
-    with open(output_file, "w") as out:
-        for rep, reference in copies.items():
-            for chrom in reference:
-                seq = reference[chrom]
-                seqstr = "".join(seq[chrom])
-                out.write(f">{chrom}_rep{rep}_{seq.id}\n")
-                for i in range(0, len(seqstr), 60):
-                    out.write(seqstr[i:i+60] + "\n")
+    """
+    Write replicate genomes to one FASTA as ">{chrom}_rep{rep}" records.
+
+    copies may be a {rep: genome} dict or any iterable of (rep, genome)
+    pairs; each genome is written as soon as it is produced, so a generator
+    such as iter_recombinant_gametes keeps only one replicate in memory.
+    """
+    items = copies.items() if hasattr(copies, "items") else copies
+    with open_fasta_writer(output_file) as out:
+        for rep, reference in items:
+            for chrom, seq in reference.items():
+                out.write(f">{chrom}_rep{rep}\n".encode())
+                out.write(_wrap_sequence(seq))
+
+
+def index_fasta(fasta_file):
+    """Build .fai (and .gzi for BGZF input) with samtools faidx."""
+    run_command(["samtools", "faidx", fasta_file])
+
 
 #def generate_f1_from_files(ref_fasta, vcf1, vcf2, output_path):
     #ref_seq = load_reference(ref_fasta)
@@ -151,21 +246,49 @@ def write_fasta(copies, output_file):
     #f1_seq = apply_f1_variants(ref_seq, variants1, variants2)
     #write_fasta(f1_seq, output_path)
 
-def generate_f1_from_files(ref_fasta, vcf1, vcf2, output_path, num_reps):
+@timed("simulate_f1")
+def generate_f1_from_files(ref_fasta, vcf1, vcf2, output_path, num_reps=1,
+                           seed=None, index=False, model="single",
+                           rec_map_path=None, interference=1.0):
+    """
+    Write num_reps recombinant F1 gametes to output_path.
+
+    Replicates are streamed to disk as they are generated, so memory stays at
+    one reference plus one gamete however many replicates are requested.
+    Use a .gz output path for BGZF compression and index=True for a faidx index.
+    """
     ref_seq = load_reference(ref_fasta)
-    variants1 = load_variants(vcf1)
-    variants2 = load_variants(vcf2)
-    copies = {}
-    for i in range(num_reps): #generating multiple F1 fastas
-        f1_seq = crossover_random_and_sim_reads(ref_seq, variants1, variants2)
-        copies[i] = f1_seq
-    write_fasta(copies, output_path)
+    variants1 = load_variants(vcf1, ref_seq)
+    variants2 = load_variants(vcf2, ref_seq)
+    rec_map = load_recombination_map(rec_map_path) if rec_map_path else None
+    count(chromosomes=len(ref_seq), gametes=num_reps,
+          variants_1=sum(len(v["positions"]) for v in variants1.values()),
+          variants_2=sum(len(v["positions"]) for v in variants2.values()))
+    gametes = iter_recombinant_gametes(ref_seq, variants1, variants2, num_reps, seed,
+                                       model, rec_map, interference)
+    write_fasta(gametes, output_path)
+    if index:
+        index_fasta(output_path)
 
 # --- CLI mode ---
 if __name__ == "__main__":
-    if len(sys.argv) != 5:
-        print("Usage: python simulate_f1.py ref.fna parent1.vcf parent2.vcf output.fna")
-        sys.exit(1)
-    generate_f1_from_files(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4])
-    print(f"F1_hybrid FASTA written to {sys.argv[4]}")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate recombinant F1 gametes from two parental VCFs.")
+    parser.add_argument("ref", help="Reference .fna file")
+    parser.add_argument("vcf1", help="Parent 1 VCF")
+    parser.add_argument("vcf2", help="Parent 2 VCF")
+    parser.add_argument("output", help="Output FASTA (.fna, or .fna.gz for BGZF)")
+    parser.add_argument("--reps", type=int, default=1, help="Number of recombinant gametes")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible replicates")
+    parser.add_argument("--index", action="store_true", help="Index the output with samtools faidx")
+    parser.add_argument("--model", choices=CROSSOVER_MODELS, default="single", help="Crossover model")
+    parser.add_argument("--rec-map", default=None, help="Recombination map TSV (CHROM, START, END, RATE in cM/Mb)")
+    parser.add_argument("--interference", type=float, default=1.0, help="Gamma interference shape (gamma model)")
+    args = parser.parse_args()
 
+    generate_f1_from_files(args.ref, args.vcf1, args.vcf2, args.output,
+                           num_reps=args.reps, seed=args.seed, index=args.index,
+                           model=args.model, rec_map_path=args.rec_map,
+                           interference=args.interference)
+    print(f"F1_hybrid FASTA written to {args.output}")
@@ -4,19 +4,24 @@
 
 import subprocess
 import argparse
-import gzip
-import shutil
-import os
 from datetime import datetime
 
-def log(message, log_path="simulate_hybrid_reads.log"):
+from distortopia.bgzf_writer import stream_command_to_bgzf
+from distortopia.instrumentation import timed
+from distortopia.scheduler import get_scheduler
+
+def log(message, log_path="simulate_hybrid_reads.log", log_box=None):
     timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
     with open(log_path, "a") as f:
         f.write(f"{timestamp} {message}\n")
+    if log_box:
+        log_box.text(message)
 
+@timed("simulate_f1_reads")
 def simulate_long_reads(reference_fasta, output_fq, coverage="60x",
                         read_length_mean=8000, read_length_sd=3000,
-                        error_model="pacbio2021", gzip_output=True):
+                        error_model="pacbio2021", gzip_output=True,
+                        threads=None, index=False, log_box=None):
 
     cmd = [
         "badread", "simulate",
@@ -26,39 +31,27 @@ def simulate_long_reads(reference_fasta, output_fq, coverage="60x",
         "--error_model", error_model
     ]
 
-    # Streamlit placeholder for real-time output
-    log_box = st.empty()
-    log_box.text(f"🚀 Running Badread: {' '.join(cmd)}")
+    log(f"🚀 Running Badread: {' '.join(cmd)}", log_box=log_box)
 
-    # Start process
     try:
-        with open(output_fq, "w") as f_out:
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-
-            for line in proc.stdout:
-                f_out.write(line)
-                log_box.text(line.strip())  # update live in Streamlit
-
-            proc.wait()
-            if proc.returncode != 0:
-                log_box.text("❌ Badread simulation failed.")
-                raise RuntimeError("Badread simulation failed.")
-        
-        log_box.text(f"✅ Badread wrote: {output_fq}")
-
-        # Compress if needed
+        # Badread stdout goes straight into a multithreaded BGZF writer;
+        # no uncompressed FASTQ is written and nothing is re-read.
         if gzip_output:
             out_fq_gz = output_fq + ".gz"
-            with open(output_fq, "rb") as f_in, gzip.open(out_fq_gz, "wb") as f_out:
-                shutil.copyfileobj(f_in, f_out)
-            os.remove(output_fq)
-            log_box.text(f"✅ Output gzipped: {out_fq_gz}")
+            with get_scheduler().reserve("badread", ("bgzip", threads)) as (_, bgzip):
+                stream_command_to_bgzf(cmd, out_fq_gz, threads=bgzip.threads, index=index)
+            log(f"✅ Badread wrote: {out_fq_gz}", log_box=log_box)
             return out_fq_gz
 
+        with get_scheduler().reserve("badread"), open(output_fq, "wb") as f_out:
+            proc = subprocess.run(cmd, stdout=f_out, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Badread simulation failed:\n{proc.stderr.decode(errors='replace')}")
+        log(f"✅ Badread wrote: {output_fq}", log_box=log_box)
         return output_fq
 
     except Exception as e:
-        log_box.text(f"❌ Error: {e}")
+        log(f"❌ Error: {e}", log_box=log_box)
         raise
 
 
@@ -66,8 +59,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Simulate F1 hybrid long reads with Badread")
     parser.add_argument("reference", help="Path to F1_hybrid.fna")
     parser.add_argument("output_prefix", help="Prefix for output (e.g., F1_hybrid)")
+    parser.add_argument("--threads", type=int, default=None, help="Compression threads")
+    parser.add_argument("--index", action="store_true", help="Write .fai/.gzi for the compressed FASTQ")
     args = parser.parse_args()
 
-    simulate_long_reads(args.reference, args.output_prefix)
+    simulate_long_reads(args.reference, f"{args.output_prefix}.fq",
+                        threads=args.threads, index=args.index)
     print(f"✅ F1 long reads written to {args.output_prefix}.fq.gz")
-
@@ -1,12 +1,27 @@
 import subprocess
 import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
-def simulate_long_reads(reference_fasta, output_fq, coverage="60x", 
+import numpy as np
+from Bio import SeqIO
+
+from distortopia.bgzf_writer import ThreadedBgzfWriter, concat_bgzf, stream_command_to_bgzf
+from distortopia.instrumentation import count, in_context, popen, run_command, timed, wait_process
+from distortopia.scheduler import get_scheduler
+
+@timed("simulate_reads")
+def simulate_long_reads(reference_fasta, output_fq, coverage="60x",
                         read_length_mean=8000, read_length_sd=3000,
-                        error_model="pacbio2021", gzip_output=True):
+                        error_model="pacbio2021", gzip_output=True,
+                        shards=1, seed=None, by_chromosome=False,
+                        threads=None, index=False):
     """
     Runs Badread to simulate long reads from a reference FASTA.
-    
+
     Args:
         reference_fasta (str): Path to reference .fna file
         output_fq (str): Output FASTQ file path (e.g., sim_lyrata.fq)
@@ -14,9 +29,22 @@ def simulate_long_reads(reference_fasta, output_fq, coverage="60x",
         read_length_mean (int): Mean read length
         read_length_sd (int): Standard deviation of read length
         error_model (str): Badread error model (e.g., "pacbio2021")
-        gzip_output (bool): Whether to gzip the output
+        gzip_output (bool): Whether to BGZF-compress the output
+        shards (int): Number of Badread processes to run in parallel
+        seed (int): Base seed; shard i runs with seed + i
+        by_chromosome (bool): Simulate each chromosome separately
+        threads (int): Compression threads (single-shard runs; default: scheduler)
+        index (bool): Also write .fai/.gzi indexes for the compressed FASTQ
     """
-    
+    if gzip_output and not output_fq.endswith(".gz"):
+        output_fq = output_fq + ".gz"
+
+    if shards > 1 or by_chromosome:
+        return simulate_long_reads_sharded(
+            reference_fasta, output_fq, coverage, read_length_mean, read_length_sd,
+            error_model, gzip_output, shards, seed, by_chromosome, index
+        )
+
     cmd = [
         "badread", "simulate",
         "--reference", reference_fasta,
@@ -24,17 +52,199 @@ def simulate_long_reads(reference_fasta, output_fq, coverage="60x",
         "--length", f"{read_length_mean},{read_length_sd}",
         "--error_model", error_model
     ]
+    if seed is not None:
+        cmd += ["--seed", str(seed)]
 
-    # Open gzip pipe if requested
+    # Compress Badread's stdout directly, without an intermediate FASTQ
     if gzip_output:
-        out_fq_gz = output_fq + ".gz"
-        with open(out_fq_gz, "wb") as f:
-            p1 = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-            p2 = subprocess.Popen(["gzip"], stdin=p1.stdout, stdout=f)
-            p1.stdout.close()
-            p2.communicate()
-        return out_fq_gz
+        with get_scheduler().reserve("badread", ("bgzip", threads)) as (_, bgzip):
+            return stream_command_to_bgzf(cmd, output_fq, threads=bgzip.threads, index=index)
     else:
-        with open(output_fq, "w") as f:
-            subprocess.run(cmd, stdout=f, check=True)
+        with get_scheduler().reserve("badread"), open(output_fq, "w") as f:
+            run_command(cmd, stdout=f)
         return output_fq
+
+
+def _parse_depth(coverage):
+    """Parse a Badread-style relative depth such as "60x"."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*[xX]\s*", str(coverage))
+    if not match:
+        raise ValueError(f"Sharded simulation needs a relative depth like '60x', got {coverage!r}.")
+    return float(match.group(1))
+
+
+def _split_bases(total, parts):
+    """Split an integer base count into `parts` integers that sum exactly to total."""
+    base, extra = divmod(int(total), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _plan_shards(reference_fasta, depth, shards, by_chromosome, work_dir):
+    """
+    Return [(name, fasta, bases)] work units covering depth x the genome.
+
+    Whole-genome shards split the total evenly; per-chromosome units get
+    depth x their own length, split further into `shards` pieces each.
+    """
+    units = []
+    if by_chromosome:
+        for record in SeqIO.parse(reference_fasta, "fasta"):
+            chrom_fa = os.path.join(work_dir, f"{len(units)}.fna")
+            SeqIO.write(record, chrom_fa, "fasta")
+            for i, bases in enumerate(_split_bases(depth * len(record), shards)):
+                units.append((f"{record.id}_s{i}", chrom_fa, bases))
+    else:
+        genome_size = sum(len(record) for record in SeqIO.parse(reference_fasta, "fasta"))
+        for i, bases in enumerate(_split_bases(depth * genome_size, shards)):
+            units.append((f"s{i}", reference_fasta, bases))
+    return [unit for unit in units if unit[2] > 0]
+
+
+class _ShardGroup:
+    """Badread processes of one sharded run; abort() kills them and stops new ones starting."""
+
+    def __init__(self):
+        self.aborted = False
+        self._procs = set()
+        self._lock = threading.Lock()
+
+    def start(self, cmd, **kwargs):
+        with self._lock:
+            if self.aborted:
+                raise RuntimeError("Cancelled after another Badread shard failed.")
+            proc = popen(cmd, **kwargs)
+            self._procs.add(proc)
+            return proc
+
+    def finished(self, proc):
+        with self._lock:
+            self._procs.discard(proc)
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            for proc in self._procs:
+                if proc.poll() is None:
+                    proc.kill()
+
+
+def _run_shard(name, fasta, bases, seed, part_path, read_length_mean, read_length_sd,
+               error_model, gzip_output, index=False, group=None):
+    """
+    Run one Badread process and write its reads, renamed {name}_{n}, to part_path.
+
+    Returns the closed writer, whose offsets concat_bgzf uses to merge indexes.
+    With a _ShardGroup, the process is registered so a failing sibling can kill it.
+    """
+    cmd = [
+        "badread", "simulate",
+        "--reference", fasta,
+        "--quantity", str(bases),
+        "--length", f"{read_length_mean},{read_length_sd}",
+        "--error_model", error_model,
+        "--seed", str(seed),
+    ]
+    if gzip_output:
+        out = ThreadedBgzfWriter(part_path, threads=1, fastq_index=index)
+    else:
+        out = open(part_path, "wb")
+    # Badread reports progress on stderr; spool it to disk so the pipe never fills
+    err_log = tempfile.TemporaryFile()
+    with get_scheduler().reserve("badread", ("bgzip", 1)):
+        with out, err_log:
+            proc = (group.start if group else popen)(cmd, stdout=subprocess.PIPE, stderr=err_log)
+            i = -1
+            for i, line in enumerate(proc.stdout):
+                if i % 4 == 0:
+                    # keep Badread's description (source position, error info)
+                    _, _, comment = line.partition(b" ")
+                    line = f"@{name}_{i // 4} ".encode() + comment if comment else f"@{name}_{i // 4}\n".encode()
+                out.write(line)
+            code = wait_process(proc)
+            if group:
+                group.finished(proc)
+            if code != 0:
+                err_log.seek(0)
+                raise RuntimeError(f"Badread shard {name} failed:\n{err_log.read().decode(errors='replace')}")
+        count(reads=(i + 1) // 4)
+    return out
+
+
+def simulate_long_reads_sharded(reference_fasta, output_fq, coverage="60x",
+                                read_length_mean=8000, read_length_sd=3000,
+                                error_model="pacbio2021", gzip_output=True,
+                                shards=None, seed=None, by_chromosome=False, index=False):
+    """
+    Split a Badread run into independent shards that run in parallel.
+
+    The requested depth is converted to an absolute base count and divided
+    so the shards sum exactly to depth x genome size. Shard i uses seed + i
+    and names its reads {shard}_{n}, so a fixed seed gives the same reads
+    and names whatever the scheduling. All units (shards, or chromosomes
+    with by_chromosome) are submitted at once and each waits for a Badread
+    slot from the process-wide scheduler. Shards are concatenated in order into
+    one BGZF (or plain) FASTQ; with index=True the per-shard .fai/.gzi
+    offsets are merged as well. The first failing shard cancels the queued
+    ones and kills those still running, and its error is raised.
+    """
+    shards = shards or os.cpu_count() or 1
+    depth = _parse_depth(coverage)
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0] >> 1)
+    print(f"[INFO] Badread sharded run: {shards} shards, seed {seed}")
+
+    out_dir = os.path.dirname(os.path.abspath(output_fq))
+    work_dir = tempfile.mkdtemp(prefix=".badread_", dir=out_dir)
+    try:
+        units = _plan_shards(reference_fasta, depth, shards, by_chromosome, work_dir)
+        # one thread per unit up to the core budget; the scheduler caps concurrent Badreads
+        group = _ShardGroup()
+        with ThreadPoolExecutor(max_workers=max(1, min(len(units), get_scheduler().cpus))) as pool:
+            futures = [
+                pool.submit(in_context(_run_shard), name, fasta, bases, seed + i,
+                            os.path.join(work_dir, f"part{i}.fq"),
+                            read_length_mean, read_length_sd, error_model, gzip_output, index, group)
+                for i, (name, fasta, bases) in enumerate(units)
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((f for f in futures if f in done and f.exception()), None)
+            if failed is not None:
+                group.abort()
+                for future in futures:
+                    future.cancel()
+                raise failed.exception()
+            parts = [future.result() for future in futures]
+        if gzip_output:
+            concat_bgzf(parts, output_fq, index=index)
+        else:
+            with open(output_fq, "wb") as out:
+                for part in parts:
+                    with open(part.name, "rb") as f_in:
+                        shutil.copyfileobj(f_in, out)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[DONE] Wrote {len(units)} Badread shards to {output_fq}")
+    return output_fq
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate long reads with Badread.")
+    parser.add_argument("reference", help="Reference .fna file")
+    parser.add_argument("output", help="Output FASTQ (e.g., sim_lyrata.fq.gz)")
+    parser.add_argument("--coverage", default="60x", help="Relative depth, e.g. 60x")
+    parser.add_argument("--shards", type=int, default=1, help="Parallel Badread processes")
+    parser.add_argument("--seed", type=int, default=None, help="Base seed for Badread shards")
+    parser.add_argument("--by-chromosome", action="store_true", help="Simulate each chromosome separately")
+    parser.add_argument("--no-gzip", action="store_true", help="Write plain FASTQ")
+    parser.add_argument("--threads", type=int, default=None, help="Compression threads")
+    parser.add_argument("--index", action="store_true", help="Write .fai/.gzi for the compressed FASTQ")
+    args = parser.parse_args()
+
+    out = simulate_long_reads(args.reference, args.output, coverage=args.coverage,
+                              gzip_output=not args.no_gzip, shards=args.shards,
+                              seed=args.seed, by_chromosome=args.by_chromosome,
+                              threads=args.threads, index=args.index)
+    print(f"✅ Reads written to {out}")
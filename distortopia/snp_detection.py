@@ -1,36 +1,32 @@
-import subprocess
-import os
+from distortopia.align_reads import sort_command
+from distortopia.instrumentation import run_command, timed
+from distortopia.pipes import run_piped
+from distortopia.reference_cache import prepare_reference
+from distortopia.region_calling import call_variants_by_region
+from distortopia.scheduler import get_scheduler
 
-def run_pipeline(ref, fq, vcf_out):
-    sam = fq.replace(".fq", ".sam")
-    bam = fq.replace(".fq", ".bam")
+@timed("snp_detection")
+def run_pipeline(ref, fq, vcf_out, threads=None, sort_threads=None):
     sorted_bam = fq.replace(".fq", ".sort.bam")
 
-    # Ensure FASTA index exists
-    if not os.path.exists(f"{ref}.fai"):
-        subprocess.run(["samtools", "faidx", ref], check=True)
+    # Reuse the cached minimap2 index and FASTA index
+    ref_index = prepare_reference(ref, "map-pb", artifacts=("mmi", "fai"))["mmi"]
 
-    # Align and convert to sorted BAM
-    subprocess.run(["minimap2", "-ax", "map-pb", ref, fq], stdout=open(sam, "w"), check=True)
-    subprocess.run(["samtools", "view", "-bS", sam], stdout=open(bam, "wb"), check=True)
-    subprocess.run(["samtools", "sort", "-o", sorted_bam, bam], check=True)
-    subprocess.run(["samtools", "index", sorted_bam], check=True)
+    # Align straight into a sorted BAM, within the shared CPU/memory budget
+    with get_scheduler().reserve(("minimap2", threads), ("samtools sort", sort_threads)) as (align, sort):
+        run_piped([
+            ["minimap2", "-t", str(align.threads), "-ax", "map-pb", ref_index, fq],
+            sort_command(sorted_bam, sort.threads, sort.memory_per_thread),
+        ])
+    with get_scheduler().reserve("samtools index"):
+        run_command(["samtools", "index", sorted_bam])
 
-    # Variant calling with relaxed thresholds
-    with open(vcf_out, "w") as vcf:
-        mpileup = subprocess.Popen([
-            "bcftools", "mpileup",
-            "-f", ref,
-            "--max-depth", "10000",
-            "-a", "AD,DP",
-            sorted_bam
-        ], stdout=subprocess.PIPE)
-
-        subprocess.run([
-            "bcftools", "call",
-            "-mv",    # call both SNPs and indels
-            "-Ov"     # output VCF in text format
-        ], stdin=mpileup.stdout, stdout=vcf, check=True)
+    # Variant calling with relaxed thresholds, one bcftools stream per region
+    call_variants_by_region(
+        ref, sorted_bam, vcf_out,
+        mpileup_args=["--max-depth", "10000", "-a", "AD,DP"],
+        call_args=["-mv"],    # call both SNPs and indels
+        workers=threads,
+    )
 
     return vcf_out
-
@@ -1,29 +1,19 @@
-import subprocess
 
-def call_variants(reference_fasta, sorted_bam, output_vcf):
+from distortopia.region_calling import call_variants_by_region
+
+def call_variants(reference_fasta, sorted_bam, output_vcf, workers=None, window_size=5_000_000):
     """
-    Call high-confidence SNPs using bcftools with multithreading and filtering.
+    Call high-confidence SNPs using bcftools with region-parallel calling and filtering.
     """
     print(f"[INFO] Calling variants from {sorted_bam} → {output_vcf}")
 
-    with open(output_vcf, "w") as vcf_out:
-        mpileup = subprocess.Popen(
-            ["bcftools", "mpileup", "-Ou", "-f", reference_fasta,
-             "--threads", "8", "--max-depth", "250", sorted_bam],
-            stdout=subprocess.PIPE
-        )
-        call = subprocess.Popen(
-            ["bcftools", "call", "-mv", "-Ou", "--threads", "8"],
-            stdin=mpileup.stdout,
-            stdout=subprocess.PIPE
-        )
-        view = subprocess.run(
-            ["bcftools", "view", "-Ov", "-v", "snps", "-m2", "-M2",
-             "-i", "QUAL>20 && DP>10"],
-            stdin=call.stdout,
-            stdout=vcf_out,
-            check=True
-        )
+    call_variants_by_region(
+        reference_fasta, sorted_bam, output_vcf,
+        mpileup_args=["--max-depth", "250"],
+        call_args=["-mv"],
+        filter_args=["-v", "snps", "-m2", "-M2", "-i", "QUAL>20 && DP>10"],
+        workers=workers,
+        window_size=window_size,
+    )
 
     print(f"[DONE] Wrote filtered VCF: {output_vcf}")
-
@@ -0,0 +1,93 @@
+# distortopia/vcf_io.py
+
+import csv
+import gzip
+
+import pandas as pd
+import pysam
+from pandas.api.types import union_categoricals
+
+VCF_COLUMNS = ["CHROM", "POS", "REF", "ALT"]
+_DTYPES = {"CHROM": "category", "POS": "int32", "REF": "category", "ALT": "category"}
+
+
+def _pysam_chunks(vcf_path, chunk_size, region):
+    """Records through pysam.VariantFile (BCF, or an indexed VCF when a region is given)."""
+    with pysam.VariantFile(vcf_path) as vcf:
+        records = vcf.fetch(region=region) if region else vcf
+        rows = []
+        for rec in records:
+            rows.append((rec.chrom, rec.pos, rec.ref, ",".join(rec.alts or ".")))
+            if len(rows) == chunk_size:
+                yield pd.DataFrame(rows, columns=VCF_COLUMNS).astype(_DTYPES)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=VCF_COLUMNS).astype(_DTYPES)
+
+
+def _header_lines(vcf_path):
+    """Number of leading '#' lines (meta-information and #CHROM) of a plain or gzipped VCF."""
+    with open(vcf_path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    n = 0
+    with (gzip.open(vcf_path, "rb") if gzipped else open(vcf_path, "rb")) as f:
+        for line in f:
+            if not line.startswith(b"#"):
+                break
+            n += 1
+    return n
+
+
+def iter_vcf_chunks(vcf_path, chunk_size=1_000_000, region=None):
+    """
+    Yield CHROM/POS/REF/ALT of a VCF as DataFrames of at most chunk_size rows.
+
+    Plain and bgzipped VCFs are parsed with pandas' C reader, keeping only
+    the four columns; the leading header lines are counted and skipped, so
+    a '#' inside a record (e.g. in ID or INFO) is kept as data. BCF
+    files, and any file queried by region ("chrom" or "chrom:start-end",
+    which needs a .tbi/.csi index), are read through pysam.VariantFile.
+    CHROM, REF and ALT are categorical and POS is int32 (1-based).
+    """
+    if region or vcf_path.endswith(".bcf"):
+        yield from _pysam_chunks(vcf_path, chunk_size, region)
+        return
+    yield from pd.read_csv(vcf_path, sep="\t", skiprows=_header_lines(vcf_path), header=None,
+                           usecols=[0, 1, 3, 4], names=VCF_COLUMNS, dtype=_DTYPES,
+                           quoting=csv.QUOTE_NONE, chunksize=chunk_size)
+
+
+def load_vcf(vcf_path, nrows=None, region=None, chunk_size=1_000_000):
+    """
+    Load CHROM/POS/REF/ALT of a VCF/BCF into one DataFrame.
+
+    Args:
+        vcf_path (str): .vcf, .vcf.gz or .bcf
+        nrows (int): Stop after this many records (for previews)
+        region (str): Only records in this region (indexed files only)
+        chunk_size (int): Records parsed per chunk
+
+    Returns:
+        pandas.DataFrame: Columns CHROM, POS, REF, ALT
+    """
+    if nrows is not None:
+        chunk_size = min(chunk_size, max(nrows, 1))
+    chunks, total = [], 0
+    for chunk in iter_vcf_chunks(vcf_path, chunk_size, region):
+        if nrows is not None and total + len(chunk) > nrows:
+            chunk = chunk.iloc[:nrows - total]
+        chunks.append(chunk)
+        total += len(chunk)
+        if nrows is not None and total >= nrows:
+            break
+
+    if not chunks:
+        return pd.DataFrame({c: pd.Series(dtype=_DTYPES[c]) for c in VCF_COLUMNS})
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    # chunks carry their own categories; merge them so the result stays categorical
+    return pd.DataFrame({
+        c: union_categoricals([chunk[c] for chunk in chunks]) if _DTYPES[c] == "category"
+        else pd.concat([chunk[c] for chunk in chunks], ignore_index=True)
+        for c in VCF_COLUMNS
+    })
@@ -1,22 +1,89 @@
 import streamlit as st
-import subprocess
 import os
-import concurrent.futures
-import pandas as pd
-import io
 
 from distortopia.simulate_long_reads import simulate_long_reads
 from distortopia.align_reads import run_alignment
 from distortopia.variant_calling import call_variants
 from distortopia.simulate_f1 import generate_f1_from_files as generate_f1_hybrid
-from distortopia.snp_detection import run_pipeline
 from distortopia.f1_variant_calling import call_f1_variants
-from distortopia.compare_variants import load_vcf_as_df, generate_snp_marker_table
+from distortopia.compare_variants import generate_snp_marker_table
 from distortopia.detect_crossovers import detect_crossovers
+from distortopia.segregation import summarize_crossovers
+from distortopia import app_data
+from distortopia.jobs import JobRunner
+from distortopia.orchestrator import DEFAULT_CONFIG, Pipeline, build_pipeline
+from distortopia.scheduler import configure, get_scheduler
+from distortopia.instrumentation import set_report, summarize_report
 
 st.set_page_config(page_title="Distortopia: Simulate F1 Genome", layout="centered")
 st.title("🌱 Distortopia: Simulate F1 Hybrid and Map Recombination")
 
+
+# --- Background jobs ---
+# Long stages run on a per-process job runner, so button handlers return
+# immediately and job status survives reruns of this script.
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(max_workers=2)
+
+jobs = get_job_runner()
+MARKERS_JOB = "Build SNP marker table"
+
+# Stage and tool timings from every run go to one JSON-lines report
+REPORT_PATH = "distortopia_report.jsonl"
+set_report(REPORT_PATH)
+
+def show_job(name):
+    """Render the status of a background job, with downloads for its outputs once done."""
+    job = jobs.get(name)
+    if job is None:
+        return None
+    if job.active:
+        st.info(f"⏳ {name}: {job.status} ({job.elapsed:.0f}s). Press 🔄 Refresh to update.")
+        if job.log.lines:
+            st.code(job.log.tail(5))
+    elif job.status == "failed":
+        st.error(f"❌ {name} failed.")
+        st.code(job.error)
+    else:
+        st.success(f"✅ {name} finished in {job.elapsed:.0f}s.")
+        for path in job.outputs:
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    st.download_button(f"⬇️ Download {path}", f, file_name=os.path.basename(path), key=f"{name}:{path}")
+    return job
+
+with st.sidebar:
+    st.subheader("⏳ Background Jobs")
+    st.button("🔄 Refresh")
+    for job in jobs.jobs():
+        icon = {"queued": "🕒", "running": "⏳", "done": "✅", "failed": "❌"}[job.status]
+        st.write(f"{icon} {job.name} ({job.elapsed:.0f}s)")
+
+    # Every external tool (minimap2, samtools, bcftools, Badread) takes its
+    # threads and memory from this budget and waits when it is used up.
+    st.subheader("🖥️ Resource Budget")
+    scheduler = get_scheduler()
+    budget_cpus = st.number_input("CPUs", min_value=1, value=scheduler.cpus, step=1)
+    budget_mem_gb = st.number_input("Memory (GB)", min_value=1, value=max(1, scheduler.memory >> 30), step=1)
+    if (budget_cpus, budget_mem_gb) != (scheduler.cpus, max(1, scheduler.memory >> 30)):
+        if jobs.any_active():
+            st.warning("Budget changes apply once running jobs finish.")
+        else:
+            scheduler = configure(int(budget_cpus), f"{int(budget_mem_gb)}G")
+    usage = scheduler.usage()
+    st.caption(f"In use: {usage['cpus'][0]}/{usage['cpus'][1]} CPUs, "
+               f"{usage['memory'][0] / 2**30:.1f}/{usage['memory'][1] / 2**30:.1f} GB, "
+               f"{usage['waiting']} waiting")
+
+    if os.path.exists(REPORT_PATH) and st.checkbox("⏱️ Show run report"):
+        summary = summarize_report(REPORT_PATH)
+        if not summary.empty:
+            st.dataframe(summary[["type", "name", "calls", "wall_s", "cpu_s", "max_rss_mb"]])
+
+    stats = app_data.cache_stats()
+    st.caption(f"Data cache: {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses")
+
 # --- Simulate long reads ---
 st.subheader("1️⃣ Simulate Long Reads")
 
@@ -24,19 +91,39 @@ col1, col2 = st.columns(2)
 
 with col1:
     if st.button("📡 Simulate A_lyrata Reads"):
-        with st.spinner("Simulating PacBio-style reads from A_lyrata..."):
-            out1 = simulate_long_reads("A_lyrata.fna", "sim_lyrata.fq.gz", coverage="60x")
-            st.success("✅ A_lyrata reads generated.")
-            with open(out1, "rb") as f:
-                st.download_button("⬇️ Download sim_lyrata.fq.gz", f, file_name="sim_lyrata.fq.gz")
+        jobs.submit("Simulate A_lyrata reads", simulate_long_reads, "A_lyrata.fna", "sim_lyrata.fq.gz",
+                    coverage="60x", outputs=["sim_lyrata.fq.gz"])
+    show_job("Simulate A_lyrata reads")
 
 with col2:
     if st.button("📡 Simulate A_thaliana Reads"):
-        with st.spinner("Simulating PacBio-style reads from A_thaliana..."):
-            out2 = simulate_long_reads("A_thaliana.fna", "sim_thaliana.fq.gz", coverage="60x")
-            st.success("✅ A_thaliana reads generated.")
-            with open(out2, "rb") as f:
-                st.download_button("⬇️ Download sim_thaliana.fq.gz", f, file_name="sim_thaliana.fq.gz")
+        jobs.submit("Simulate A_thaliana reads", simulate_long_reads, "A_thaliana.fna", "sim_thaliana.fq.gz",
+                    coverage="60x", outputs=["sim_thaliana.fq.gz"])
+    show_job("Simulate A_thaliana reads")
+
+# --- Incremental pipeline ---
+st.subheader("🧭 Incremental Pipeline")
+
+def pipeline_config(coverage, seed, method, competitive):
+    return {**DEFAULT_CONFIG, "coverage": coverage, "f1_coverage": coverage, "seed": seed,
+            "crossover_method": method, "competitive": competitive}
+
+def run_incremental(config, log_box):
+    return Pipeline(build_pipeline(config), log=log_box.write).run(workers=2)
+
+with st.expander("Run every stage, recomputing only what is out of date"):
+    pipe_cov = st.text_input("Read coverage", value=DEFAULT_CONFIG["coverage"])
+    pipe_seed = st.number_input("Seed (0 = random)", min_value=0, value=0, step=1)
+    pipe_method = st.selectbox("Crossover caller", ["hmm", "switch"])
+    pipe_competitive = st.checkbox("Competitive F1 alignment", value=False, key="pipe_competitive",
+                                   help="Each F1 BAM then holds only the reads that map best to that parent.")
+    config = pipeline_config(pipe_cov, int(pipe_seed) or None, pipe_method, pipe_competitive)
+    if st.button("🗺️ Show Plan"):
+        plan, _ = Pipeline(build_pipeline(config)).plan()
+        st.table([{"stage": name, "action": action, "reason": reason} for name, action, reason in plan])
+    if st.button("▶️ Run Stale Stages"):
+        jobs.submit("Incremental pipeline", run_incremental, config, log_kwarg="log_box")
+    show_job("Incremental pipeline")
 
 # --- Check for required input files ---
 required_refs = {"A_lyrata.fna", "A_thaliana.fna"}
@@ -74,96 +161,81 @@ inputs = [
 ]
 
 if st.button("🚀 Run Alignment + Variant Calling for Both"):
-    st.info("Running full pipelines in parallel...")
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [executor.submit(full_pipeline, *args) for args in inputs]
-        for future in concurrent.futures.as_completed(futures):
-            vcf = future.result()
-            if os.path.exists(vcf):
-                st.success(f"✅ Generated {vcf}")
-                with open(vcf) as f:
-                    st.download_button(f"⬇️ Download {vcf}", f.read(), file_name=vcf)
-            else:
-                st.error(f"❌ Failed to generate {vcf}")
+    st.info("Running both pipelines in the background; tools share the resource budget in the sidebar.")
+    for args in inputs:
+        jobs.submit(f"Align + call {args[2]}", full_pipeline, *args, outputs=[f"{args[2]}.vcf"])
+for args in inputs:
+    show_job(f"Align + call {args[2]}")
 
 # --- Generate F1 hybrid ---
 st.subheader("3️⃣ Simulate F1 Hybrid Genome")
 
 if all(os.path.exists(f) for f in ["A_thaliana.fna", "sim_thaliana.vcf", "sim_lyrata.vcf"]):
     if st.button("🔬 Generate F1 Hybrid (IUPAC encoding)"):
-        generate_f1_hybrid("A_thaliana.fna", "sim_thaliana.vcf", "sim_lyrata.vcf", "F1_hybrid2.fna", 5)
-        st.success("✅ F1 hybrid generated: F1_hybrid2.fna")
-        
-        # Prepare fresh BytesIO buffer
-        with open("F1_hybrid.fna", "rb") as f:
-            fasta_bytes = io.BytesIO(f.read())
-        st.download_button("⬇️ Download F1_hybrid.fna", fasta_bytes, file_name="F1_hybrid.fna")
+        jobs.submit("Generate F1 hybrid", generate_f1_hybrid, "A_thaliana.fna", "sim_thaliana.vcf",
+                    "sim_lyrata.vcf", "F1_hybrid.fna", 5, outputs=["F1_hybrid.fna"])
+    show_job("Generate F1 hybrid")
 
 # --- Simulate F1 Long Reads ---
 st.subheader("4️⃣ Simulate F1 Hybrid Long Reads")
 
+def simulate_f1_reads():
+    # one Badread run, streamed straight into BGZF as F1_hybrid.fq.gz
+    return simulate_long_reads("F1_hybrid.fna", "F1_hybrid.fq")
+
 if os.path.exists("F1_hybrid.fna"):
     if st.button("📡 Simulate Long Reads from F1 Hybrid"):
-        with st.spinner("Running Badread and streaming output..."):
-            simulate_long_reads("F1_hybrid.fna", "F1_hybrid.fq")
-            result = subprocess.run(
-                [
-                    "python", "distortopia/simulate_hybrid_reads.py",
-                    "F1_hybrid.fna", "F1_hybrid"
-                ],
-                capture_output=True, text=True
-            )
-
-        if result.returncode == 0:
-            st.success("✅ F1 long reads simulated and gzipped.")
-            with open("F1_hybrid.fq.gz", "rb") as f:
-                st.download_button("⬇️ Download F1_hybrid.fq.gz", f.read(), file_name="F1_hybrid.fq.gz")
-        else:
-            st.error("❌ Simulation failed.")
-            st.text(result.stderr)
+        jobs.submit("Simulate F1 reads", simulate_f1_reads, outputs=["F1_hybrid.fq.gz"])
+    show_job("Simulate F1 reads")
 else:
     st.warning("Please generate F1_hybrid.fna before simulating long reads.")
 
 # --- Align F1 Hybrid Reads to Both Parents ---
 st.subheader("5️⃣ Align F1 Hybrid Reads to Both Parents")
 
+def align_f1_reads(competitive, log_box):
+    from distortopia.align_hybrid_reads import align_reads, align_competitive
+
+    if competitive:
+        align_competitive(
+            "F1_hybrid.fq.gz",
+            {"thaliana": "A_thaliana.fna", "lyrata": "A_lyrata.fna"},
+            {"thaliana": "F1_to_thaliana", "lyrata": "F1_to_lyrata"},
+            log_box,
+        )
+    else:
+        align_reads("F1_hybrid.fq.gz", "A_thaliana.fna", "F1_to_thaliana", log_box)
+        align_reads("F1_hybrid.fq.gz", "A_lyrata.fna", "F1_to_lyrata", log_box)
+
 required_files = ["F1_hybrid.fq.gz", "A_thaliana.fna", "A_lyrata.fna"]
 if all(os.path.exists(f) for f in required_files):
 
     with st.expander("🧬 Run Minimap2 + Samtools for F1 → Parents"):
+        competitive = st.checkbox(
+            "Single-pass competitive alignment (combined reference)", value=False,
+            help="Faster, but each parent's BAM only keeps the reads assigned to that parent, "
+                 "so Steps 8-9 see a parent-biased subset instead of every read.")
         if st.button("🔗 Align F1 Reads to A. thaliana and A. lyrata"):
-            log_box = st.empty()
-            try:
-                from distortopia.align_hybrid_reads import align_reads
-
-                align_reads("F1_hybrid.fq.gz", "A_thaliana.fna", "F1_to_thaliana", log_box)
-                align_reads("F1_hybrid.fq.gz", "A_lyrata.fna", "F1_to_lyrata", log_box)
-
-                st.success("✅ F1 reads successfully aligned to both parental genomes.")
-            except Exception as e:
-                st.error("❌ Alignment failed. See logs for details.")
+            jobs.submit("Align F1 reads", align_f1_reads, competitive, log_kwarg="log_box")
+        show_job("Align F1 reads")
 else:
     st.warning("⚠️ Missing one or more required files (F1_hybrid.fq.gz, A_thaliana.fna, A_lyrata.fna)")
 
 # --- Call Variants from F1 Alignments ---
 st.subheader("6️⃣ Variant Calling on F1 Alignments")
 
+def call_f1_both(log_box):
+    call_f1_variants("F1_to_thaliana.sort.bam", "A_thaliana.fna", "F1_to_thaliana.vcf", log_box)
+    call_f1_variants("F1_to_lyrata.sort.bam", "A_lyrata.fna", "F1_to_lyrata.vcf", log_box)
+
 required_bams = ["F1_to_thaliana.sort.bam", "F1_to_lyrata.sort.bam"]
 required_refs = ["A_thaliana.fna", "A_lyrata.fna"]
 
 if all(os.path.exists(f) for f in required_bams + required_refs):
     with st.expander("🧬 Run bcftools on F1 Alignments"):
         if st.button("🧪 Call Variants from BAM files"):
-            log_box = st.empty()
-            try:
-                from distortopia.variant_calling import call_variants
-                
-                call_f1_variants("F1_to_thaliana.sort.bam", "A_thaliana.fna", "F1_to_thaliana.vcf", log_box)
-                call_f1_variants("F1_to_lyrata.sort.bam", "A_lyrata.fna", "F1_to_lyrata.vcf", log_box)
-                
-                st.success("✅ Variant calling completed for both alignments.")
-            except Exception as e:
-                st.error(f"❌ Variant calling failed: {e}")
+            jobs.submit("Call F1 variants", call_f1_both, log_kwarg="log_box")
+        show_job("Call F1 variants")
 else:
     st.warning("⚠️ Missing files for variant calling (check for .bam and .fna files).")
 
@@ -172,110 +244,106 @@ st.subheader("7️⃣ Step 7: Compare F1 Variants to Parental SNPs")
 
 if all(os.path.exists(f) for f in ["sim_thaliana.vcf", "sim_lyrata.vcf", "F1_to_thaliana.vcf", "F1_to_lyrata.vcf"]):
 
-    # Load VCFs into DataFrames
-    f1_thal_df = load_vcf_as_df("F1_to_thaliana.vcf", ref_name="Thaliana", alt_name="F1")
-    sim_thal_df = load_vcf_as_df("sim_thaliana.vcf", ref_name="Thaliana", alt_name="Sim")
-    f1_lyr_df  = load_vcf_as_df("F1_to_lyrata.vcf", ref_name="Lyrata", alt_name="F1")
-    sim_lyr_df = load_vcf_as_df("sim_lyrata.vcf", ref_name="Lyrata", alt_name="Sim")
-
-    # 🔍 Compare F1 to A. thaliana
+    # 🔍 Compare F1 to A. thaliana (cached until either VCF changes)
     st.markdown("#### 🔍 Compare F1 to A. thaliana")
-    merged_thal = pd.merge(f1_thal_df, sim_thal_df, on=["CHROM", "POS"], how="outer", indicator=True, suffixes=("_F1", "_Thaliana"))
-    shared_thal = merged_thal[merged_thal["_merge"] == "both"]
-    f1_unique_thal = merged_thal[merged_thal["_merge"] == "left_only"]
-
-    st.write(f"Shared SNPs: {len(shared_thal)}")
-    st.write(f"F1-unique SNPs: {len(f1_unique_thal)}")
+    thal_counts = app_data.compare_to_parent("F1_to_thaliana.vcf", "sim_thaliana.vcf", "Thaliana")
+    st.write(f"Shared SNPs: {thal_counts['shared']}")
+    st.write(f"F1-unique SNPs: {thal_counts['f1_unique']}")
 
     # 🔍 Compare F1 to A. lyrata
     st.markdown("#### 🔍 Compare F1 to A. lyrata")
-    merged_lyr = pd.merge(f1_lyr_df, sim_lyr_df, on=["CHROM", "POS"], how="outer", indicator=True, suffixes=("_F1", "_Lyrata"))
-    shared_lyr = merged_lyr[merged_lyr["_merge"] == "both"]
-    f1_unique_lyr = merged_lyr[merged_lyr["_merge"] == "left_only"]
-
-    st.write(f"Shared SNPs: {len(shared_lyr)}")
-    st.write(f"F1-unique SNPs: {len(f1_unique_lyr)}")
-
-    # 🧪 Optional: Write SNP marker table to disk for downstream use
-    if not os.path.exists("compare_variants_output.tsv"):
-        try:
-            marker_df = pd.merge(sim_thal_df, sim_lyr_df, on=["CHROM", "POS"], how="inner")
-            marker_df = marker_df[["CHROM", "POS", "Thaliana", "Lyrata"]]
-            marker_df.to_csv("compare_variants_output.tsv", sep="\t", index=False)
-            st.success("✅ SNP marker table saved as compare_variants_output.tsv")
-        except Exception as e:
-            st.error(f"❌ Failed to write SNP marker table: {e}")
+    lyr_counts = app_data.compare_to_parent("F1_to_lyrata.vcf", "sim_lyrata.vcf", "Lyrata")
+    st.write(f"Shared SNPs: {lyr_counts['shared']}")
+    st.write(f"F1-unique SNPs: {lyr_counts['f1_unique']}")
+
+    # 🧪 Write the SNP marker table for downstream use, rebuilding it in the background when either
+    # parental VCF is newer; a failed build is retried only once a VCF changes again
+    vcf_time = max(os.path.getmtime("sim_thaliana.vcf"), os.path.getmtime("sim_lyrata.vcf"))
+    markers_job = jobs.get(MARKERS_JOB)
+    if (not os.path.exists("compare_variants_output.tsv") or os.path.getmtime("compare_variants_output.tsv") < vcf_time) \
+            and not (markers_job and markers_job.status == "failed" and markers_job.submitted >= vcf_time):
+        jobs.submit(MARKERS_JOB, generate_snp_marker_table, "sim_thaliana.vcf", "sim_lyrata.vcf",
+                    "compare_variants_output.tsv", outputs=["compare_variants_output.tsv"])
+    markers_job = show_job(MARKERS_JOB)
+    if markers_job and markers_job.status == "done":
+        st.write(f"🧬 {markers_job.result['markers']} informative SNPs in compare_variants_output.tsv")
 else:
     st.warning("❌ Required VCF files not found. Please complete earlier steps first.")
 
 # --- Detect Crossovers ---
 st.subheader("8️⃣ Step 8: Detect Crossovers from F1 Reads")
 
-if os.path.exists("compare_variants_output.tsv"):
-    
-    tab1, tab2 = st.tabs(["🧬 F1 → A. thaliana", "🧬 F1 → A. lyrata"])
-
-    with tab1:
-        if os.path.exists("F1_to_thaliana.sort.bam"):
-            if st.button("Run Crossover Detection (Thaliana)"):
-                with st.spinner("Running crossover detection on F1_to_thaliana.sort.bam..."):
-                    detect_crossovers(
-                        bam_path="F1_to_thaliana.sort.bam",
-                        marker_table_path="compare_variants_output.tsv",
-                        output_path="crossovers_thaliana.tsv"
-                    )
-                st.success("✅ Thaliana crossover detection complete. Results saved to `crossovers_thaliana.tsv`.")
-
-            if os.path.exists("crossovers_thaliana.tsv"):
-                co_df_thal = pd.read_csv("crossovers_thaliana.tsv", sep="\t")
-                st.write(f"🔍 Detected {co_df_thal['num_crossovers'].sum()} crossovers in {len(co_df_thal)} reads.")
-                if st.checkbox("Show Thaliana crossover calls"):
-                    st.dataframe(co_df_thal[["qname", "chrom", "start", "end", "pattern", "num_crossovers"]].head(100))
-        else:
-            st.warning("❌ File `F1_to_thaliana.sort.bam` not found.")
-
-    with tab2:
-        if os.path.exists("F1_to_lyrata.sort.bam"):
-            if st.button("Run Crossover Detection (Lyrata)"):
-                with st.spinner("Running crossover detection on F1_to_lyrata.sort.bam..."):
-                    detect_crossovers(
-                        bam_path="F1_to_lyrata.sort.bam",
-                        marker_table_path="compare_variants_output.tsv",
-                        output_path="crossovers_lyrata.tsv"
-                    )
-                st.success("✅ Lyrata crossover detection complete. Results saved to `crossovers_lyrata.tsv`.")
-
-            if os.path.exists("crossovers_lyrata.tsv"):
-                co_df_lyr = pd.read_csv("crossovers_lyrata.tsv", sep="\t")
-                st.write(f"🔍 Detected {co_df_lyr['num_crossovers'].sum()} crossovers in {len(co_df_lyr)} reads.")
-                if st.checkbox("Show Lyrata crossover calls"):
-                    st.dataframe(co_df_lyr[["qname", "chrom", "start", "end", "pattern", "num_crossovers"]].head(100))
-        else:
-            st.warning("❌ File `F1_to_lyrata.sort.bam` not found.")
+if jobs.get(MARKERS_JOB) and jobs.get(MARKERS_JOB).active:
+    st.info("⏳ Waiting for the SNP marker table to be rebuilt (Step 7).")
+elif os.path.exists("compare_variants_output.tsv"):
+    marker_path = "compare_variants_output.npz" if os.path.exists("compare_variants_output.npz") else "compare_variants_output.tsv"
+
+    for tab, (parent, label) in zip(st.tabs(["🧬 F1 → A. thaliana", "🧬 F1 → A. lyrata"]),
+                                    [("thaliana", "Thaliana"), ("lyrata", "Lyrata")]):
+        with tab:
+            bam = f"F1_to_{parent}.sort.bam"
+            output = f"crossovers_{parent}.tsv"
+            job_name = f"Crossover detection ({label})"
+            if os.path.exists(bam):
+                if st.button(f"Run Crossover Detection ({label})"):
+                    jobs.submit(job_name, detect_crossovers, bam_path=bam, marker_table_path=marker_path,
+                                output_path=output, workers=None, method="hmm")
+                job = show_job(job_name)
+
+                if os.path.exists(output) and not (job and job.active):
+                    try:
+                        co_df = app_data.crossover_reads(output)
+                    except ValueError as e:
+                        # e.g. a table from an older version without the read columns
+                        st.warning(f"⚠️ `{output}` is not a current read table ({e}). Rerun crossover detection.")
+                    else:
+                        st.write(f"🔍 Detected {co_df['num_crossovers'].sum()} crossovers in {len(co_df)} reads.")
+                        if st.checkbox(f"Show {label} crossover calls"):
+                            st.dataframe(co_df[["qname", "chrom", "start", "end", "pattern", "num_crossovers"]].head(100))
+            else:
+                st.warning(f"❌ File `{bam}` not found.")
 
 else:
     st.warning("❌ SNP marker table `compare_variants_output.tsv` not found. Run previous steps first.")
 
+# --- Segregation distortion and crossover landscape ---
+st.subheader("9️⃣ Step 9: Segregation Distortion and Crossover Landscape")
+
+crossover_tables = [f for f in ["crossovers_thaliana.tsv", "crossovers_lyrata.tsv"] if os.path.exists(f)]
+if crossover_tables:
+    table = st.selectbox("Crossover calls", crossover_tables)
+    window_kb = st.number_input("Window size (kb)", min_value=10, value=100, step=10)
+    windows_path = table.replace(".tsv", ".windows.tsv")
+    if st.button("📊 Summarize Windows"):
+        jobs.submit(f"Summarize {table}", summarize_crossovers, table, window_size=int(window_kb) * 1000,
+                    output_path=windows_path, outputs=[windows_path])
+    job = show_job(f"Summarize {table}")
+    if job and job.status == "done":
+        windows = job.result
+        st.write(f"🔍 {(windows['q_value'] < 0.05).sum()} of {len(windows)} windows show segregation distortion (FDR < 0.05).")
+        for chrom, chrom_windows in windows.groupby("chrom", sort=False):
+            st.markdown(f"**{chrom}**")
+            st.line_chart(chrom_windows.set_index("start")[["lyrata_fraction"]])
+            st.line_chart(chrom_windows.set_index("start")[["crossover_cM_per_Mb"]])
+else:
+    st.warning("❌ No crossover calls found. Run Step 8 first.")
+
 # --- Visualize ALL VCF tables ---
 st.subheader("🧬 SNP Tables from Variant Calling")
 
-vcf_files = ["sim_lyrata.vcf", 
+vcf_files = ["sim_lyrata.vcf",
              "sim_thaliana.vcf",
              "F1_to_lyrata.vcf",
              "F1_to_thaliana.vcf"
 ]
 
 for vcf_file in vcf_files:
-    if os.path.exists(vcf_file):  
+    if os.path.exists(vcf_file):
         st.markdown(f"**{vcf_file}**")
 
         # Let user choose how many rows to preview
         num_rows = st.slider(f"Rows to preview from {vcf_file}", 50, 100, 500, step=100)
 
-        with open(vcf_file) as f:
-            lines = [l for l in f if not l.startswith("##")]
-
-        df = pd.read_csv(io.StringIO("".join(lines)), sep="\t", nrows=num_rows)
+        df = app_data.vcf_preview(vcf_file, num_rows)
         st.dataframe(df)
         st.caption(f"Showing first {num_rows} rows")
-
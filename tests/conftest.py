@@ -0,0 +1,96 @@
+import os
+import stat
+import sys
+import textwrap
+
+import pytest
+
+VCF_HEADER = ("##fileformat=VCFv4.2", "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO")
+
+
+def _write_vcf(path, records, contigs=()):
+    """Write (chrom, pos, ref, alt) records as a minimal VCF and return its path."""
+    lines = [VCF_HEADER[0], *(f"##contig=<ID={c}>" for c in contigs), VCF_HEADER[1]]
+    lines += [f"{chrom}\t{pos}\t.\t{ref}\t{alt}\t50\tPASS\t." for chrom, pos, ref, alt in records]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def write_vcf():
+    return _write_vcf
+
+
+@pytest.fixture
+def stub_command(tmp_path, monkeypatch):
+    """
+    Install Python scripts on PATH in place of external tools.
+
+    stub_command(name, source) writes source (run with this interpreter) as
+    an executable `name`; calls are appended to the file in $STUB_LOG.
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("STUB_LOG", str(tmp_path / "calls.log"))
+
+    def install(name, source):
+        script = bin_dir / name
+        script.write_text(f"#!{sys.executable}\n" + textwrap.dedent(source))
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        return script
+
+    return install
+
+
+@pytest.fixture
+def fake_samtools(stub_command):
+    """
+    A samtools that logs each call, builds .fai (contig, length) and .dict
+    files, sorts stdin lines into `sort -o` and writes a placeholder index.
+    """
+    return stub_command("samtools", """\
+        import os, sys
+        with open(os.environ["STUB_LOG"], "a") as log:
+            log.write("samtools " + " ".join(sys.argv[1:]) + "\\n")
+        command = sys.argv[1]
+        if command == "sort":
+            with open(sys.argv[sys.argv.index("-o") + 1], "w") as out:
+                out.writelines(sorted(sys.stdin))
+            sys.exit()
+        if command == "index":
+            open(sys.argv[-1] + ".bai", "w").close()
+            sys.exit()
+        fasta = sys.argv[2] if command == "faidx" else sys.argv[-1]
+        lengths, name = {}, None
+        for line in open(fasta):
+            if line.startswith(">"):
+                name = line[1:].split()[0]
+                lengths[name] = 0
+            else:
+                lengths[name] += len(line.strip())
+        if command == "faidx":
+            out = sys.argv[sys.argv.index("--fai-idx") + 1]
+            rows = [f"{n}\\t{l}\\t0\\t0\\t0\\n" for n, l in lengths.items()]
+        else:
+            out = sys.argv[sys.argv.index("-o") + 1]
+            rows = [f"@SQ\\tSN:{n}\\tLN:{l}\\n" for n, l in lengths.items()]
+        with open(out, "w") as f:
+            f.writelines(rows)
+    """)
+
+
+@pytest.fixture
+def fake_minimap2(stub_command):
+    """A minimap2 that logs each call, writes a placeholder -d index and otherwise prints 1000 SAM-ish lines."""
+    return stub_command("minimap2", """\
+        import os, sys
+        with open(os.environ["STUB_LOG"], "a") as log:
+            log.write("minimap2 " + " ".join(sys.argv[1:]) + "\\n")
+        if "-d" in sys.argv:
+            with open(sys.argv[sys.argv.index("-d") + 1], "w") as out:
+                out.write("index")
+        else:
+            for i in range(1000):
+                print(f"read{i}\\t0\\tchr1")
+    """)
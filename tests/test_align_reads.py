@@ -0,0 +1,29 @@
+import pytest
+
+from distortopia import scheduler
+from distortopia.align_reads import run_alignment, sort_command
+
+
+def test_sort_command_writes_cram_only_with_a_reference():
+    assert sort_command("a.bam")[-3:] == ["-o", "a.bam", "-"]
+    assert sort_command("a.cram", reference_fasta="ref.fa")[-5:] == \
+        ["-O", "cram", "--reference", "ref.fa", "-"]
+    with pytest.raises(ValueError):
+        sort_command("a.cram")
+
+
+def test_alignment_streams_into_sort_without_intermediate_files(tmp_path, fake_minimap2, fake_samtools,
+                                                                monkeypatch):
+    monkeypatch.setattr(scheduler, "_scheduler", scheduler.Scheduler(cpus=4, memory="16G"))
+    (tmp_path / "ref.fa").write_text(">chr1\nACGT\n")
+    (tmp_path / "reads.fq").write_text("")
+
+    out = run_alignment(str(tmp_path / "reads.fq"), str(tmp_path / "ref.fa"), str(tmp_path / "sim"))
+
+    assert out == str(tmp_path / "sim.sort.bam")
+    assert len(open(out).read().splitlines()) == 1000
+    calls = [call.split()[:2] for call in (tmp_path / "calls.log").read_text().splitlines()]
+    assert ["minimap2", "-t"] in calls and ["samtools", "sort"] in calls
+    assert calls[-1] == ["samtools", "index"]
+    assert (tmp_path / "sim.sort.bam.bai").exists()
+    assert not list(tmp_path.glob("sim*.sam")) and not list(tmp_path.glob("sim.sort.bam.tmp*"))
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+pytest.importorskip("pysam")
+
+from distortopia import app_data  # noqa: E402
+from distortopia.app_data import FileCache, cached_on_files, compare_to_parent  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = FileCache(maxsize=2)
+    monkeypatch.setattr(app_data, "_cache", cache)
+    return cache
+
+
+def test_rewritten_files_are_reloaded(tmp_path, cache):
+    calls = []
+
+    @cached_on_files("path")
+    def line_count(path, strip=True):
+        calls.append(path)
+        return len(open(path).read().splitlines())
+
+    path = tmp_path / "a.txt"
+    path.write_text("1\n2\n")
+    assert line_count(str(path)) == line_count(str(path), strip=True) == 2
+    assert len(calls) == 1 and cache.hits == 1
+
+    path.write_text("1\n2\n3\n")
+    assert line_count(str(path)) == 3 and len(calls) == 2
+    assert line_count(str(path), strip=False) == 3 and len(calls) == 3
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    computed = []
+    for key in ["a", "b", "a", "c", "a", "b"]:
+        cache.get_or_compute(key, lambda: computed.append(key))
+    assert computed == ["a", "b", "c", "b"]
+    assert list(cache._entries) == ["a", "b"]
+
+
+def test_parent_comparison_counts_shared_and_f1_only_sites(tmp_path, write_vcf):
+    f1 = write_vcf(tmp_path / "f1.vcf", [("chr1", 10, "A", "T"), ("chr1", 20, "C", "G"), ("chr1", 30, "G", "A")])
+    parent = write_vcf(tmp_path / "p1.vcf", [("chr1", 10, "A", "T"), ("chr1", 30, "G", "A")])
+    assert compare_to_parent(f1, parent, "P1") == {"shared": 2, "f1_unique": 1}
+
+    write_vcf(tmp_path / "p1.vcf", [("chr1", 10, "A", "T")])
+    os.utime(parent, ns=(1, 1))
+    assert compare_to_parent(f1, parent, "P1") == {"shared": 1, "f1_unique": 2}
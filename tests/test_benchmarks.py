@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pysam")
+
+from benchmarks.run_benchmarks import _crossover_accuracy, compare, run_benchmark  # noqa: E402
+from benchmarks.synthetic import generate_dataset  # noqa: E402
+
+
+def result(seconds=1.0, reads=1000.0, rss=100.0, recall=0.9):
+    return {"seconds": seconds, "throughput": {"reads": reads}, "peak_rss_mb": rss, "result": {"recall": recall}}
+
+
+def test_compare_flags_changed_results_slowdowns_and_memory_growth():
+    baseline = {"detect": result()}
+    assert compare({"detect": result(reads=800.0, rss=120.0)}, baseline, 0.25) == []
+    assert compare({"new": result()}, baseline, 0.25) == []
+
+    problems = compare({"detect": result(reads=700.0, rss=130.0, recall=0.8)}, baseline, 0.25)
+    assert [p.split(": ")[1].split()[0] for p in problems] == ["result", "SLOWER", "MORE"]
+
+
+def test_breakpoint_matches_need_the_true_crossover_inside_the_interval():
+    truth = pd.DataFrame({"qname": ["r1", "r2", "r3"], "chrom": "chr1", "crossover": [500, 900, 0]})
+    breakpoints = pd.DataFrame({"read_id": ["r1", "r2", "r3"], "chrom": "chr1",
+                                "left_marker": [400, 950, 100], "right_marker": [600, 990, 200]})
+    assert _crossover_accuracy(truth, breakpoints) == {"recall": 0.5, "precision": 0.3333}
+
+
+def test_dataset_is_reused_and_benchmarks_are_deterministic(tmp_path):
+    data = generate_dataset(str(tmp_path), "tiny", reads=40, chrom_length=20_000)
+    truth = open(data["truth"]).read()
+    stamp = (tmp_path / "params.json").stat().st_mtime_ns
+    assert generate_dataset(str(tmp_path), "tiny", reads=40, chrom_length=20_000) == data
+    assert (tmp_path / "params.json").stat().st_mtime_ns == stamp and open(data["truth"]).read() == truth
+
+    bench = run_benchmark("detect", data, {"workdir": str(tmp_path), "workers": 1, "method": "hmm"},
+                          repeat=2)
+    assert bench["result"]["reads"] == 40 and 0 < bench["result"]["recall"] <= 1
+    assert bench["throughput"]["reads"] > 0 and bench["peak_rss_mb"] > 0
@@ -0,0 +1,62 @@
+import gzip
+import random
+import shutil
+
+import pytest
+
+from distortopia.bgzf_writer import ThreadedBgzfWriter, concat_bgzf
+
+
+def fastq_records(n, seed=1, prefix="r"):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        seq = "".join(rng.choice("ACGT") for _ in range(rng.randint(10, 200)))
+        records.append(f"@{prefix}{i} desc\n{seq}\n+\n{'I' * len(seq)}\n".encode())
+    return records
+
+
+def write_fastq(path, records, threads=2):
+    with ThreadedBgzfWriter(str(path), threads=threads, index=True, fastq_index=True) as out:
+        for record in records:
+            out.write(record)
+    return out
+
+
+def test_output_is_gzip_readable(tmp_path):
+    records = fastq_records(500)
+    write_fastq(tmp_path / "r.fq.gz", records)
+    with gzip.open(tmp_path / "r.fq.gz", "rb") as f:
+        assert f.read() == b"".join(records)
+
+
+def test_indexes_match_htslib(tmp_path):
+    pysam = pytest.importorskip("pysam")
+    path = tmp_path / "r.fq.gz"
+    write_fastq(path, fastq_records(3000))
+    copy = tmp_path / "copy.fq.gz"
+    shutil.copy(path, copy)
+    pysam.fqidx(str(copy))
+    assert (tmp_path / "r.fq.gz.fai").read_text() == (tmp_path / "copy.fq.gz.fai").read_text()
+    assert (tmp_path / "r.fq.gz.gzi").read_bytes() == (tmp_path / "copy.fq.gz.gzi").read_bytes()
+
+
+def test_concatenated_indexes_fetch_every_part(tmp_path):
+    pysam = pytest.importorskip("pysam")
+    parts = [write_fastq(tmp_path / f"part{i}.fq.gz", fastq_records(800, seed=i, prefix=f"s{i}_"))
+             for i in range(2)]
+    merged = concat_bgzf(parts, str(tmp_path / "merged.fq.gz"), index=True)
+    with pysam.FastaFile(merged) as fq:
+        assert fq.nreferences == 1600
+        expected = fastq_records(800, seed=1, prefix="s1_")[799].split(b"\n")[1].decode()
+        assert fq.fetch("s1_799") == expected
+
+
+def test_failed_stream_leaves_no_output(tmp_path):
+    path = tmp_path / "r.fq.gz"
+    with pytest.raises(RuntimeError):
+        with ThreadedBgzfWriter(str(path), index=True, fastq_index=True) as out:
+            for record in fastq_records(1000):
+                out.write(record)
+            raise RuntimeError("producer died")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+pysam = pytest.importorskip("pysam")
+
+from distortopia.detect_crossovers import MarkerCounters, classify_read, load_snp_markers  # noqa: E402
+
+HEADER = pysam.AlignmentHeader.from_dict({"SQ": [{"SN": "chr1", "LN": 10_000}, {"SN": "chr2", "LN": 10_000}]})
+
+
+def write_markers(tmp_path):
+    path = tmp_path / "markers.tsv"
+    # unsorted on purpose; positions are 1-based
+    path.write_text("CHROM\tPOS\tThaliana\tLyrata\n"
+                    "chr1\t131\tT\tG\nchr1\t106\tA\tC\nchr1\t111\tG\tA\nchr1\t121\tC\tT\nchr1\t901\tA\tC\n")
+    return str(path)
+
+
+def make_read(sequence, start=100, cigar=None):
+    read = pysam.AlignedSegment(HEADER)
+    read.query_name = "r1"
+    read.reference_id = 0
+    read.reference_start = start
+    read.cigarstring = cigar or f"{len(sequence)}M"
+    read.query_sequence = sequence
+    read.query_qualities = pysam.qualitystring_to_array("I" * len(sequence))
+    return read
+
+
+def test_tsv_and_npz_markers_load_to_the_same_sorted_index(tmp_path):
+    tsv = load_snp_markers(write_markers(tmp_path))
+    assert tsv["chr1"]["positions"].tolist() == [105, 110, 120, 130, 900]
+    assert tsv["chr1"]["ref_alleles"].tobytes() == b"AGCTA"
+
+    npz_path = tmp_path / "markers.npz"
+    np.savez(npz_path, chroms=np.array(["chr1"]), offsets=np.array([0, 5]),
+             positions=tsv["chr1"]["positions"], thaliana=tsv["chr1"]["ref_alleles"],
+             lyrata=tsv["chr1"]["alt_alleles"])
+    npz = load_snp_markers(str(npz_path))
+    for key in ("positions", "ref_alleles", "alt_alleles"):
+        np.testing.assert_array_equal(npz["chr1"][key], tsv["chr1"][key])
+
+
+def test_classify_read_calls_alleles_and_switches(tmp_path):
+    snp_info = load_snp_markers(write_markers(tmp_path))
+    sequence = ["N"] * 40
+    # markers at 105, 110, 120, 130 (0-based) -> T, T, L, L; 900 is off the read
+    sequence[5], sequence[10], sequence[20], sequence[30] = "A", "G", "T", "G"
+    record = classify_read(make_read("".join(sequence)), snp_info)
+    assert record["pattern"] == "TTLL"
+    # one switch, between the 1-based markers 111 and 121
+    assert [bp[:2] for bp in record["breakpoints"]] == [(111, 121)]
+    assert (record["start"], record["end"]) == (100, 140)
+
+
+def test_reads_without_markers_are_counted(tmp_path):
+    snp_info = load_snp_markers(write_markers(tmp_path))
+    counters = MarkerCounters()
+    assert classify_read(make_read("A" * 50, start=300), snp_info, counters=counters) is None
+    assert classify_read(make_read("A" * 20, start=95, cigar="5M40D15M"), snp_info, counters=counters) is None
+    assert counters.reads["off_markers"] == 1
+    assert counters.reads["uncovered"] == 1
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pysam")
+
+from distortopia.compare_variants import generate_snp_marker_table  # noqa: E402
+
+
+def test_headerless_vcfs_with_different_contigs(tmp_path, write_vcf):
+    thal = write_vcf(tmp_path / "th.vcf", [("chr1", 5, "A", "C"), ("chr3", 5, "A", "C")])
+    lyr = write_vcf(tmp_path / "ly.vcf", [("chr1", 5, "A", "G"), ("chr2", 5, "A", "G"), ("chr3", 5, "A", "G")])
+    counts = generate_snp_marker_table(thal, lyr, str(tmp_path / "markers.tsv"))
+    assert (counts["thaliana"], counts["lyrata"], counts["markers"]) == (2, 3, 2)
+    npz = np.load(counts["npz"])
+    assert npz["chroms"].tolist() == ["chr1", "chr3"]
+
+
+def test_header_order_is_used(tmp_path, write_vcf):
+    contigs = ["chr2", "chr1"]
+    thal = write_vcf(tmp_path / "th.vcf", [("chr2", 9, "T", "C"), ("chr1", 5, "A", "C")], contigs)
+    lyr = write_vcf(tmp_path / "ly.vcf", [("chr2", 9, "T", "A"), ("chr1", 5, "A", "G")], contigs)
+    assert generate_snp_marker_table(thal, lyr, str(tmp_path / "markers.tsv"))["markers"] == 2
+
+
+def test_unsorted_vcf_is_rejected(tmp_path, write_vcf):
+    thal = write_vcf(tmp_path / "th.vcf", [("chr1", 9, "A", "C"), ("chr1", 5, "A", "C")])
+    lyr = write_vcf(tmp_path / "ly.vcf", [("chr1", 5, "A", "G")])
+    with pytest.raises(ValueError, match="not coordinate-sorted"):
+        generate_snp_marker_table(thal, lyr, str(tmp_path / "markers.tsv"))
+
+
+def test_conflicting_contig_order_is_rejected(tmp_path, write_vcf):
+    thal = write_vcf(tmp_path / "th.vcf", [("chr1", 5, "A", "C"), ("chr2", 5, "A", "C")])
+    lyr = write_vcf(tmp_path / "ly.vcf", [("chr2", 5, "A", "G"), ("chr1", 5, "A", "G")])
+    with pytest.raises(ValueError, match="order contigs differently"):
+        generate_snp_marker_table(thal, lyr, str(tmp_path / "markers.tsv"))
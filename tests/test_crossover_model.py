@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from distortopia.crossover_model import build_genetic_maps, gamete_crossovers, sample_crossovers
+
+
+def counts(batch):
+    return np.diff(batch["offsets"])
+
+
+@pytest.mark.parametrize("model", ["poisson", "gamma"])
+def test_seeded_draws_are_reproducible(model):
+    maps = build_genetic_maps({"chr1": 30_000_000, "chr2": 20_000_000})
+    a = sample_crossovers(maps, 50, np.random.default_rng(7), model, interference=3.0)
+    b = sample_crossovers(maps, 50, np.random.default_rng(7), model, interference=3.0)
+    for chrom in maps:
+        for key in ("offsets", "breakpoints", "start_parent"):
+            np.testing.assert_array_equal(a[chrom][key], b[chrom][key])
+
+
+@pytest.mark.parametrize("model", ["poisson", "gamma"])
+def test_breakpoints_are_sorted_and_on_the_chromosome(model):
+    maps = build_genetic_maps({"chr1": 50_000_000})
+    batch = sample_crossovers(maps, 200, np.random.default_rng(1), model)["chr1"]
+    assert batch["offsets"][-1] == len(batch["breakpoints"])
+    assert ((batch["breakpoints"] >= 0) & (batch["breakpoints"] < 50_000_000)).all()
+    for rep in range(200):
+        assert (np.diff(gamete_crossovers({"chr1": batch}, rep)["chr1"]["breakpoints"]) >= 0).all()
+
+
+def test_mean_crossovers_match_map_length_and_interference_narrows_counts():
+    # 50 Mb at the default 4 cM/Mb is a 2 Morgan map
+    maps = build_genetic_maps({"chr1": 50_000_000})
+    rng = np.random.default_rng(3)
+    poisson = counts(sample_crossovers(maps, 20_000, rng, "poisson")["chr1"])
+    gamma = counts(sample_crossovers(maps, 20_000, rng, "gamma", interference=4.0)["chr1"])
+    assert poisson.mean() == pytest.approx(2.0, abs=0.05)
+    assert gamma.mean() == pytest.approx(2.0, abs=0.05)
+    assert gamma.var() < poisson.var()
+
+
+def test_single_model_has_at_most_one_crossover():
+    maps = build_genetic_maps({"chr1": 1_000_000})
+    assert counts(sample_crossovers(maps, 500, np.random.default_rng(0), "single")["chr1"]).max() == 1
+
+
+def test_breakpoints_follow_the_recombination_map():
+    rec_map = {"chr1": {"bounds": np.array([0, 500, 1000]), "cum_morgans": np.array([0.0, 0.0, 1.0])}}
+    maps = build_genetic_maps({"chr1": 1000}, rec_map)
+    batch = sample_crossovers(maps, 1000, np.random.default_rng(2), "poisson")["chr1"]
+    assert len(batch["breakpoints"]) and (batch["breakpoints"] >= 500).all()
+
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        sample_crossovers(build_genetic_maps({"chr1": 1000}), 1, model="uniform")
@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from distortopia.crossover_writer import (
+    CrossoverWriter, breakpoints_path_for, iter_table_chunks, load_breakpoints, load_crossover_reads,
+)
+
+
+def record(i, breakpoints=()):
+    return {"qname": f"read{i}", "chrom": "chr1", "start": i * 100, "end": i * 100 + 50, "length": 50,
+            "pattern": "AAB" if breakpoints else "AAA", "breakpoints": list(breakpoints)}
+
+
+@pytest.fixture(params=["tsv", "parquet"])
+def ext(request):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+def test_breakpoint_table_sits_next_to_the_read_table():
+    assert breakpoints_path_for("out/calls.tsv") == "out/calls.breakpoints.tsv"
+    assert breakpoints_path_for("calls.parquet") == "calls.breakpoints.parquet"
+    assert breakpoints_path_for("calls") == "calls.breakpoints.tsv"
+
+
+def test_tables_round_trip_across_chunks_and_shards(tmp_path, ext):
+    shard = CrossoverWriter(str(tmp_path / f"shard.{ext}"), chunk_size=2, header=False)
+    with shard:
+        shard.write(record(5, [(520, 530, 0.75)]))
+    with CrossoverWriter(str(tmp_path / f"calls.{ext}"), chunk_size=2) as writer:
+        for i in range(5):
+            writer.write(record(i, [(i * 100 + 10, i * 100 + 20, 0.5), (i * 100 + 30, i * 100 + 40, math.nan)]
+                                if i == 3 else []))
+        writer.append_shard(shard.output_path, shard.breakpoints_path, shard.num_reads, shard.num_breakpoints)
+    assert (writer.num_reads, writer.num_breakpoints) == (6, 3)
+    assert not (tmp_path / f"shard.{ext}").exists()
+
+    reads = load_crossover_reads(writer.output_path)
+    assert reads["qname"].tolist() == [f"read{i}" for i in range(6)]
+    assert reads["num_crossovers"].tolist() == [0, 0, 0, 2, 0, 1]
+    assert str(reads["start"].dtype) == "int64"
+
+    breakpoints = load_breakpoints(writer.breakpoints_path)
+    assert breakpoints["read_id"].tolist() == ["read3", "read3", "read5"]
+    assert breakpoints["left_marker"].tolist() == [310, 330, 520]
+    assert breakpoints["posterior"].iloc[0] == 0.5 and math.isnan(breakpoints["posterior"].iloc[1])
+
+
+def test_tables_are_read_back_in_bounded_chunks(tmp_path, ext):
+    with CrossoverWriter(str(tmp_path / f"calls.{ext}"), chunk_size=3) as writer:
+        for i in range(7):
+            writer.write(record(i))
+    chunks = list(iter_table_chunks(writer.output_path, ["chrom", "start"], chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert list(chunks[0].columns) == ["chrom", "start"]
+    assert sum(chunk["start"].sum() for chunk in chunks) == sum(i * 100 for i in range(7))
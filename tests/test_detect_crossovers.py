@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pysam = pytest.importorskip("pysam")
+
+from distortopia import scheduler  # noqa: E402
+from distortopia.detect_crossovers import detect_crossovers  # noqa: E402
+
+CHROM_LENGTH = 3000
+
+
+@pytest.fixture
+def f1_bam(tmp_path):
+    """Indexed BAM over chr1 (markers), chr2 (no markers), plus filtered and unplaced reads."""
+    rng = np.random.default_rng(5)
+    genome = rng.choice(np.frombuffer(b"ACGT", np.uint8), CHROM_LENGTH)
+    positions = np.arange(100, CHROM_LENGTH - 100, 40)
+    lyrata = np.where(genome[positions] == ord("A"), ord("C"), ord("A")).astype(np.uint8)
+    (tmp_path / "markers.tsv").write_text("CHROM\tPOS\tThaliana\tLyrata\n" + "".join(
+        f"chr1\t{p + 1}\t{chr(genome[p])}\t{chr(a)}\n" for p, a in zip(positions, lyrata)))
+
+    header = pysam.AlignmentHeader.from_dict({"SQ": [{"SN": "chr1", "LN": CHROM_LENGTH},
+                                                     {"SN": "chr2", "LN": CHROM_LENGTH}]})
+    unsorted = str(tmp_path / "f1.bam")
+    with pysam.AlignmentFile(unsorted, "wb", header=header) as out:
+        for i in range(120):
+            start, length = int(rng.integers(0, CHROM_LENGTH - 800)), int(rng.integers(300, 800))
+            seq = genome[start:start + length].copy()
+            switch = start + int(rng.integers(0, length)) if i % 3 == 0 else CHROM_LENGTH
+            for p, a in zip(positions, lyrata):
+                if start <= p < start + length and p >= switch:
+                    seq[p - start] = a
+            read = pysam.AlignedSegment(header)
+            read.query_name = f"r{i}"
+            read.reference_id = 0 if i % 10 else 1
+            read.reference_start = start
+            read.cigarstring = f"{length}M"
+            read.query_sequence = seq.tobytes().decode()
+            read.query_qualities = pysam.qualitystring_to_array("5" * length)
+            read.flag = 256 if i % 17 == 0 else 2048 if i % 19 == 0 else 4 if i % 23 == 0 else 0
+            if i % 29 == 0:
+                read.flag, read.reference_id, read.reference_start, read.cigarstring = 4, -1, -1, None
+            out.write(read)
+    bam = str(tmp_path / "f1.sort.bam")
+    pysam.sort("-o", bam, unsorted)
+    pysam.index(bam)
+    return bam, str(tmp_path / "markers.tsv")
+
+
+@pytest.mark.parametrize("method", ["switch", "hmm"])
+def test_parallel_run_matches_serial_run(tmp_path, f1_bam, monkeypatch, method):
+    monkeypatch.setattr(scheduler, "_scheduler", scheduler.Scheduler(cpus=4, memory="16G"))
+    results = []
+    for workers in (1, 2):
+        out = tmp_path / f"calls_w{workers}.tsv"
+        tallies = detect_crossovers(*f1_bam, str(out), workers=workers, window_size=700,
+                                    method=method, counters=True)
+        results.append((out.read_text(), (tmp_path / f"calls_w{workers}.breakpoints.tsv").read_text(),
+                        (tmp_path / f"calls_w{workers}.marker_counts.tsv").read_text(), tallies.totals()))
+    serial, parallel = results
+    assert parallel == serial
+    totals = serial[3]
+    assert totals["reads_filtered"] > 0 and totals["reads_off_markers"] > 0
+    assert sum(totals[f"reads_{k}"] for k in ("filtered", "off_markers", "uncovered", "classified")) == 120
+    assert serial[1].count("\n") > 1  # some crossovers were called
@@ -0,0 +1,84 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from distortopia.hmm_segmenter import _credible_interval, _pad, base_errors, segment_batch, segment_reads
+
+
+def observation(calls, spacing_morgans=0.01, errors=None):
+    calls = np.array(calls, dtype=bool)
+    k = len(calls)
+    return {"positions": np.arange(1, k + 1) * 100, "calls": calls,
+            "errors": None if errors is None else np.asarray(errors, dtype=np.float64),
+            "morgans": np.arange(k) * spacing_morgans}
+
+
+def brute_force(emit, log_stay, log_switch):
+    """Log-probability of every state path of one read."""
+    width = emit.shape[0]
+    scores = {}
+    for path in itertools.product((0, 1), repeat=width):
+        score = np.log(0.5) + emit[0, path[0]]
+        for k in range(1, width):
+            score += (log_switch if path[k] != path[k - 1] else log_stay)[k] + emit[k, path[k]]
+        scores[path] = score
+    return scores
+
+
+def test_viterbi_and_switch_posteriors_match_enumeration():
+    obs = observation([0, 1, 0, 1, 1, 0], spacing_morgans=0.2, errors=[0.1, 0.3, 0.05, 0.2, 0.1, 0.25])
+    emit, log_stay, log_switch = _pad([obs], [0], 6)
+    paths, switch_post = segment_batch(emit, log_stay, log_switch)
+
+    scores = brute_force(emit[0], log_stay[0], log_switch[0])
+    assert tuple(paths[0]) == max(scores, key=scores.get)
+    weights = np.exp(np.array(list(scores.values())) - max(scores.values()))
+    weights /= weights.sum()
+    for k in range(1, 6):
+        expected = sum(w for path, w in zip(scores, weights) if path[k] != path[k - 1])
+        assert switch_post[0, k] == pytest.approx(expected)
+
+
+def test_padding_does_not_change_results():
+    short, long = observation([0, 0, 1, 1]), observation([0, 0, 0, 1, 1, 1, 1, 0, 0])
+    alone = segment_reads([short]) + segment_reads([long])
+    assert segment_reads([short, long], batch_size=2) == alone
+
+
+def test_clean_switch_is_one_breakpoint_and_a_lone_miscall_is_not():
+    switch, miscall = segment_reads([
+        observation([0] * 6 + [1] * 6),
+        observation([0] * 5 + [1] + [0] * 5, spacing_morgans=1e-4),
+    ])
+    assert [bp[:2] for bp in switch] == [(600, 700)]
+    assert switch[0][2] >= 0.95
+    assert miscall == []
+
+
+def test_single_marker_reads_have_no_breakpoints():
+    assert segment_reads([observation([1])]) == [[]]
+
+
+def test_credible_interval_grows_towards_the_likelier_neighbour():
+    post = np.array([0.0, 0.05, 0.2, 0.5, 0.15, 0.1])
+    assert _credible_interval(post, 3, 0, 6, 0.8) == (2, 4, pytest.approx(0.85))
+    # never reaches past the neighbouring breakpoints
+    lo, hi, mass = _credible_interval(post, 3, 2, 5, 0.99)
+    assert (lo, hi) == (3, 4) and mass == pytest.approx(0.65)
+
+
+@pytest.mark.parametrize("q", [0, 1])
+def test_lowest_quality_calls_cannot_flip_or_pin_the_path(q):
+    errors = base_errors(np.array([30] * 9 + [q] + [30] * 9))
+    assert errors[9] <= 0.75
+    # a lone Q0/Q1 Lyrata call in a Thaliana read does not create a switch
+    flipped = observation([0] * 9 + [1] + [0] * 9, spacing_morgans=0.05, errors=errors)
+    # ... and a Q0/Q1 Thaliana call in a Lyrata run does not stop one being called
+    pinned = observation([0] * 9 + [0] + [1] * 9, spacing_morgans=0.05, errors=errors)
+    emit, log_stay, log_switch = _pad([flipped, pinned], [0, 1], 19)
+    assert np.isfinite(emit).all()
+    paths, _ = segment_batch(emit, log_stay, log_switch)
+    assert paths[0].tolist() == [0] * 19
+    assert paths[1, :9].tolist() == [0] * 9 and paths[1, 10:].tolist() == [1] * 9
+    assert segment_reads([flipped]) == [[]]
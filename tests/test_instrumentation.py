@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from distortopia import instrumentation
+from distortopia.instrumentation import count, in_context, run_command, stage, summarize_report, timed
+
+
+@pytest.fixture
+def report(tmp_path, monkeypatch):
+    monkeypatch.delenv(instrumentation.REPORT_ENV, raising=False)
+    path = str(tmp_path / "report.jsonl")
+    instrumentation.set_report(path)
+    yield lambda: [json.loads(line) for line in open(path)]
+    instrumentation.set_report(None)
+
+
+def test_stages_record_nesting_counts_and_commands(report):
+    with stage("pipeline", reads="r.fq"):
+        with stage("align") as rec:
+            run_command([sys.executable, "-c", "pass"])
+            rec.count(reads=3)
+            count(reads=2, crossovers=1)
+        count(gametes=4)
+
+    command, align, pipeline = report()
+    assert command["type"] == "command" and command["parent"] == "align"
+    assert command["status"] == "ok" and command["name"].startswith("python")
+    assert align["parent"] == "pipeline" and align["commands"] == 1
+    assert align["counts"] == {"reads": 5, "crossovers": 1}
+    assert pipeline["parent"] is None and pipeline["reads"] == "r.fq"
+    assert pipeline["counts"] == {"gametes": 4} and pipeline["wall_s"] >= align["wall_s"]
+    assert len({r["run"] for r in (command, align, pipeline)}) == 1
+
+
+def test_failures_are_recorded_and_reraised(report):
+    @timed("simulate")
+    def simulate():
+        run_command([sys.executable, "-c", "import sys; sys.exit(3)"])
+
+    with pytest.raises(subprocess.CalledProcessError):
+        simulate()
+    command, record = report()
+    assert (command["status"], command["returncode"]) == ("failed", 3)
+    assert record["status"] == "failed" and "CalledProcessError" in record["error"]
+
+
+def test_worker_threads_report_to_the_submitting_stage(report):
+    with stage("detect") as rec, ThreadPoolExecutor(4) as pool:
+        list(pool.map(in_context(lambda n: count(reads=n)), range(10)))
+    assert rec.counts == {"reads": 45}
+    # outside a stage, counting is a no-op
+    count(reads=1)
+    assert [r["name"] for r in report()] == ["detect"]
+
+
+def test_summary_totals_the_last_run(report, monkeypatch):
+    with stage("align"):
+        pass
+    monkeypatch.setattr(instrumentation, "_run_id", "second")
+    for _ in range(2):
+        with stage("align"):
+            run_command([sys.executable, "-c", "pass"])
+
+    summary = summarize_report(instrumentation.report_path())
+    rows = {(row.type, row.name): row for row in summary.itertuples()}
+    assert rows[("stage", "align")].calls == 2
+    assert sum(row.calls for row in rows.values() if row.type == "command") == 2
@@ -0,0 +1,54 @@
+import threading
+
+from distortopia.jobs import JobLog, JobRunner
+
+
+def wait_for(job, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if not job.active:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{job.name} still {job.status}")
+
+
+def test_jobs_report_result_error_and_log():
+    runner = JobRunner(max_workers=2)
+
+    def stage(x, log_box):
+        log_box.write(f"working on {x}")
+        return x * 2
+
+    done = wait_for(runner.submit("double", stage, 21, outputs=["out.txt"], log_kwarg="log_box"))
+    assert (done.status, done.result, done.outputs) == ("done", 42, ["out.txt"])
+    assert done.log.tail() == "working on 21" and done.elapsed >= 0
+
+    failed = wait_for(runner.submit("broken", lambda: 1 / 0))
+    assert failed.status == "failed" and "ZeroDivisionError" in failed.error
+    assert [job.name for job in runner.jobs()] == ["broken", "double"]
+    assert not runner.any_active()
+
+
+def test_resubmitting_an_active_job_does_not_start_a_duplicate():
+    runner = JobRunner(max_workers=2)
+    release, calls = threading.Event(), []
+
+    def stage():
+        calls.append(1)
+        release.wait(5)
+
+    first = runner.submit("align", stage)
+    assert runner.submit("align", stage) is first and runner.any_active()
+    release.set()
+    wait_for(first)
+
+    # a finished job can be run again
+    second = runner.submit("align", stage)
+    wait_for(second)
+    assert second is not first and len(calls) == 2 and runner.get("align") is second
+
+
+def test_job_log_keeps_the_last_lines():
+    log = JobLog(max_lines=3)
+    for i in range(5):
+        log.info(i)
+    assert log.lines == ["2", "3", "4"] and log.tail(2) == "3\n4"
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+pysam = pytest.importorskip("pysam")
+
+from distortopia.detect_crossovers import extract_marker_alleles, marker_query_indices  # noqa: E402
+
+HEADER = pysam.AlignmentHeader.from_dict({"SQ": [{"SN": "chr1", "LN": 10_000}]})
+
+
+def make_read(cigar, start=100):
+    read = pysam.AlignedSegment(HEADER)
+    read.query_name = "r1"
+    read.reference_id = 0
+    read.reference_start = start
+    read.cigarstring = cigar
+    length = read.infer_query_length()
+    read.query_sequence = "".join("ACGT"[i % 4] for i in range(length))
+    read.query_qualities = pysam.qualitystring_to_array("".join(chr(33 + i % 40) for i in range(length)))
+    return read
+
+
+def expected_indices(read, positions):
+    pairs = {ref: query for query, ref in read.get_aligned_pairs(matches_only=True)}
+    return np.array([pairs.get(int(p), -1) for p in positions])
+
+
+@pytest.mark.parametrize("cigar", [
+    "50M",
+    "5S40M3S",         # soft clips shift query offsets
+    "10M4I10M",        # insertion
+    "10M6D10M",        # deletion
+    "10M200N10M",      # reference skip
+    "3S5=1X4=2I3M7D2M5N6M4S",
+])
+def test_cigar_walk_matches_aligned_pairs(cigar):
+    read = make_read(cigar)
+    positions = np.arange(90, read.reference_end + 10, dtype=np.int64)
+    np.testing.assert_array_equal(marker_query_indices(read, positions), expected_indices(read, positions))
+
+
+def test_markers_in_deletions_and_skips_are_not_covered():
+    read = make_read("10M6D10M200N10M")
+    positions = np.array([105, 112, 118, 200, 330], dtype=np.int64)
+    assert marker_query_indices(read, positions).tolist() == [5, -1, 12, -1, 24]
+
+
+def test_extract_marker_alleles_returns_bases_and_quals():
+    read = make_read("2S10M2I10M")
+    positions = np.array([99, 101, 115, 130], dtype=np.int64)
+    covered, bases, quals = extract_marker_alleles(read, positions)
+    assert covered.tolist() == [False, True, True, False]
+    # query offsets 3 and 19 (2 clipped + 1, 2 clipped + 10 + 2 inserted + 5)
+    assert bases.tobytes() == (read.query_sequence[3] + read.query_sequence[19]).encode()
+    assert quals.tolist() == [read.query_qualities[3], read.query_qualities[19]]
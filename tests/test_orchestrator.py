@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from distortopia.orchestrator import STATE_FILE, Pipeline, Stage
+
+
+def make_stages(calls, b_params=None):
+    def copy(src, dst, name):
+        def run():
+            calls.append(name)
+            with open(src) as f_in, open(dst, "w") as out:
+                out.write(f_in.read().upper())
+        return run
+
+    return [
+        Stage("a", copy("src.txt", "a.txt", "a"), ["src.txt"], ["a.txt"]),
+        Stage("b", copy("a.txt", "b.txt", "b"), ["a.txt"], ["b.txt"], b_params or {"n": 1}),
+    ]
+
+
+def run(calls, b_params=None, dry_run=False):
+    return Pipeline(make_stages(calls, b_params), ".", log=lambda message: None).run(dry_run=dry_run)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src.txt").write_text("acgt")
+    return tmp_path
+
+
+def test_second_run_skips_everything(workdir):
+    calls = []
+    run(calls)
+    assert calls == ["a", "b"] and (workdir / "b.txt").read_text() == "ACGT"
+    plan = run(calls)
+    assert calls == ["a", "b"]
+    assert {reason for _, _, reason in plan} == {"up to date"}
+
+
+def test_source_content_change_reruns_downstream(workdir):
+    calls = []
+    run(calls)
+    (workdir / "src.txt").write_text("ttgg")
+    plan = run(calls)
+    assert calls == ["a", "b", "a", "b"]
+    assert [reason for _, _, reason in plan] == ["inputs or parameters changed", "upstream changed"]
+
+
+def test_touching_a_source_without_changing_it_reruns_nothing(workdir):
+    calls = []
+    run(calls)
+    st = os.stat(workdir / "src.txt")
+    os.utime(workdir / "src.txt", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    run(calls)
+    assert calls == ["a", "b"]
+
+
+def test_param_change_only_reruns_that_stage(workdir):
+    calls = []
+    run(calls)
+    run(calls, b_params={"n": 2})
+    assert calls == ["a", "b", "b"]
+
+
+def test_missing_or_modified_outputs_rerun(workdir):
+    calls = []
+    run(calls)
+    os.remove(workdir / "b.txt")
+    run(calls)
+    assert calls[2:] == ["b"]
+    (workdir / "a.txt").write_text("edited")
+    run(calls)
+    assert calls[3:] == ["a", "b"]
+
+
+def test_existing_outputs_are_adopted_and_dry_run_writes_nothing(workdir):
+    (workdir / "a.txt").write_text("ACGT")
+    calls = []
+    plan = run(calls, dry_run=True)
+    assert plan[0][2] == "adopted existing outputs" and plan[1][2] == "never run"
+    assert calls == [] and not (workdir / STATE_FILE).exists()
+    run(calls)
+    assert calls == ["b"]
+
+
+def test_failed_stage_stops_downstream(workdir):
+    calls = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    stages = [Stage("a", fail, ["src.txt"], ["a.txt"]), make_stages(calls)[1]]
+    with pytest.raises(RuntimeError, match="boom"):
+        Pipeline(stages, ".", log=lambda message: None).run()
+    assert calls == []
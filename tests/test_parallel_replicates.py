@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pysam")
+
+from distortopia import parallel_replicates  # noqa: E402
+from distortopia.parallel_replicates import simulate_replicates_parallel  # noqa: E402
+from distortopia.simulate_f1 import generate_f1_from_files  # noqa: E402
+
+
+@pytest.fixture
+def inputs(tmp_path, write_vcf):
+    rng = np.random.default_rng(0)
+    genome = {chrom: "".join(rng.choice(list("ACGT"), 6000)) for chrom in ("chr1", "chr2")}
+    (tmp_path / "ref.fa").write_text("".join(f">{c}\n{s}\n" for c, s in genome.items()))
+    for name, offset in (("a", 0), ("b", 25)):
+        write_vcf(tmp_path / f"{name}.vcf", [(chrom, pos, seq[pos - 1], "G" if seq[pos - 1] == "C" else "C")
+                                             for chrom, seq in genome.items()
+                                             for pos in range(100 + offset, 6000, 50)])
+    return [str(tmp_path / f) for f in ("ref.fa", "a.vcf", "b.vcf")]
+
+
+def test_output_is_identical_for_any_worker_count_and_matches_serial(tmp_path, inputs):
+    # the single model crosses over with p = 0.5 per chromosome, whatever its length
+    kwargs = {"seed": 11, "model": "single"}
+    serial = tmp_path / "serial.fna"
+    generate_f1_from_files(*inputs, str(serial), num_reps=6, **kwargs)
+    outputs = []
+    for workers in (1, 3):
+        fasta, reads = tmp_path / f"w{workers}.fna", tmp_path / f"w{workers}.fq"
+        simulate_replicates_parallel(*inputs, str(fasta), 6, workers=workers,
+                                     reads_output=str(reads), coverage=2, **kwargs)
+        outputs.append((fasta.read_bytes(), reads.read_bytes()))
+    assert outputs[0] == outputs[1]
+    assert outputs[0][0] == serial.read_bytes()
+    chr1 = [r.split(b"\n", 1)[1] for r in outputs[0][0].split(b">")[1:] if r.startswith(b"chr1_")]
+    assert len(chr1) == 6 and len(set(chr1)) > 1  # replicates differ, so the crossover draws matter
+    assert all(f"@rep{rep}_".encode() in outputs[0][1] for rep in range(6))
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".replicates_")]
+
+
+def test_failed_run_keeps_the_previous_output(tmp_path, inputs, monkeypatch):
+    output = tmp_path / "out.fna"
+    output.write_text("previous run\n")
+    calls = []
+
+    def failing_append(part, out):
+        calls.append(part)
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        out.write(b">partial\n")
+
+    monkeypatch.setattr(parallel_replicates, "_append_part", failing_append)
+    with pytest.raises(RuntimeError, match="disk full"):
+        simulate_replicates_parallel(*inputs, str(output), 4, seed=1, workers=2)
+    assert output.read_text() == "previous run\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.vcf", "b.vcf", "out.fna", "ref.fa"]
@@ -0,0 +1,47 @@
+import sys
+
+import pytest
+
+from distortopia.pipes import run_piped
+
+
+def python(source):
+    return [sys.executable, "-c", source]
+
+
+def test_stream_reaches_last_stage(tmp_path):
+    out = tmp_path / "out.txt"
+    with open(out, "wb") as f:
+        run_piped([
+            python("for i in range(50000): print(i)"),
+            python("import sys; print(sum(int(line) for line in sys.stdin))"),
+        ], stdout=f)
+    assert out.read_text() == f"{sum(range(50000))}\n"
+
+
+def test_upstream_failure_is_reported_with_its_stderr():
+    with pytest.raises(RuntimeError) as err:
+        run_piped([
+            python("import sys; print('partial'); sys.exit('aligner crashed')"),
+            python("import sys; sys.stdin.read()"),
+        ])
+    message = str(err.value)
+    assert "(exit 1)" in message and "aligner crashed" in message
+    assert message.count("(exit") == 1
+
+
+def test_every_failing_stage_is_listed():
+    with pytest.raises(RuntimeError) as err:
+        run_piped([
+            python("import sys; sys.exit('first broke')"),
+            python("import sys; sys.stdin.read(); sys.exit(3)"),
+        ])
+    assert "first broke" in str(err.value) and "(exit 3)" in str(err.value)
+
+
+def test_noisy_stderr_does_not_stall_the_pipe():
+    # more than a pipe buffer of stderr from both stages
+    run_piped([
+        python("import sys; sys.stderr.write('x' * 1_000_000); print('ok')"),
+        python("import sys; sys.stderr.write('y' * 1_000_000); sys.stdin.read()"),
+    ])
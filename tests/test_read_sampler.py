@@ -0,0 +1,66 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from distortopia.read_sampler import _read_lengths, sample_reads, simulate_reads
+
+
+def random_genome(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    bases = np.frombuffer(b"ACGT", dtype=np.uint8)
+    return {f"chr{i + 1}": rng.choice(bases, n) for i, n in enumerate(lengths)}
+
+
+def parse_fastq(text):
+    lines = text.splitlines()
+    return [(lines[i][1:], lines[i + 1], lines[i + 3]) for i in range(0, len(lines), 4)]
+
+
+@pytest.mark.parametrize("model", ["lognormal", "gamma"])
+def test_length_models_hit_the_requested_mean_and_sd(model):
+    lengths = _read_lengths(200_000, 8000, 3000, model, np.random.default_rng(1))
+    assert lengths.mean() == pytest.approx(8000, rel=0.02)
+    assert lengths.std() == pytest.approx(3000, rel=0.05)
+
+
+def test_unknown_length_model_is_rejected():
+    with pytest.raises(ValueError, match="Unknown length model"):
+        _read_lengths(10, 8000, 3000, "uniform", np.random.default_rng())
+
+
+def test_reads_stay_on_their_chromosome_and_reach_the_coverage():
+    genome = random_genome([50_000, 20_000])
+    reads = sample_reads(genome, 30, np.random.default_rng(2), length_mean=2000, length_sd=500)
+    chrom_lens = np.array([50_000, 20_000])
+    assert np.all(reads["starts"] + reads["lengths"] <= chrom_lens[reads["chrom_index"]])
+    assert reads["lengths"].min() >= 100
+    assert reads["lengths"].sum() / 70_000 == pytest.approx(30, rel=0.1)
+    assert set(reads["strands"].tolist()) == {-1, 1}
+
+
+def test_fastq_reads_match_the_genome_on_both_strands(tmp_path):
+    genome = random_genome([5000, 3000])
+    n = simulate_reads(genome, str(tmp_path / "r.fq"), coverage=5, rng=np.random.default_rng(3),
+                       name_prefix="rep0_", length_mean=500, length_sd=100, quality=30)
+    records = parse_fastq((tmp_path / "r.fq").read_text())
+    assert len(records) == n
+    complement = str.maketrans("ACGT", "TGCA")
+    for name, seq, qual in records:
+        assert name.startswith("rep0_read")
+        chrom, span = name.split()[1].split(":")
+        start, end = map(int, span[:-1].split("-"))
+        expected = bytes(genome[chrom][start:end]).decode()
+        if span.endswith("-"):
+            expected = expected.translate(complement)[::-1]
+        assert seq == expected and qual == "?" * len(seq)
+
+
+def test_same_seed_gives_identical_bgzf_and_plain_output(tmp_path):
+    genome = random_genome([8000])
+    simulate_reads(genome, str(tmp_path / "a.fq"), 4, np.random.default_rng(5), length_mean=600, length_sd=200)
+    simulate_reads(genome, str(tmp_path / "b.fq.gz"), 4, np.random.default_rng(5), length_mean=600, length_sd=200,
+                   index=True)
+    with gzip.open(tmp_path / "b.fq.gz", "rt") as f:
+        assert f.read() == (tmp_path / "a.fq").read_text()
+    assert (tmp_path / "b.fq.gz.fai").exists() and (tmp_path / "b.fq.gz.gzi").exists()
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from distortopia.reference_cache import _read_stamp, fasta_digest, prepare_reference
+
+
+@pytest.fixture
+def reference(tmp_path, fake_minimap2, fake_samtools):
+    fasta = tmp_path / "ref.fa"
+    fasta.write_text(">chr1\nACGTACGT\n")
+    log = tmp_path / "calls.log"
+
+    def builds():
+        calls = log.read_text().splitlines() if log.exists() else []
+        log.write_text("")
+        return sorted(call.split()[0] if call.startswith("minimap2") else " ".join(call.split()[:2])
+                      for call in calls)
+
+    return str(fasta), builds
+
+
+ALL = ["minimap2", "samtools dict", "samtools faidx"]
+
+
+def test_unchanged_reference_is_reused(reference):
+    fasta, builds = reference
+    first = prepare_reference(fasta)
+    assert builds() == ALL
+    assert prepare_reference(fasta) == first
+    assert builds() == []
+
+    # a new mtime alone re-hashes the file but rebuilds nothing
+    os.utime(fasta, ns=(0, 0))
+    assert prepare_reference(fasta) == first
+    assert builds() == []
+    assert _read_stamp(fasta)["mtime_ns"] == 0
+
+
+def test_changed_reference_rebuilds_and_drops_the_old_index(reference):
+    fasta, builds = reference
+    old = prepare_reference(fasta)
+    builds()
+    with open(fasta, "w") as f:
+        f.write(">chr1\nTTTTACGT\n")
+
+    new = prepare_reference(fasta)
+    assert builds() == ALL
+    assert new["mmi"] != old["mmi"] and not os.path.exists(old["mmi"])
+    assert _read_stamp(fasta)["sha256"] == fasta_digest(fasta)
+
+
+def test_missing_artifact_is_rebuilt(reference):
+    fasta, builds = reference
+    paths = prepare_reference(fasta, artifacts=("fai", "dict"))
+    builds()
+    os.remove(paths["fai"])
+    assert prepare_reference(fasta, artifacts=("fai", "dict")) == paths
+    assert builds() == ["samtools faidx"]
+
+
+def test_digest_is_memoized_in_the_stamp(reference, monkeypatch):
+    fasta, _ = reference
+    prepare_reference(fasta, artifacts=("fai",))
+    monkeypatch.setattr("builtins.open", _no_fasta_reads(fasta, open))
+    assert fasta_digest(fasta) == _read_stamp(fasta)["sha256"]
+
+
+def _no_fasta_reads(fasta, real_open):
+    def guarded(path, mode="r", *args, **kwargs):
+        assert not (os.fspath(path) == fasta and "b" in mode), "FASTA was re-read"
+        return real_open(path, mode, *args, **kwargs)
+    return guarded
+
+
+def test_concurrent_pipelines_build_once(reference):
+    fasta, builds = reference
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: prepare_reference(fasta), range(4)))
+    assert all(result == results[0] for result in results)
+    assert builds() == ALL
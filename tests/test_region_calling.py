@@ -0,0 +1,87 @@
+import pytest
+
+from distortopia.bgzf_writer import _EOF
+from distortopia.region_calling import call_variants_by_region
+
+BCFTOOLS = """\
+    import os, sys
+    EOF = bytes.fromhex("{eof}")
+    args = sys.argv[1:]
+    if args[0] == "mpileup":
+        region = args[args.index("-r") + 1]
+        with open(os.environ["STUB_LOG"], "a") as log:
+            log.write(region + "\\n")
+        if region == os.environ.get("STUB_FAIL_REGION"):
+            sys.exit("mpileup failed")
+        print(f"{{region}}\\t{{' '.join(args[args.index('-r') + 2:-1])}}")
+    elif args[0] == "call":
+        sys.stdout.buffer.write(sys.stdin.buffer.read())
+    elif args[0] == "view":
+        with open(args[args.index("-o") + 1], "wb") as out:
+            out.write(sys.stdin.buffer.read() + EOF)
+    elif args[0] == "concat":
+        parts = open(args[args.index("-f") + 1]).read().split()
+        with open(args[args.index("-o") + 1], "wb") as out:
+            for part in parts:
+                out.write(open(part, "rb").read().removesuffix(EOF))
+"""
+
+
+@pytest.fixture
+def calling(tmp_path, stub_command, fake_samtools):
+    stub_command("bcftools", BCFTOOLS.format(eof=_EOF.hex()))
+    (tmp_path / "ref.fa").write_text(">chr1\n" + "A" * 250 + "\n>chr2\n" + "C" * 100 + "\n")
+    (tmp_path / "f1.bam").write_bytes(b"")
+    log = tmp_path / "calls.log"
+
+    def run(**kwargs):
+        log.write_text("")
+        output = call_variants_by_region(str(tmp_path / "ref.fa"), str(tmp_path / "f1.bam"),
+                                         str(tmp_path / "out.vcf"), workers=2, window_size=100,
+                                         log=lambda message: None, **kwargs)
+        called = [line for line in log.read_text().splitlines() if not line.startswith("samtools")]
+        return open(output).read().splitlines(), sorted(called)
+
+    return run, tmp_path / "out.vcf.parts"
+
+
+REGIONS = ["chr1:1-100", "chr1:101-200", "chr1:201-250", "chr2:1-100"]
+
+
+def test_restart_calls_only_missing_truncated_or_partial_regions(calling, monkeypatch):
+    run, parts = calling
+    monkeypatch.setenv("STUB_FAIL_REGION", "chr1:101-200")
+    with pytest.raises(RuntimeError, match="mpileup failed"):
+        run(keep_parts=True)
+    monkeypatch.delenv("STUB_FAIL_REGION")
+    assert sorted(p.name for p in parts.glob("*.bcf")) == ["000000.bcf", "000002.bcf", "000003.bcf"]
+
+    # a part cut short (no EOF block) and a leftover temporary file
+    truncated = parts / "000003.bcf"
+    truncated.write_bytes(truncated.read_bytes()[:-len(_EOF)])
+    (parts / "000002.bcf.tmp").write_bytes(b"partial")
+
+    lines, called = run(keep_parts=True)
+    assert called == ["chr1:101-200", "chr2:1-100"]
+    assert [line.split("\t")[0] for line in lines] == REGIONS
+
+    lines, called = run(keep_parts=True)
+    assert called == [] and [line.split("\t")[0] for line in lines] == REGIONS
+
+
+def test_changed_arguments_or_reference_discard_old_parts(calling, tmp_path):
+    run, _ = calling
+    run(keep_parts=True)
+    lines, called = run(keep_parts=True, call_args=("-mv", "--ploidy", "1"))
+    assert called == sorted(REGIONS)
+
+    (tmp_path / "ref.fa").write_text(">chr1\n" + "G" * 250 + "\n>chr2\n" + "C" * 100 + "\n")
+    _, called = run(keep_parts=True, call_args=("-mv", "--ploidy", "1"))
+    assert called == sorted(REGIONS)
+
+
+def test_parts_are_removed_after_a_successful_merge(calling):
+    run, parts = calling
+    lines, called = run()
+    assert called == sorted(REGIONS) and len(lines) == 4
+    assert not parts.exists()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from distortopia.scheduler import Scheduler, parse_size
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_parse_size():
+    assert parse_size("768M") == 768 << 20
+    assert parse_size("4g") == 4 << 30
+    assert parse_size(1024) == 1024
+
+
+def test_group_is_trimmed_to_the_core_budget_from_the_saturated_tool():
+    minimap2, sort = Scheduler(cpus=8, memory="64G").allocate("minimap2", "samtools sort")
+    # samtools sort stops scaling at 8 threads and minimap2 at 16, so sort gives up more
+    assert (minimap2.threads, sort.threads) == (5, 3)
+
+
+def test_threads_are_trimmed_to_the_memory_budget():
+    (sort,) = Scheduler(cpus=8, memory="4G").allocate(("samtools sort", 8))
+    assert sort.threads == 5 and sort.memory <= parse_size("4G")
+    assert sort.memory_per_thread == "768M"
+
+
+def test_requested_threads_are_capped_by_the_core_budget():
+    scheduler = Scheduler(cpus=4, memory="64G")
+    assert scheduler.allocate(("bgzip", 2))[0].threads == 2
+    assert scheduler.allocate(("python", 32))[0].threads == 4
+
+
+def test_oversized_group_runs_alone():
+    scheduler = Scheduler(cpus=2, memory="1G")
+    with scheduler.reserve("minimap2") as (allocation,):
+        assert allocation.threads == 1
+        assert scheduler.usage()["memory"] == (scheduler.memory, scheduler.memory)
+
+
+def test_waiters_are_served_first_come_first_served():
+    scheduler = Scheduler(cpus=4, memory="64G")
+    order = []
+
+    def job(name, threads):
+        with scheduler.reserve(("python", threads)):
+            order.append(name)
+
+    with scheduler.reserve(("python", 3)):
+        big = threading.Thread(target=job, args=("big", 4))
+        big.start()
+        wait_for(lambda: scheduler.usage()["waiting"] == 1)
+        # one core is free, but the small job must queue behind the big one
+        small = threading.Thread(target=job, args=("small", 1))
+        small.start()
+        wait_for(lambda: scheduler.usage()["waiting"] == 2)
+        time.sleep(0.05)
+        assert order == []
+    big.join(5)
+    small.join(5)
+    assert order == ["big", "small"]
+    assert scheduler.usage() == {"cpus": (0, 4), "memory": (0, scheduler.memory), "waiting": 0}
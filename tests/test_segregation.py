@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from distortopia.segregation import WindowCounts, benjamini_hochberg, segregation_tests
+
+
+def reads(rows):
+    return pd.DataFrame(rows, columns=["chrom", "start", "end", "pattern"])
+
+
+def test_window_counts_bins_reads_and_bases():
+    counts = WindowCounts(window_size=10)
+    counts.add_reads(reads([("chr1", 2, 8, "TTL"), ("chr1", 5, 25, "LLT")]))
+    counts.add_breakpoints(pd.DataFrame({"chrom": ["chr1"], "left_marker": [11], "right_marker": [19]}))
+    frame = counts.to_frame()
+    assert frame["start"].tolist() == [0, 10, 20]
+    assert frame["reads_T"].tolist() == [1, 0, 0]
+    assert frame["reads_L"].tolist() == [0, 1, 0]
+    assert frame["alleles_T"].tolist() == [2, 1, 0]
+    assert frame["covered_bases"].tolist() == [6 + 5, 10, 5]
+    assert frame["crossovers"].tolist() == [0, 1, 0]
+
+
+def test_merge_adds_counts():
+    a, b = WindowCounts(10), WindowCounts(10)
+    a.add_reads(reads([("chr1", 0, 5, "T")]))
+    b.add_reads(reads([("chr1", 0, 5, "T"), ("chr2", 30, 35, "L")]))
+    frame = a.merge(b).to_frame()
+    assert frame.loc[frame["chrom"] == "chr1", "reads_T"].tolist() == [2]
+    assert frame.loc[frame["chrom"] == "chr2", "reads_L"].tolist() == [0, 0, 0, 1]
+
+
+def test_chrom_lengths_zero_fill_chromosomes_without_reads():
+    counts = WindowCounts(window_size=10)
+    counts.add_reads(reads([("chr1", 0, 5, "T")]))
+    frame = counts.to_frame({"chr1": 25, "chr2": 15})
+    assert frame["chrom"].tolist() == ["chr1"] * 3 + ["chr2"] * 2
+    assert frame["end"].tolist() == [10, 20, 25, 10, 15]
+    empty = frame[frame["chrom"] == "chr2"]
+    assert not empty[list(WindowCounts.FIELDS)].to_numpy().any()
+
+
+def test_benjamini_hochberg_matches_hand_computation():
+    q = benjamini_hochberg([0.01, 0.04, np.nan, 0.03, 0.5])
+    assert np.isnan(q[2])
+    np.testing.assert_allclose(q[[0, 1, 3, 4]], [0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.5])
+
+
+def test_segregation_tests_flag_distorted_window():
+    windows = pd.DataFrame({"reads_T": [50, 10], "reads_L": [50, 90],
+                            "crossovers": [1, 0], "covered_bases": [1_000_000, 0]})
+    result = segregation_tests(windows)
+    assert result["p_value"][0] == pytest.approx(1.0)
+    assert result["p_value"][1] < 1e-10
+    assert result["crossover_cM_per_Mb"][0] == pytest.approx(100.0)
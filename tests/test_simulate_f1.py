@@ -0,0 +1,84 @@
+import gzip
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pysam")
+
+from distortopia.simulate_f1 import (  # noqa: E402
+    apply_crossovers, apply_f1_variants, generate_f1_from_files, load_reference, load_variants, write_fasta,
+)
+
+
+def test_f1_encodes_homozygous_and_heterozygous_sites(tmp_path, write_vcf):
+    (tmp_path / "ref.fa").write_text(">chr1\nACGTACGTAC\n")
+    reference = load_reference(str(tmp_path / "ref.fa"))
+    var1 = load_variants(write_vcf(tmp_path / "a.vcf", [("chr1", 2, "C", "T"), ("chr1", 4, "T", "G")]))
+    var2 = load_variants(write_vcf(tmp_path / "b.vcf", [("chr1", 2, "C", "T"), ("chr1", 4, "T", "A")]))
+    assert bytes(apply_f1_variants(reference, var1, var2)["chr1"]) == b"ATGRACGTAC"
+
+
+def test_sites_outside_the_reference_are_skipped(tmp_path, write_vcf, capsys):
+    (tmp_path / "ref.fa").write_text(">chr1\nACGTACGTAC\n")
+    reference = load_reference(str(tmp_path / "ref.fa"))
+    vcf = write_vcf(tmp_path / "a.vcf", [("chr1", 2, "C", "T"), ("chr1", 20, "C", "T"), ("chrX", 1, "A", "T")])
+    var1 = load_variants(vcf, reference)
+    assert var1["chr1"]["positions"].tolist() == [1] and "chrX" not in var1
+    assert "Skipped 2 variant sites" in capsys.readouterr().out
+
+    # without a reference the sites are kept, and still ignored when applied
+    var2 = load_variants(write_vcf(tmp_path / "b.vcf", [("chr1", 3, "G", "A"), ("chr1", 99, "G", "A")]))
+    assert bytes(apply_f1_variants(reference, var1, var2)["chr1"]) == b"ATATACGTAC"
+    assert bytes(apply_crossovers(reference, var1, var2, {})["chr1"]) == b"ATGTACGTAC"
+
+
+def test_non_snp_alts_and_invalid_positions_are_skipped(tmp_path, write_vcf, capsys):
+    (tmp_path / "ref.fa").write_text(">chr1\nACGTACGTAC\n")
+    reference = load_reference(str(tmp_path / "ref.fa"))
+    vcf = write_vcf(tmp_path / "a.vcf", [("chr1", 0, "A", "T"), ("chr1", 2, "C", "."), ("chr1", 3, "G", "*"),
+                                         ("chr1", 4, "T", "<DEL>"), ("chr1", 5, "A", "g")])
+    variants = load_variants(vcf, reference)
+    assert variants["chr1"]["positions"].tolist() == [4]
+    assert bytes(variants["chr1"]["alleles"]) == b"G"
+    assert "Skipped 1 variant sites" in capsys.readouterr().out
+    # the contig's last base is left alone
+    assert bytes(apply_f1_variants(reference, variants, {})["chr1"]) == b"ACGTGCGTAC"
+
+
+def test_write_fasta_wraps_and_accepts_a_stream(tmp_path):
+    genome = {"chr1": np.frombuffer(b"A" * 130, dtype=np.uint8), "chr2": np.frombuffer(b"CG", dtype=np.uint8)}
+    write_fasta(((rep, genome) for rep in range(2)), str(tmp_path / "out.fa"))
+    lines = (tmp_path / "out.fa").read_text().splitlines()
+    assert lines[:6] == [">chr1_rep0", "A" * 60, "A" * 60, "A" * 10, ">chr2_rep0", "CG"]
+    assert lines[6] == ">chr1_rep1" and len(lines) == 12
+
+    write_fasta({0: genome, 1: genome}, str(tmp_path / "dict.fa"))
+    assert (tmp_path / "dict.fa").read_text() == (tmp_path / "out.fa").read_text()
+
+
+@pytest.fixture
+def parents(tmp_path, write_vcf):
+    (tmp_path / "ref.fa").write_text(">chr1\n" + "A" * 2000 + "\n")
+    sites = range(1, 2001, 100)
+    vcf1 = write_vcf(tmp_path / "p1.vcf", [("chr1", pos, "A", "C") for pos in sites])
+    vcf2 = write_vcf(tmp_path / "p2.vcf", [("chr1", pos, "A", "G") for pos in sites])
+    return str(tmp_path / "ref.fa"), vcf1, vcf2
+
+
+def test_seed_fixes_the_replicates_and_bgzf_matches_plain_output(tmp_path, parents):
+    generate_f1_from_files(*parents, str(tmp_path / "a.fa"), num_reps=5, seed=7)
+    generate_f1_from_files(*parents, str(tmp_path / "b.fa.gz"), num_reps=5, seed=7)
+    generate_f1_from_files(*parents, str(tmp_path / "c.fa"), num_reps=5, seed=8)
+    plain = (tmp_path / "a.fa").read_text()
+    with gzip.open(tmp_path / "b.fa.gz", "rt") as f:
+        assert f.read() == plain
+    assert (tmp_path / "c.fa").read_text() != plain
+
+    # every replicate carries one parent's allele at each site, switching at most once
+    records = plain.split(">")[1:]
+    assert [record.split("\n")[0] for record in records] == [f"chr1_rep{rep}" for rep in range(5)]
+    for record in records:
+        seq = "".join(record.split("\n")[1:])
+        alleles = "".join(seq[pos] for pos in range(0, 2000, 100))
+        assert set(alleles) <= {"C", "G"}
+        assert sum(a != b for a, b in zip(alleles, alleles[1:])) <= 1
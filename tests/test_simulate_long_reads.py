@@ -0,0 +1,72 @@
+import gzip
+import time
+
+import pytest
+
+from distortopia import scheduler
+from distortopia.simulate_long_reads import simulate_long_reads
+
+# Stand-in for `badread simulate`: writes --quantity bases as 100 bp reads named
+# after --seed, logs its arguments, and fails (or sleeps first) on request.
+STUB = """\
+    import os, sys, time
+    args = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+    with open(os.environ["STUB_LOG"], "a") as log:
+        log.write(f"{args['--reference']} {args['--quantity']} {args['--seed']}\\n")
+    seed = args["--seed"]
+    if seed == os.environ.get("STUB_FAIL_SEED"):
+        sys.exit("badread exploded")
+    if os.environ.get("STUB_SLOW"):
+        time.sleep(30)
+    bases = int(args["--quantity"])
+    for n in range(0, bases, 100):
+        length = min(100, bases - n)
+        sys.stdout.write(f"@read{n} seed={seed}\\n{'A' * length}\\n+\\n{'I' * length}\\n")
+"""
+
+
+@pytest.fixture
+def badread(tmp_path, stub_command, monkeypatch):
+    stub_command("badread", STUB)
+    monkeypatch.setattr(scheduler, "_scheduler", scheduler.Scheduler(cpus=4, memory="64G"))
+    (tmp_path / "ref.fa").write_text(">chr1\n" + "A" * 1000 + "\n>chr2\n" + "C" * 500 + "\n")
+    return str(tmp_path / "ref.fa"), tmp_path / "calls.log"
+
+
+def fastq_names(path):
+    with gzip.open(path, "rt") as f:
+        return [line.split()[0][1:] for i, line in enumerate(f) if i % 4 == 0]
+
+
+def test_shards_split_the_depth_and_merge_in_order(tmp_path, badread):
+    reference, log = badread
+    out = simulate_long_reads(reference, str(tmp_path / "reads.fq"), coverage="2x", shards=3, seed=10, index=True)
+    assert out.endswith(".fq.gz")
+    calls = sorted(line.split()[1:] for line in log.read_text().splitlines())
+    # 2x of 1500 bp split exactly over seeds 10, 11, 12
+    assert calls == [["1000", "10"], ["1000", "11"], ["1000", "12"]]
+    assert fastq_names(out) == [f"s{i}_{n}" for i in range(3) for n in range(10)]
+
+    pysam = pytest.importorskip("pysam")
+    with pysam.FastaFile(out) as fq:
+        assert fq.nreferences == 30 and fq.fetch("s2_9") == "A" * 100
+
+
+def test_by_chromosome_units_cover_each_chromosome(tmp_path, badread):
+    reference, log = badread
+    out = simulate_long_reads(reference, str(tmp_path / "reads.fq"), coverage="1x", shards=2,
+                              seed=0, by_chromosome=True)
+    assert sorted(int(line.split()[1]) for line in log.read_text().splitlines()) == [250, 250, 500, 500]
+    names = fastq_names(out)
+    assert names[0] == "chr1_s0_0" and names[-1] == "chr2_s1_2"
+
+
+def test_failed_shard_stops_its_siblings(tmp_path, badread, monkeypatch):
+    reference, _ = badread
+    monkeypatch.setenv("STUB_SLOW", "1")
+    monkeypatch.setenv("STUB_FAIL_SEED", "21")
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="exploded"):
+        simulate_long_reads(reference, str(tmp_path / "reads.fq"), coverage="2x", shards=4, seed=20)
+    assert time.monotonic() - started < 20
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bin", "calls.log", "ref.fa"]
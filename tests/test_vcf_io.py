@@ -0,0 +1,38 @@
+import gzip
+
+import pytest
+
+pytest.importorskip("pysam")
+
+from distortopia.vcf_io import load_vcf  # noqa: E402
+
+VCF = (
+    "##fileformat=VCFv4.2\n"
+    "##INFO=<ID=NOTE,Number=1,Type=String,Description=\"Free text\">\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n"
+    "chr1\t10\trs#1\tA\tG\t50\tPASS\t.\n"
+    "chr1\t20\t.\tC\tT\t50\tPASS\tNOTE=a#b\n"
+)
+
+
+def test_hash_inside_records_is_data(tmp_path):
+    path = tmp_path / "hash.vcf"
+    path.write_text(VCF)
+    df = load_vcf(str(path))
+    assert df["POS"].tolist() == [10, 20]
+    assert df["REF"].astype(str).tolist() == ["A", "C"]
+    assert df["ALT"].astype(str).tolist() == ["G", "T"]
+
+
+def test_gzipped_vcf(tmp_path):
+    path = tmp_path / "hash.vcf.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(VCF)
+    df = load_vcf(str(path))
+    assert df["ALT"].astype(str).tolist() == ["G", "T"]
+
+
+def test_header_only_vcf(tmp_path):
+    path = tmp_path / "empty.vcf"
+    path.write_text(VCF.split("chr1")[0])
+    assert load_vcf(str(path)).empty